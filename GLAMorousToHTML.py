@@ -25,7 +25,7 @@ to cater to different institutions or analysis requirements.
 Dependencies:
 Relies on custom project imports from `general.py` for utility functions, `setup.py` for configuration settings, `buildHTML.py`
 for HTML output generation, and `buildExcel.py` for creating Excel files. External libraries such as pandas are utilized for
-data manipulation, and requests are used for fetching data from web sources.
+data manipulation, and urllib3 (through the shared connection pool in `http_client.py`) is used for fetching data from web sources.
 
 Output:
 - An Excel file (`*.xlsx`) containing a summary of Wikipedia articles that use the images from the specified Commons category.
@@ -43,28 +43,49 @@ collections in the Wikimedia ecosystem.
 """
 
 
+import sys
+
 # Custom project imports
 from general import *
-from setup import read_mode, wp_fulllanguagelabel_lang
+from config import GlamorousConfig
 from buildHTML import build_html
 from buildExcel import build_excel
+from profiling import StageProfiler
 
-def main():
-    """ Main function of the script GLAMorousToHTML.py."""
+def main(profile=None, config=None):
+    """
+    Main function of the script GLAMorousToHTML.py.
+    Parameters:
+    - profile (bool, optional): Whether to record the wall time, CPU time, peak memory and record count of every stage,
+      and export them to 'profiles/' as JSON and CSV (see profiling.py). If None (default), profiling is switched on
+      by the environment variable GLAMOROUS_PROFILE=1, or by running the script with '--profile'.
+    - config (GlamorousConfig, optional): The settings of the run (read mode, XML location, language of the full
+      language names). Defaults to the settings in 'setup.py'.
+    """
+    config = config or GlamorousConfig.from_setup()
+    profiler = StageProfiler(profile, run_name='GLAMorousToHTML')
 
     """
     Read remote XML over http
-    data = A dictionary representation of this XML data
+    data = A dictionary representation of this XML data, in which the images are streamed one at a time
+    (rather than loaded into memory all at once), so memory use stays flat for large category trees.
+    In 'http' mode the images are parsed from the live response (spool=False), so the data is processed while it is
+    still being downloaded. This is possible because the images are read only once, in build_projects_dataframe()
     """
-    data = read_xml_data(read_mode)
-    images = data.get('results', 'XX').get('details', 'XX').get('image', 'XX')
+    # As the images are streamed, parsing (and downloading) the <details> part of the XML is profiled as part of 'build_dataframe'
+    with profiler.stage('read_xml') as stage:
+        data = read_xml_data(config.read_mode, streaming=True, spool=False, config=config)
+        images = data.get('results', 'XX').get('details', 'XX').get('image', 'XX')
+        stage['records'] = len(data['results']['stats']['usage'])
 
     """
     This step achieves two things:
     1) Retrieve a list of wikiprojects ['nl.wikipedia', 'en.wikipedia', ...] returned by the Glamorous tool, and 
     2) count the length of this list = number of wikiprojects
     """
-    wikiprojects = get_wikiprojects(data)[0] # List
+    with profiler.stage('get_wikiprojects') as stage:
+        wikiprojects = get_wikiprojects(data)[0] # List
+        stage['records'] = len(wikiprojects)
     #nwikiprojects = get_wikiprojects(data)[1] # Integer
 
     """
@@ -73,64 +94,56 @@ def main():
     'outreach.wikipedia', 'meta.wikipedia', 'incubator.wikipedia' etc.
     2) Also count the length of this list = number of filtered wikiprojects
     """
-    wikiprojects_filtered = filter_wikiprojects(wikiprojects)[0]  # List
+    with profiler.stage('filter_wikiprojects') as stage:
+        wikiprojects_filtered = filter_wikiprojects(wikiprojects)[0]  # List
+        stage['records'] = len(wikiprojects_filtered)
     #nwikiprojects_filtered = filter_wikiprojects(wikiprojects)[1] # Integer
 
-    """"
-    This step transforms Glamorous data from using image names (such as 'AMH-7230-KB_Map_of_Borneo.jpg') as primary keys 
-    ("image key based") to using wikiprojects (such as 'fr.wikipedia') as primary keys ("wikiproject key based")
-    In other words: Transforms data from an image-centric structure to a Wikimedia project-centric structure.
-    """
-    projectsdict = transform_imagekeybased_to_wikiprojectkeybased(data, wikiprojects_filtered)
-
-    # Let's process & enrich 'projectsdict' and convert into a Pandas Dataframe: Steps 1-7
-
-    """ 1,2,3) 
-    This step performs three operations on a dictionary mapping Wikimedia project names to lists of article URLs:
-    1) Remove duplicate Wikipedia URLs per wikiproject/language.
-    2) Sort the list of deduplicated Wikipedia article URLs alphabetically.
-    3) Order the dictionary by the number of Wikipedia article URLs per wikiproject, in descending order.
-    """
-    deduped_sorted_ordered_projectsdict = dedup_sort_order_projectsdict(projectsdict, wikiprojects_filtered)
-
     """ Helper function/step to bring full language names to the table 
     Retrieve a list of dicts containing full Wikipedia language names, from Wikidata
+    (served from the local cache in 'cache/', which is refreshed from Wikidata every 30 days)
     """
-    langdictlist = get_languages_dict(wp_fulllanguagelabel_lang) #dict of full Wikipedia language labels in the language specified
-
-    """ 4) 
-    This step adds full language names as new key-value pair to 'deduped_sorted_ordered_projectsdict' (short: 'dso_pdict') 
-    """
-    full_language_dso_pdict = add_full_language_names_to_dict(deduped_sorted_ordered_projectsdict, langdictlist)
-
-    """ 5) 
-    This step sorts the 'full_language_dso_pdict' dict first by the descending count of URLs associated with each project 
-    and then alphabetically by the project's full language name in case of equal URL counts.
-    """
-    sorted_fulllanguage_dso_pdict = sort_projects_by_urlcount_and_fulllanguage_name(full_language_dso_pdict)
-
-    """ 6) 
-    For every Wikipedia article in this dict, this steps adds the KB images that are included in it. 
-    """
-    images_projectdict = add_images_to_dict(sorted_fulllanguage_dso_pdict, images)
-
-    """ 7) 
-    This step turns 'images_projectdict' into Pandas Dataframe - as preparation for conversion into Excel and HTML
+    with profiler.stage('get_languages_dict') as stage:
+        langdictlist = get_languages_dict(config.wp_fulllanguagelabel_lang) #dict of full Wikipedia language labels in the language specified
+        stage['records'] = len(langdictlist)
+
+    # Let's transform, process & enrich the Glamorous data and convert it into a Pandas Dataframe: Steps 1-7
+
+    """ 1-7)
+    These steps are done in a single pass over the images (see build_projects_dataframe() in general.py for details):
+    1) Transform Glamorous data from using image names (such as 'AMH-7230-KB_Map_of_Borneo.jpg') as primary keys 
+    ("image key based") to using wikiprojects (such as 'fr.wikipedia') as primary keys ("wikiproject key based").
+    In other words: Transform data from an image-centric structure to a Wikimedia project-centric structure.
+    2) Remove duplicate Wikipedia URLs per wikiproject/language, and sort them alphabetically.
+    3) Add full language names to every wikiproject.
+    4) Order the wikiprojects by the descending count of Wikipedia article URLs, and then alphabetically by 
+    full language name in case of equal URL counts.
+    5) For every Wikipedia article, add the KB images that are included in it.
+    6-7) Turn all this into a Pandas Dataframe - as preparation for conversion into Excel and HTML
     """
-    wp_df = convert_to_dataframe(images_projectdict)
+    with profiler.stage('build_dataframe') as stage:
+        wp_df = build_projects_dataframe(images, wikiprojects_filtered, langdictlist)
+        stage['records'] = len(wp_df)
 
     ##### So far for all data transformations and manipulations, let's now create an Excel file and a HTML page from this data
 
     """ 8) 
     This step writes the dataframe to Excel 
     """
-    build_excel(wp_df)
+    with profiler.stage('build_excel') as stage:
+        build_excel(wp_df)
+        stage['records'] = len(wp_df)
 
     """ 9)
     This step transform dataframe to HTML components/building blocks and writes all these components to an output HTML file
     """
-    build_html(wp_df)
+    with profiler.stage('build_html') as stage:
+        build_html(wp_df)
+        stage['records'] = len(wp_df)
+
+    profiler.print_report()
+    profiler.export()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(profile=True if '--profile' in sys.argv[1:] else None)
@@ -0,0 +1,404 @@
+"""
+This script, GLAMorousToHTML_bulk.py, generates GLAMorousToHTML reports in bulk, for multiple Wikimedia Commons
+category trees at once (with one report per category tree), for instance for all institutions of a country
+listed in category_logo_dict.json.
+
+Where GLAMorousToHTML.py handles the single category configured in 'setup.py', this script
+1) fetches the GLAMorous XML output of all categories concurrently, with a bound on the number of simultaneous
+   requests per host, so as not to overload the GLAMorous tool on Toolforge,
+2) processes each downloaded XML file in a pool of worker processes as soon as its download has finished, so
+   fetching and processing overlap, and
+3) writes one report per category, by default an Excel file in the 'data/' folder, named after the category.
+   With --formats, the report can (also, or instead) be written as Parquet, Feather or gzip-compressed CSV,
+   which are much faster to write and read than Excel, and have no row limit.
+
+The full Wikipedia language names are retrieved (or read from the local cache) only once per bulk run,
+and shared with all worker processes.
+
+With --incremental, the usage data of every category is compared with a snapshot of the previous run (see
+incremental.py). Reports are only written for categories whose usage data has changed, each together with a
+changeset listing the added and removed images, articles and usages. Only the rows of the projects affected by the
+changes are recomputed, the others are taken from the report DataFrame of the previous run.
+
+With --skip-unchanged, the GLAMorous XML of every category is fetched with a conditional GET, using the ETag and
+Last-Modified headers of the previous run (or, if the server sends the XML anyway, compared by its content hash, see
+fetch_xml_if_changed() in general.py). Categories whose XML is byte-identical to that of the previous run are not
+parsed or processed at all, so nightly runs over hundreds of categories are mostly no-ops.
+
+With --archive-compression, the downloaded GLAMorous XML is archived gzip or zstd-compressed ('.xml.gz' or '.xml.zst'
+in 'data/xml/'), which takes about a tenth of the disk space. Compressed XML is read transparently by read_xml_data().
+
+With --resumable, the progress of the run is recorded in a job ledger ('data/ledger/', see ledger.py): for every
+category, which of its stages (fetched, parsed, report written, HTML written) have completed. If the run dies partway
+through, running the same command again resumes every category where it stopped, without fetching or parsing again.
+
+With --history, the usage data of every category is also added as a dated snapshot to the usage history
+('data/usage_history.sqlite', see usage_history.py), from which the trends over many runs can be queried.
+
+Usage:
+    python GLAMorousToHTML_bulk.py Netherlands Norway --max-per-host 4 --processes 8
+    python GLAMorousToHTML_bulk.py Netherlands --incremental
+    python GLAMorousToHTML_bulk.py Netherlands --incremental --skip-unchanged --archive-compression zstd
+    python GLAMorousToHTML_bulk.py Netherlands --formats parquet xlsx --fast-excel
+    python GLAMorousToHTML_bulk.py Netherlands Norway --resumable
+
+or from Python:
+    countries_dict = load_dict('category_logo_dict.json')
+    run_bulk(get_country_institutions(countries_dict, 'Netherlands'))
+"""
+
+import argparse
+import functools
+import os
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.parse import quote, urlparse
+
+from general import (load_dict, get_country_institutions, download_to_file, read_xml_data, get_wikiprojects,
+                     filter_wikiprojects, get_languages_dict, build_language_index, build_project_articles,
+                     project_articles_to_dataframe, write_df_to_excel, write_report_files, fetch_xml_file_if_changed,
+                     save_xml_state, xml_archive_path, REPORT_FORMATS, XML_ARCHIVE_COMPRESSIONS, XML_UNCHANGED)
+from incremental import (snapshot_path, load_snapshot, save_snapshot, diff_project_articles, save_changeset,
+                         report_frame_path, save_report_frame, load_report_frame, update_projects_dataframe)
+from ledger import JobLedger
+from usage_history import record_snapshot
+
+GLAMOROUS_XML_BASE_URL = "https://glamtools.toolforge.org/glamorous.php?doit=1&use_globalusage=1&ns0=1&show_details=1&projects[wikipedia]=1&format=xml"
+
+
+def glamorous_xml_url(category, depth=0):
+    """
+    Builds the URL of the GLAMorous XML output for a Wikimedia Commons category.
+    Parameters:
+    - category (str): The name of the Commons category, without the 'Category:' prefix.
+    - depth (int, optional): The GLAMorous search depth, 0 (default) means no subcategories.
+    Returns:
+    - str: The GLAMorous XML URL.
+    """
+    return f"{GLAMOROUS_XML_BASE_URL}&depth={depth}&category={quote(category.replace(' ', '_'))}"
+
+
+def report_basename(category, day=None):
+    """
+    Returns the base name of the report files for a category, in the naming scheme of the files in the 'data/' folder.
+    The date is that of the day of the call (not of the start of the process), so a long-running process, such as
+    report_daemon.py, writes a new dated report every day.
+    Parameters:
+    - category (str): The Commons category.
+    - day (date, optional): The date in the file name. Defaults to today.
+    Example:
+    >>> report_basename('Images from the Rijksmuseum', date(2024, 5, 2))
+    'ImagesfromtheRijksmuseum_Wikipedia_NS0_02052024'
+    """
+    return f"{category.replace(' ', '')}_Wikipedia_NS0_{(day or date.today()).strftime('%d%m%Y')}"
+
+
+def write_excel_report(wp_df, institution, datadir, day=None):
+    """
+    Default report writer of run_bulk(): writes the DataFrame of an institution to an Excel file in 'datadir',
+    with the institution's shortname as sheet name.
+    Parameters:
+    - wp_df (DataFrame): The DataFrame as returned by build_projects_dataframe().
+    - institution (list): The institution details, as returned by get_institution_details().
+    - datadir (str): The directory to write the Excel file to.
+    - day (date, optional): The date in the file name, see report_basename(). Defaults to today.
+    Returns:
+    - str: The path of the Excel file.
+    """
+    excelpath = os.path.join(datadir, f"{report_basename(institution[0], day)}.xlsx")
+    write_df_to_excel(wp_df, datadir, excelpath, institution[1])
+    return excelpath
+
+
+def write_reports(wp_df, institution, datadir, formats=('xlsx',), fast_excel=False, shard_by=None, day=None):
+    """
+    Report writer for run_bulk() that writes the DataFrame of an institution in one or more formats, see
+    write_report_files() in general.py. Use functools.partial() to choose the formats and Excel options.
+    The date in the file names ('day') defaults to today, see report_basename().
+    Returns:
+    - list: The paths of the report files.
+    """
+    return write_report_files(wp_df, datadir, report_basename(institution[0], day), institution[1], formats,
+                              fast_excel=fast_excel, shard_by=shard_by)
+
+
+def parse_category_xml(xml_path):
+    """
+    Parses the downloaded GLAMorous XML of one category into its normalized usage data.
+    Returns:
+    - dict: The usage data, as returned by build_project_articles().
+    Raises:
+    - ValueError: If the XML cannot be read.
+    """
+    data = read_xml_data('local', xml_path, streaming=True)
+    if data is None:
+        raise ValueError(f"Could not read the GLAMorous XML in {xml_path}")
+    images = data['results']['details']['image']
+    wikiprojects_filtered = filter_wikiprojects(get_wikiprojects(data)[0])[0]
+    return build_project_articles(images, wikiprojects_filtered)
+
+
+def process_category(xml_path, institution, language_index, datadir, report_writer=write_excel_report, snapshot_dir=None,
+                     ledger=None, html_writer=None, history_path=None):
+    """
+    Worker function of run_bulk(), executed in a separate process: turns the downloaded GLAMorous XML of one
+    category into a DataFrame and writes the report.
+    Parameters:
+    - xml_path (str): The path of the downloaded GLAMorous XML file.
+    - institution (list): The institution details, as returned by get_institution_details().
+    - language_index (dict): The language index, as returned by build_language_index().
+    - datadir (str): The directory to write the report to.
+    - report_writer (callable, optional): A (picklable, module level) function taking the DataFrame, the institution
+      details and 'datadir', that writes the report and returns its path (or a list of paths). Defaults to
+      write_excel_report().
+    - snapshot_dir (str, optional): If given, incremental mode: the usage data is diffed against the snapshot of the
+      previous run in this directory. If nothing has changed, no report is written. Otherwise the report is written
+      along with a changeset ('<report basename>_changeset.json' in 'datadir'), and the snapshot is updated.
+    - ledger (JobLedger, optional): If given, the completion of every stage is recorded in this ledger (see
+      ledger.py), and the stages that have completed in a previous, interrupted run are skipped.
+    - html_writer (callable, optional): A (picklable, module level) function like 'report_writer', that writes the
+      HTML page of the category and returns its path. Defaults to None (no HTML page).
+    - history_path (str, optional): If given, the usage data is added as a snapshot to the usage history in this
+      SQLite file, see usage_history.py. Defaults to None.
+    Returns:
+    - dict: A summary of the report: the category, the report path (None if unchanged) and the number of articles,
+      in incremental mode the summary of the changeset, and the path of the HTML page (if any).
+    """
+    category = institution[0]
+    project_articles = None
+    if ledger is not None and ledger.completed(category, 'report_written'):
+        result = ledger.artifact(category, 'report_written')
+    else:
+        project_articles = ledger.load_parsed(category) if ledger is not None else None
+        if project_articles is None:
+            project_articles = parse_category_xml(xml_path)
+            if ledger is not None:
+                ledger.save_parsed(category, project_articles)
+        result = write_category_report(project_articles, institution, language_index, datadir, report_writer, snapshot_dir,
+                                       history_path=history_path)
+        if ledger is not None:
+            ledger.mark(category, 'report_written', result)
+
+    if html_writer is not None and result['report'] is not None:
+        if ledger is not None and ledger.completed(category, 'html_written'):
+            result['html'] = ledger.artifact(category, 'html_written')
+        else:
+            if project_articles is None:
+                project_articles = ledger.load_parsed(category) or parse_category_xml(xml_path)
+            result['html'] = html_writer(project_articles_to_dataframe(project_articles, language_index), institution, datadir)
+            if ledger is not None:
+                ledger.mark(category, 'html_written', result['html'])
+    if ledger is not None:
+        ledger.complete(category, result)
+    return result
+
+
+def write_category_report(project_articles, institution, language_index, datadir, report_writer=write_excel_report,
+                          snapshot_dir=None, previous=None, history_path=None):
+    """
+    Writes the report of one category from its usage data, the second half of process_category().
+    Parameters:
+    - project_articles (dict): The usage data of the category, as returned by build_project_articles().
+    - institution, language_index, datadir, report_writer, snapshot_dir, history_path: See process_category().
+    - previous (dict, optional): In incremental mode, the usage data of the previous run, if it is at hand already
+      (e.g. kept in memory by a long-running process). If None, it is loaded from the snapshot in 'snapshot_dir'.
+    Returns:
+    - dict: A summary of the report, see process_category().
+    """
+    result = {'category': institution[0]}
+    changeset = None
+    if history_path is not None:  # Also when nothing has changed, to record that the usages were still there
+        record_snapshot(history_path, institution[0], project_articles, language_index)
+    if snapshot_dir is not None:
+        if previous is None:
+            previous = load_snapshot(snapshot_path(snapshot_dir, institution[0]))
+        changeset = diff_project_articles(previous, project_articles)
+        result['changes'] = changeset['summary']
+        if previous is not None and not changeset['projects']:
+            result.update({'report': None, 'articles': sum(len(articles) for articles in project_articles.values())})
+            return result
+        if previous is not None:  # On a first run, the changeset would simply list everything
+            save_changeset(os.path.join(datadir, f"{report_basename(institution[0])}_changeset.json"), changeset)
+
+    if changeset is not None:  # Only the rows of the affected projects are recomputed
+        previous_df = load_report_frame(report_frame_path(snapshot_dir, institution[0]), previous)
+        wp_df = update_projects_dataframe(previous_df, project_articles, changeset, language_index)
+    else:
+        wp_df = project_articles_to_dataframe(project_articles, language_index)
+    result.update({'report': report_writer(wp_df, institution, datadir), 'articles': len(wp_df)})
+    if snapshot_dir is not None:  # Only once the report is written
+        save_report_frame(report_frame_path(snapshot_dir, institution[0]), wp_df)
+        save_snapshot(snapshot_path(snapshot_dir, institution[0]), project_articles)
+    return result
+
+
+def category_xml_url(institution):
+    """Returns the GLAMorous XML URL of an institution's category, see glamorous_xml_url()."""
+    return glamorous_xml_url(institution[0], institution[3] if len(institution) > 3 else 0)
+
+
+def fetch_category(institution, xmldir, host_semaphores, state_path=None, compression=None):
+    """
+    Downloads the GLAMorous XML output of one category to 'xmldir', holding a slot of the per-host semaphore
+    while downloading.
+    Parameters:
+    - state_path (str, optional): If given, the XML is only downloaded if it has changed since the previous run,
+      according to the validators stored in this file, see fetch_xml_file_if_changed(). The new validators are not
+      stored here, but returned, to be stored once the category has been processed.
+    - compression (str, optional): 'gzip' or 'zstd' to store the XML compressed. Defaults to None (no compression).
+    Returns:
+    - tuple: (xml_path, validators): the path of the downloaded XML file, XML_UNCHANGED if it has not changed, or None
+      if the download failed, and the new validators of the XML (None without 'state_path').
+    """
+    url = category_xml_url(institution)
+    xml_path = xml_archive_path(os.path.join(xmldir, f"{report_basename(institution[0])}.xml"), compression)
+    with host_semaphores[urlparse(url).netloc]:
+        if state_path is not None:
+            return fetch_xml_file_if_changed(url, xml_path, state_path, compression)
+        return (xml_path if download_to_file(url, xml_path, compression) else None), None
+
+
+def run_bulk(institutions, datadir='data', xmldir=os.path.join('data', 'xml'), lang='en', max_per_host=4,
+             processes=None, report_writer=write_excel_report, snapshot_dir=None, skip_unchanged=False,
+             compression=None, ledger_dir=None, restart=False, html_writer=None, history_path=None):
+    """
+    Generates reports for many Commons categories: fetches their GLAMorous XML concurrently, processes the
+    downloaded files in a process pool and writes one report per category.
+    Parameters:
+    - institutions (list): A list of institution details, as returned by get_institution_details() or
+      get_country_institutions(), each starting with the Commons category name and the institution's shortname.
+    - datadir (str, optional): The directory to write the reports to. Defaults to 'data'.
+    - xmldir (str, optional): The directory to store the downloaded GLAMorous XML in. Defaults to 'data/xml'.
+    - lang (str, optional): The language of the full language names. Defaults to 'en'.
+    - max_per_host (int, optional): The maximum number of simultaneous downloads per host. Defaults to 4.
+    - processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+    - report_writer (callable, optional): See process_category(). Defaults to write_excel_report().
+    - snapshot_dir (str, optional): The snapshot directory for incremental mode, see process_category().
+      Defaults to None (no incremental mode).
+    - skip_unchanged (bool, optional): If True, categories whose GLAMorous XML has not changed since the previous run
+      are skipped, see fetch_category(). The validators are stored in 'xml_state.json' in 'xmldir', once a category
+      has been processed successfully. Defaults to False.
+    - compression (str, optional): 'gzip' or 'zstd' to store the downloaded XML compressed. Defaults to None.
+    - ledger_dir (str, optional): If given, the run is resumable: the completed stages of every category are recorded
+      in a job ledger in this directory (see ledger.py). If the previous run with this ledger did not finish, it is
+      resumed: finished categories are skipped, and the others continue at their first uncompleted stage. Defaults to
+      None (no ledger).
+    - restart (bool, optional): If True, the ledger of an unfinished previous run is discarded. Defaults to False.
+    - html_writer (callable, optional): See process_category(). Defaults to None (no HTML pages).
+    - history_path (str, optional): The usage history to add a snapshot of every processed category to, see
+      process_category(). Defaults to None.
+    Returns:
+    - list: A summary dict per category (see process_category()), with an 'error' key for failed categories.
+    """
+    language_index = build_language_index(get_languages_dict(lang))
+    host_semaphores = {urlparse(GLAMOROUS_XML_BASE_URL).netloc: threading.BoundedSemaphore(max_per_host)}
+    state_path = os.path.join(xmldir, 'xml_state.json') if skip_unchanged else None
+    ledger = JobLedger(ledger_dir) if ledger_dir is not None else None
+    if ledger is not None and ledger.start([institution[0] for institution in institutions], restart):
+        print(f"Resuming the unfinished bulk run recorded in {ledger_dir}")
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max_per_host) as fetch_pool, ProcessPoolExecutor(max_workers=processes) as process_pool:
+        reports, to_fetch = {}, []
+        validators = {}  # Category -> validators of its fetched XML, stored once the category has been processed
+        for institution in institutions:
+            if ledger is None:
+                to_fetch.append(institution)
+            elif ledger.result(institution[0]) is not None:
+                print(f"Already done in the previous run: {institution[0]}")
+                results.append(ledger.result(institution[0]))
+            elif ledger.completed(institution[0], 'parsed') or ledger.completed(institution[0], 'fetched'):
+                print(f"Resuming {institution[0]}")
+                report = process_pool.submit(process_category, ledger.artifact(institution[0], 'fetched'), institution,
+                                             language_index, datadir, report_writer, snapshot_dir, ledger, html_writer,
+                                             history_path)
+                reports[report] = institution
+            else:
+                to_fetch.append(institution)
+
+        fetches = {fetch_pool.submit(fetch_category, institution, xmldir, host_semaphores, state_path, compression): institution
+                   for institution in to_fetch}
+        for fetch in as_completed(fetches):
+            institution = fetches[fetch]
+            xml_path, validators[institution[0]] = fetch.result()
+            if xml_path is None:
+                results.append({'category': institution[0], 'error': 'Download failed'})
+                if ledger is not None:
+                    ledger.fail(institution[0], 'Download failed')
+                continue
+            if xml_path == XML_UNCHANGED:
+                print(f"GLAMorous output unchanged for {institution[0]}, skipped")
+                save_xml_state(category_xml_url(institution), validators.pop(institution[0]), state_path)
+                results.append({'category': institution[0], 'report': None, 'articles': None})
+                if ledger is not None:
+                    ledger.complete(institution[0], results[-1])
+                continue
+            print(f"Fetched {institution[0]}")
+            if ledger is not None:
+                ledger.mark(institution[0], 'fetched', xml_path)
+            report = process_pool.submit(process_category, xml_path, institution, language_index, datadir, report_writer,
+                                         snapshot_dir, ledger, html_writer, history_path)
+            reports[report] = institution
+        for report in as_completed(reports):
+            try:
+                result = report.result()
+                if validators.get(result['category']) is not None:
+                    save_xml_state(category_xml_url(reports[report]), validators.pop(result['category']), state_path)
+                if result['report'] is None:
+                    print(f"No changes for {result['category']}: {result['articles']} articles")
+                else:
+                    print(f"Wrote report for {result['category']}: {result['articles']} articles")
+            except Exception as e:
+                result = {'category': reports[report][0], 'error': str(e)}
+                print(f"Failed to process {result['category']}: {e}")
+                if ledger is not None:
+                    ledger.fail(result['category'], e)  # Its completed stages are kept for the next run
+            results.append(result)
+    if ledger is not None and all('error' not in result for result in results):
+        ledger.finish()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate GLAMorousToHTML reports for all institutions of one or more countries.")
+    parser.add_argument('countries', nargs='+', help="Country keys in category_logo_dict.json, such as 'Netherlands'")
+    parser.add_argument('--dict', default='category_logo_dict.json', help="The JSON file with the institutions per country")
+    parser.add_argument('--datadir', default='data', help="Directory to write the reports to")
+    parser.add_argument('--lang', default='en', help="Language of the full Wikipedia language names")
+    parser.add_argument('--max-per-host', type=int, default=4, help="Maximum number of simultaneous downloads per host")
+    parser.add_argument('--processes', type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=['xlsx'], help="Report formats to write (default: xlsx)")
+    parser.add_argument('--fast-excel', action='store_true', help="Write Excel files with the fast, constant-memory writer")
+    parser.add_argument('--excel-sheet-per-project', action='store_true', help="Write one Excel sheet per Wikipedia language version")
+    parser.add_argument('--incremental', action='store_true', help="Only write reports for categories that changed since the previous run")
+    parser.add_argument('--archive-compression', choices=list(XML_ARCHIVE_COMPRESSIONS), default=None,
+                        help="Store the downloaded GLAMorous XML gzip or zstd-compressed (default: uncompressed)")
+    parser.add_argument('--skip-unchanged', action='store_true', help="Skip categories whose GLAMorous XML is identical to that of the previous run")
+    parser.add_argument('--resumable', action='store_true', help="Record the progress in a job ledger in DATADIR/ledger, and resume an interrupted run")
+    parser.add_argument('--restart', action='store_true', help="With --resumable: discard the ledger of an interrupted run and start afresh")
+    parser.add_argument('--history', action='store_true', help="Add the usage data of every category to the usage history in DATADIR/usage_history.sqlite")
+    args = parser.parse_args()
+
+    countries_dict = load_dict(args.dict)
+    if countries_dict is None:
+        return
+    institutions = [institution for country in args.countries
+                    for institution in get_country_institutions(countries_dict, country)]
+    results = run_bulk(institutions, datadir=args.datadir, xmldir=os.path.join(args.datadir, 'xml'), lang=args.lang,
+                       max_per_host=args.max_per_host, processes=args.processes,
+                       report_writer=functools.partial(write_reports, formats=tuple(args.formats), fast_excel=args.fast_excel,
+                                                       shard_by='ProjectCode' if args.excel_sheet_per_project else None),
+                       snapshot_dir=os.path.join(args.datadir, 'snapshots') if args.incremental else None,
+                       skip_unchanged=args.skip_unchanged, compression=args.archive_compression,
+                       ledger_dir=os.path.join(args.datadir, 'ledger') if args.resumable else None, restart=args.restart,
+                       history_path=os.path.join(args.datadir, 'usage_history.sqlite') if args.history else None)
+    failed = [result for result in results if 'error' in result]
+    unchanged = [result for result in results if 'error' not in result and result['report'] is None]
+    print(f"{len(results) - len(failed) - len(unchanged)} of {len(results)} reports written, {len(unchanged)} unchanged.")
+    for result in failed:
+        print(f"  Failed: {result['category']} ({result['error']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+This module computes aggregated data and key figure statistics for sets of GLAMorousToHTML reports, e.g. for all
+reports of the institutions of a specific country.
+
+Instead of looping over the reports one by one, all reports are loaded into one frame with categorical columns
+(Country, Institution, ProjectCode, FullLanguageName, ArticleURL), on which the key figures are computed with
+groupby operations and vectorized set operations:
+- Distinct articles: the number of unique Wikipedia articles in which images are used.
+- Number of languages: the number of Wikipedia language versions in which images are used.
+- Distinct images used: the number of unique images used in at least one article.
+- Total usages: the number of unique (image, article) combinations.
+- Average image reuse: total usages / distinct images used.
+- Language coverage: the number of articles per language, per institution or country.
+- Overlaps: the number of articles (or images) that institutions have in common.
+The figures can be computed per institution, per country, or for the whole set of reports at once, in which case
+articles and images shared by multiple institutions are counted once.
+
+Usage:
+    countries_dict = load_dict('category_logo_dict.json')
+    frame = load_country_reports(countries_dict, ['Netherlands', 'Norway'], datadir='data')
+    print(key_figures(frame, by='Country'))
+    print(overlap_matrix(frame))
+or from the command line:
+    python aggregation.py Netherlands Norway --by Country --csv keyfigures.csv
+
+The reports can be Excel files in the 'data/' folder (read through the cached read layer read_excel_cached() in
+general.py, so repeated aggregations are fast), or DataFrames as returned by convert_to_dataframe() or
+build_projects_dataframe().
+"""
+
+import argparse
+import glob
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from general import read_excel_cached, load_dict, IMAGE_SEPARATOR
+
+REPORT_COLUMNS = ['ProjectCode', 'FullLanguageName', 'ArticleURL', 'Images', 'NumberOfImages']
+CATEGORICAL_COLUMNS = ['Country', 'Institution', 'ProjectCode', 'FullLanguageName', 'ArticleURL']
+OVERLAP_BLOCK_SIZE = 50000  # Number of articles (or images) per block of the incidence matrix in overlap_matrix()
+
+
+def dated_report_paths(category, datadir='data', extension='.xlsx'):
+    """
+    Finds all reports of a Commons category in 'datadir' (and its subfolders), with their dates, using the date in the
+    report file names, e.g. 'ImagesfromtheRijksmuseum_Wikipedia_NS0_02052024.xlsx'.
+    Returns:
+    - list: (datetime, path) tuples, from the oldest to the most recent report.
+    """
+    pattern = os.path.join(glob.escape(datadir), '**', f"{glob.escape(category.replace(' ', ''))}_Wikipedia_NS0_*{extension}")
+    dated_paths = []
+    for path in glob.glob(pattern, recursive=True):
+        try:
+            dated_paths.append((datetime.strptime(path[:-len(extension)].rsplit('_', 1)[1], '%d%m%Y'), path))
+        except ValueError:
+            continue
+    return sorted(dated_paths)
+
+
+def latest_report_path(category, datadir='data'):
+    """
+    Finds the most recent Excel report of a Commons category in 'datadir' (and its subfolders), see dated_report_paths().
+    Returns:
+    - str: The path of the latest report, or None if there is no report for this category.
+    """
+    dated_paths = dated_report_paths(category, datadir)
+    return dated_paths[-1][1] if dated_paths else None
+
+
+def load_reports(reports, countries=None):
+    """
+    Loads many reports into one frame with categorical columns.
+    Parameters:
+    - reports (dict): The reports, keyed by institution (e.g. the Commons category name). Each value is either a report
+      DataFrame, as returned by convert_to_dataframe(), or the path of an Excel report.
+    - countries (dict, optional): The country of each institution, keyed by institution.
+    Returns:
+    - DataFrame: A frame with the columns 'Country', 'Institution', 'ProjectCode', 'FullLanguageName', 'ArticleURL',
+      'Images' and 'NumberOfImages', one row per (institution, article).
+    """
+    countries = countries or {}
+    frames = []
+    for institution, report in reports.items():
+        df = read_excel_cached(report, REPORT_COLUMNS) if isinstance(report, (str, os.PathLike)) else report[REPORT_COLUMNS]
+        frames.append(pd.DataFrame({'Country': countries.get(institution, 'Unknown'), 'Institution': institution,
+                                    **{column: df[column].to_numpy() for column in REPORT_COLUMNS}}))
+    if not frames:
+        frame = pd.DataFrame(columns=['Country', 'Institution'] + REPORT_COLUMNS)
+    else:
+        frame = pd.concat(frames, ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        frame[column] = frame[column].astype('category')
+    frame['Images'] = frame['Images'].fillna('').astype(str)
+    frame['NumberOfImages'] = frame['NumberOfImages'].fillna(0).astype('int64')
+    return frame
+
+
+def load_country_reports(countries_dict, country_keys, datadir='data'):
+    """
+    Loads the latest Excel reports of all institutions of the given countries, see load_reports().
+    Institutions without a report in 'datadir' are skipped with a message.
+    Parameters:
+    - countries_dict (dict): The institutions per country, as in category_logo_dict.json.
+    - country_keys (list): The countries, e.g. ['Netherlands', 'Norway'].
+    - datadir (str, optional): The folder with the Excel reports. Defaults to 'data'.
+    Returns:
+    - DataFrame: The combined frame, see load_reports().
+    """
+    reports, countries = {}, {}
+    for country in country_keys:
+        for category in countries_dict.get(country, {}):
+            path = latest_report_path(category, datadir)
+            if path is None:
+                print(f"No report found for '{category}' in {datadir}. Skipping...")
+                continue
+            reports[category], countries[category] = path, country
+    return load_reports(reports, countries)
+
+
+def explode_usages(frame):
+    """
+    Turns the frame of load_reports() into one row per image usage, by splitting the 'Images' column.
+    Returns:
+    - DataFrame: A frame with the columns 'Country', 'Institution', 'ProjectCode', 'ArticleURL' (categorical) and
+      'Image' (categorical), one row per (institution, article, image).
+    """
+    # One split of all image lists joined together is much faster than splitting every row separately
+    image_lists = frame['Images'].tolist()
+    lengths = np.fromiter((images.count(IMAGE_SEPARATOR) + 1 for images in image_lists), dtype=np.int64, count=len(image_lists))
+    images = IMAGE_SEPARATOR.join(image_lists).split(IMAGE_SEPARATOR) if image_lists else []
+    rows = np.repeat(np.arange(len(frame)), lengths)
+    usages = frame.iloc[rows][['Country', 'Institution', 'ProjectCode', 'ArticleURL']].reset_index(drop=True)
+    usages['Image'] = pd.Categorical(images)
+    return usages[usages['Image'] != ''].reset_index(drop=True)
+
+
+def _group_keys(by):
+    return [] if by is None else [by] if isinstance(by, str) else list(by)
+
+
+def key_figures(frame, by='Institution'):
+    """
+    Computes the key figures of a set of reports.
+    Parameters:
+    - frame (DataFrame): The frame returned by load_reports().
+    - by (str or list, optional): The column(s) to group by, such as 'Institution' (default) or 'Country'. If None, the
+      key figures of the whole set of reports are computed, counting articles and images shared by institutions once.
+    Returns:
+    - DataFrame: One row per group, with the columns 'Distinct articles', 'Number of languages', 'Distinct images used',
+      'Total usages' and 'Average image reuse', as in the key figures files in the 'reports/' folder.
+    """
+    keys = _group_keys(by)
+    usages = explode_usages(frame).drop_duplicates(keys + ['ArticleURL', 'Image'])
+    if keys:
+        articles = frame.groupby(keys, observed=True).agg(**{'Distinct articles': ('ArticleURL', 'nunique'),
+                                                             'Number of languages': ('ProjectCode', 'nunique')})
+        images = usages.groupby(keys, observed=True).agg(**{'Distinct images used': ('Image', 'nunique'),
+                                                            'Total usages': ('Image', 'size')})
+        figures = articles.join(images).fillna(0)
+    else:
+        figures = pd.DataFrame({'Distinct articles': [frame['ArticleURL'].nunique()],
+                                'Number of languages': [frame['ProjectCode'].nunique()],
+                                'Distinct images used': [usages['Image'].nunique()],
+                                'Total usages': [len(usages)]}, index=pd.Index(['All'], name='Group'))
+    figures = figures.astype('int64')
+    figures['Average image reuse'] = (figures['Total usages'] / figures['Distinct images used'].replace(0, np.nan)).round(2)
+    return figures.sort_values('Total usages', ascending=False)
+
+
+def language_coverage(frame, by='Institution', values='FullLanguageName'):
+    """
+    Computes the number of unique articles per language, for every institution (or country).
+    Parameters:
+    - frame (DataFrame): The frame returned by load_reports().
+    - by (str, optional): The column to group by. Defaults to 'Institution'.
+    - values (str, optional): 'FullLanguageName' (default) or 'ProjectCode'.
+    Returns:
+    - DataFrame: One row per group and one column per language, ordered by the total number of articles.
+    """
+    pairs = frame[[by, values, 'ArticleURL']].drop_duplicates()
+    coverage = pd.crosstab(pairs[by], pairs[values])
+    return coverage[coverage.sum().sort_values(ascending=False).index]
+
+
+def overlap_matrix(frame, by='Institution', on='ArticleURL'):
+    """
+    Computes how many articles (or images) every pair of institutions (or countries) has in common, as the product of
+    the group x article incidence matrix with its transpose.
+    Parameters:
+    - frame (DataFrame): The frame returned by load_reports().
+    - by (str, optional): The column to group by. Defaults to 'Institution'.
+    - on (str, optional): 'ArticleURL' (default) for shared articles, or 'Image' for shared images.
+    Returns:
+    - DataFrame: A square matrix, one row and column per group. Cell (a, b) is the number of articles (or images) of
+      group a that group b has as well; the diagonal holds the number of articles (or images) of each group.
+    """
+    source = explode_usages(frame) if on == 'Image' else frame
+    pairs = source[[by, on]].drop_duplicates()
+    groups = pairs[by].cat.remove_unused_categories()
+    group_codes, items = groups.cat.codes.to_numpy(), pd.Categorical(pairs[on]).codes
+    order = np.argsort(items, kind='stable')
+    group_codes, items = group_codes[order], items[order]
+    n_groups, n_items = len(groups.cat.categories), int(items.max()) + 1 if len(items) else 0
+    # The incidence matrix is built and multiplied in blocks of items, so its memory use stays bounded
+    overlaps = np.zeros((n_groups, n_groups), dtype=np.float64)
+    for start in range(0, n_items, OVERLAP_BLOCK_SIZE):
+        lo, hi = np.searchsorted(items, [start, start + OVERLAP_BLOCK_SIZE])
+        incidence = np.zeros((n_groups, min(OVERLAP_BLOCK_SIZE, n_items - start)), dtype=np.float32)
+        incidence[group_codes[lo:hi], items[lo:hi] - start] = 1
+        overlaps += incidence @ incidence.T
+    overlaps = overlaps.round().astype(np.int64)
+    return pd.DataFrame(overlaps, index=groups.cat.categories, columns=groups.cat.categories)
+
+
+def top_articles(frame, n=3, by='Institution'):
+    """
+    Returns the 'n' articles with the most images for every institution (or country).
+    Returns:
+    - DataFrame: The rows of 'frame' for these articles, ordered by group and descending number of images.
+    """
+    ordered = frame.sort_values([by, 'NumberOfImages'], ascending=[True, False])
+    return ordered.groupby(by, observed=True).head(n).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute aggregated key figures for the reports of one or more countries.")
+    parser.add_argument('countries', nargs='+', help="Country keys in category_logo_dict.json, such as 'Netherlands'")
+    parser.add_argument('--dict', default='category_logo_dict.json', help="The JSON file with the institutions per country")
+    parser.add_argument('--datadir', default='data', help="Directory with the Excel reports")
+    parser.add_argument('--by', default='Institution', choices=['Institution', 'Country', 'All'], help="Level of aggregation")
+    parser.add_argument('--csv', default=None, help="Also write the key figures to this CSV file (';'-separated)")
+    args = parser.parse_args()
+
+    countries_dict = load_dict(args.dict)
+    if countries_dict is None:
+        return
+    frame = load_country_reports(countries_dict, args.countries, args.datadir)
+    figures = key_figures(frame, by=None if args.by == 'All' else args.by)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(figures)
+    if args.csv:
+        figures.to_csv(args.csv, sep=';', encoding='utf-8-sig')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Offline benchmark suite for the GLAMorousToHTML data pipeline.
+
+For each requested size (by default 10k, 100k and 1M image usages) this script
+1) generates synthetic GLAMorous XML with synthetic_glamorous.py (cached in the work directory, so it is generated
+   only once per size and seed),
+2) times the individual stages of the step-by-step pipeline: read_xml_data(), transform_imagekeybased_to_wikiprojectkeybased(),
+   dedup_sort_order_projectsdict(), add_full_language_names_to_dict() + sort_projects_by_urlcount_and_fulllanguage_name(),
+   add_images_to_dict() and convert_to_dataframe(),
+3) times the streaming end-to-end pipeline of GLAMorousToHTML.main() (read XML with streaming, filter projects,
+   build_projects_dataframe()), without writing the Excel and HTML output, and UsageMatrix.from_images(),
+4) with --http, times the same end-to-end pipeline in the 'http' read mode, downloading the synthetic XML from the
+   local stand-in server of http_replay.py, with the XML parsed while it is being received,
+5) checks that the step-by-step and end-to-end pipelines produce the same DataFrame, and
+6) compares the timings with a stored baseline (benchmarks/baseline.json) and reports regressions.
+
+Every stage is run 'repeat' times and the fastest run is reported, as the least noisy estimate.
+No network access is needed: the Wikidata language labels are generated along with the XML.
+
+Usage:
+    python benchmarks/bench_pipeline.py                        # 10k, 100k and 1M usages, compare with baseline
+    python benchmarks/bench_pipeline.py --sizes 10000 100000 --repeat 5
+    python benchmarks/bench_pipeline.py --http                 # Also benchmark the 'http' read mode, offline
+    python benchmarks/bench_pipeline.py --update-baseline      # Store the timings of this run as the new baseline
+
+The exit code is 1 if a stage is slower than the baseline by more than the tolerance (default 25%, and at least
+0.05 seconds), or if the pipelines disagree, so the script can be used as a check in CI. Timings depend on the machine,
+so only compare with a baseline recorded on the same machine.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # The project root
+
+from general import (read_xml_data, get_wikiprojects, filter_wikiprojects, transform_imagekeybased_to_wikiprojectkeybased,
+                     dedup_sort_order_projectsdict, add_full_language_names_to_dict,
+                     sort_projects_by_urlcount_and_fulllanguage_name, add_images_to_dict, convert_to_dataframe,
+                     build_language_index, build_projects_dataframe)
+from usage_matrix import UsageMatrix
+import http_replay
+from synthetic_glamorous import generate_glamorous_xml
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_WORKDIR = os.path.join(BENCHMARK_DIR, 'work')
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BENCHMARK_XML_URL = "https://glamtools.toolforge.org/glamorous.php?doit=1&category=Synthetic&format=xml"
+
+
+def timed(function, *args):
+    """Calls function(*args) and returns its result and the elapsed wall time in seconds."""
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def synthetic_input(n_usages, workdir, seed):
+    """
+    Returns the path of the synthetic XML file with 'n_usages' usages and its language labels, generating them if needed.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    xml_path = os.path.join(workdir, f"glamorous_{n_usages}_{seed}.xml")
+    labels_path = f"{xml_path}.labels.json"
+    if not (os.path.exists(xml_path) and os.path.exists(labels_path)):
+        print(f"Generating {xml_path} ...")
+        labels = generate_glamorous_xml(xml_path, n_usages, seed=seed)
+        with open(labels_path, 'w', encoding='utf-8') as file:
+            json.dump(labels, file)
+    with open(labels_path, 'r', encoding='utf-8') as file:
+        return xml_path, json.load(file)
+
+
+def run_step_by_step(xml_path, ldictlist):
+    """
+    Runs the step-by-step pipeline on the XML in 'xml_path'.
+    Returns:
+    - tuple: The resulting DataFrame, a dict of the wall time per stage, and the number of image usages.
+    """
+    times = {}
+    data, times['read_xml_data'] = timed(read_xml_data, 'local', xml_path)
+    images = data['results']['details']['image']
+    projects = filter_wikiprojects(get_wikiprojects(data)[0])[0]
+    pdict, times['transform_imagekeybased_to_wikiprojectkeybased'] = timed(
+        transform_imagekeybased_to_wikiprojectkeybased, data, projects)
+    n_usages = sum(len(urls) for urls in pdict.values())
+    dso_pdict, times['dedup_sort_order_projectsdict'] = timed(dedup_sort_order_projectsdict, pdict, projects)
+
+    def add_and_sort_full_language_names(dso_pdict, ldictlist):
+        return sort_projects_by_urlcount_and_fulllanguage_name(add_full_language_names_to_dict(dso_pdict, ldictlist))
+    sorted_pdict, times['add_full_language_names'] = timed(add_and_sort_full_language_names, dso_pdict, ldictlist)
+    articles_pictures_dict, times['add_images_to_dict'] = timed(add_images_to_dict, sorted_pdict, images)
+    df, times['convert_to_dataframe'] = timed(convert_to_dataframe, articles_pictures_dict)
+    times['step_by_step_total'] = sum(times.values())
+    return df, times, n_usages
+
+
+def run_end_to_end(xml_path, ldictlist):
+    """The data pipeline of GLAMorousToHTML.main(), streaming the XML, without writing Excel and HTML."""
+    data = read_xml_data('local', xml_path, streaming=True)
+    projects = filter_wikiprojects(get_wikiprojects(data)[0])[0]
+    return build_projects_dataframe(data['results']['details']['image'], projects, build_language_index(ldictlist))
+
+
+def run_http_end_to_end(xml_path, ldictlist):
+    """
+    The data pipeline of GLAMorousToHTML.main() in the 'http' read mode. The XML is served by a stand-in server,
+    see benchmark_size().
+    """
+    data = read_xml_data('http', remote_xml_url=BENCHMARK_XML_URL, streaming=True, spool=False)
+    projects = filter_wikiprojects(get_wikiprojects(data)[0])[0]
+    return build_projects_dataframe(data['results']['details']['image'], projects, build_language_index(ldictlist))
+
+
+def run_usage_matrix(xml_path, ldictlist):
+    """Builds a UsageMatrix from the streamed XML."""
+    data = read_xml_data('local', xml_path, streaming=True)
+    projects = filter_wikiprojects(get_wikiprojects(data)[0])[0]
+    return UsageMatrix.from_images(data['results']['details']['image'], projects, ldictlist)
+
+
+def benchmark_size(n_usages, workdir, seed, repeat, http=False):
+    """
+    Benchmarks all stages for one input size. With http=True, the 'http' read mode is benchmarked as well, against a
+    local stand-in server that serves the synthetic XML (see http_replay.py), so no network access is needed.
+    Returns:
+    - dict: {'usages': ..., 'articles': ..., 'consistent': bool, 'times': {stage: fastest wall time in seconds}}
+    """
+    xml_path, ldictlist = synthetic_input(n_usages, workdir, seed)
+    best = {}
+    if http:
+        server, standin_url = http_replay.start_standin_server(os.path.join(workdir, 'http'), xml_file=xml_path)
+        http_replay.configure('off', standin_url=standin_url)
+    try:
+        for _ in range(repeat):
+            step_by_step_df = end_to_end_df = http_df = None  # Free the DataFrames of the previous run before timing the next one
+            step_by_step_df, times, actual_usages = run_step_by_step(xml_path, ldictlist)
+            end_to_end_df, times['end_to_end'] = timed(run_end_to_end, xml_path, ldictlist)
+            if http:
+                http_df, times['http_end_to_end'] = timed(run_http_end_to_end, xml_path, ldictlist)
+            _, times['usage_matrix'] = timed(run_usage_matrix, xml_path, ldictlist)
+            for stage, seconds in times.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+    finally:
+        if http:
+            server.shutdown()
+            http_replay.configure(standin_url='')
+
+    consistent = True
+    for name, df in [('end-to-end', end_to_end_df), ('http end-to-end', http_df)]:
+        if df is None:
+            continue
+        try:
+            pd.testing.assert_frame_equal(step_by_step_df, df)
+        except AssertionError as e:
+            print(f"ERROR: the step-by-step and {name} pipelines disagree for {n_usages} usages: {e}")
+            consistent = False
+    return {'usages': actual_usages, 'articles': len(end_to_end_df), 'consistent': consistent,
+            'times': {stage: round(seconds, 4) for stage, seconds in best.items()}}
+
+
+def compare_with_baseline(results, baseline, tolerance, min_delta):
+    """
+    Prints the timings next to the baseline timings.
+    Returns:
+    - list: The (size, stage) combinations that are slower than the baseline by more than 'tolerance' (a fraction)
+      and by more than 'min_delta' seconds. The latter keeps the timing noise of very short stages from being reported.
+    """
+    regressions = []
+    for size, result in results.items():
+        baseline_times = baseline.get('results', {}).get(size, {}).get('times', {})
+        print(f"\n{size} usages ({result['usages']} actual, {result['articles']} articles)")
+        print(f"  {'Stage':<48}{'Time (s)':>10}{'Baseline':>10}{'Ratio':>8}")
+        for stage, seconds in result['times'].items():
+            baseline_seconds = baseline_times.get(stage)
+            if baseline_seconds:
+                ratio = seconds / baseline_seconds
+                flag = '  SLOWER' if ratio > 1 + tolerance and seconds - baseline_seconds > min_delta else ''
+                if flag:
+                    regressions.append((size, stage))
+                print(f"  {stage:<48}{seconds:>10.4f}{baseline_seconds:>10.4f}{ratio:>8.2f}{flag}")
+            else:
+                print(f"  {stage:<48}{seconds:>10.4f}{'-':>10}{'-':>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the GLAMorousToHTML data pipeline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Numbers of image usages to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of runs per stage, the fastest run is reported")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic XML")
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help="Directory for the generated XML files")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="The baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown relative to the baseline (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="Minimum slowdown in seconds to be reported")
+    parser.add_argument('--http', action='store_true', help="Also benchmark the 'http' read mode, against a local stand-in server")
+    parser.add_argument('--update-baseline', action='store_true', help="Store the timings of this run as the new baseline")
+    args = parser.parse_args()
+
+    results = {str(size): benchmark_size(size, args.workdir, args.seed, args.repeat, args.http) for size in args.sizes}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_delta)
+    inconsistent = [size for size, result in results.items() if not result['consistent']]
+
+    if args.update_baseline:
+        baseline = {'recorded': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                    'machine': platform.platform(), 'seed': args.seed, 'repeat': args.repeat,
+                    'results': {**baseline.get('results', {}), **results}}
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, indent=4)
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}.")
+
+    if inconsistent or (regressions and not args.update_baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
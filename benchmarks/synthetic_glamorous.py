@@ -0,0 +1,155 @@
+"""
+Generator of synthetic GLAMorous XML, for benchmarking the GLAMorousToHTML pipeline offline (without Toolforge).
+
+The generated XML has the same structure as the output of the GLAMorous tool
+(https://glamtools.toolforge.org/glamorous.php?...&format=xml): a <stats> section with one <usage> element per
+Wikimedia project, and a <details> section with one <image> element per image, listing the projects and pages
+in which the image is used. The data is made realistic in the following ways:
+- Usage is Zipf-skewed: a few projects (think 'en.wikipedia') and a few articles (think 'Amsterdam') account for most
+  of the usages, while there is a long tail of projects and articles with only a handful of usages.
+- The number of pages per image varies, so images used in exactly one project, and projects with exactly one page,
+  occur frequently. These produce the single-dict (instead of list) quirk of xmltodict that the code has to handle.
+- Non-language projects that are filtered out by filter_wikiprojects() (such as 'meta.wikipedia'), and project codes
+  with underscores (such as 'nds_nl.wikipedia') are included.
+- Page titles contain spaces and XML special characters.
+
+Along with the XML, the Wikidata language labels of all generated projects are returned (in the format of
+get_languages_dict()), so the full pipeline can run without network access.
+
+Usage:
+    python benchmarks/synthetic_glamorous.py 100000 synthetic_100k.xml --seed 1
+or from Python:
+    language_labels = generate_glamorous_xml('synthetic_100k.xml', n_usages=100000)
+"""
+
+import argparse
+import json
+import os
+import random
+from itertools import accumulate
+from xml.sax.saxutils import quoteattr
+
+# Language project codes, roughly in order of decreasing size. Codes with underscores are normalized by the pipeline.
+LANGUAGE_CODES = ['en', 'de', 'fr', 'nl', 'es', 'it', 'ru', 'ja', 'pl', 'pt', 'zh', 'sv', 'uk', 'ca', 'ar', 'fa', 'no',
+                  'fi', 'hu', 'cs', 'ko', 'id', 'tr', 'ro', 'he', 'da', 'eo', 'vi', 'el', 'sr', 'nds_nl', 'zh_min_nan',
+                  'fy', 'li', 'af', 'zh_yue', 'bat_smg', 'map_bms', 'roa_rup', 'fiu_vro']
+
+# Non-language projects, filtered out by filter_wikiprojects() in general.py
+NON_LANGUAGE_PROJECTS = ['meta.wikipedia', 'simple.wikipedia', 'incubator.wikipedia', 'be_x_old.wikipedia']
+
+
+def zipf_weights(n, s):
+    """Returns the (unnormalized) Zipf weights 1/rank^s of ranks 1..n."""
+    return [1 / rank ** s for rank in range(1, n + 1)]
+
+
+def project_codes(n_projects):
+    """
+    Returns 'n_projects' language project codes, such as 'en.wikipedia', in order of decreasing size. If more projects
+    are requested than there are codes in LANGUAGE_CODES, synthetic codes ('x1.wikipedia', ...) are added.
+    """
+    codes = LANGUAGE_CODES[:n_projects] + [f"x{i}" for i in range(1, n_projects - len(LANGUAGE_CODES) + 1)]
+    return [f"{code}.wikipedia" for code in codes]
+
+
+def language_labels(projects):
+    """
+    Returns synthetic Wikidata language labels for the given projects, in the format of get_languages_dict().
+    Labels are made up ('Language 001', ...), so ties in the number of articles are broken deterministically.
+    """
+    return [{'wikiurl': {'value': f"https://{project.replace('_', '-')}.org/"},
+             'languageLabel': {'value': f"Language {i:03d}"}}
+            for i, project in enumerate(projects, start=1)]
+
+
+def generate_glamorous_xml(path, n_usages, n_images=None, n_projects=30, pages_per_image=3.0, n_titles=None,
+                           zipf_s=1.1, non_language_share=0.01, seed=0):
+    """
+    Writes synthetic GLAMorous XML with approximately 'n_usages' image usages (image, project, page combinations)
+    to 'path', in a streaming fashion, so files with millions of usages can be generated in little memory.
+    Parameters:
+    - path (str): The path of the XML file to write.
+    - n_usages (int): The approximate total number of image usages.
+    - n_images (int, optional): The number of images. Defaults to n_usages / pages_per_image.
+    - n_projects (int, optional): The number of Wikipedia language versions. Defaults to 30.
+    - pages_per_image (float, optional): The average number of pages per image. The actual number per image is drawn
+      from a geometric distribution, so most images are used in only one or two pages. Defaults to 3.
+    - n_titles (int, optional): The number of distinct article titles to choose from. Defaults to n_usages / 4.
+    - zipf_s (float, optional): The exponent of the Zipf distributions of the projects and titles. Defaults to 1.1.
+    - non_language_share (float, optional): The share of usages in non-language projects such as 'meta.wikipedia'.
+    - seed (int, optional): The random seed, the same seed gives the same XML. Defaults to 0.
+    Returns:
+    - list: The language labels of the generated projects, in the format of get_languages_dict().
+    """
+    rng = random.Random(seed)
+    n_images = n_images or max(1, round(n_usages / pages_per_image))
+    n_titles = n_titles or max(1, n_usages // 4)
+    projects = project_codes(n_projects)
+    all_projects = projects + NON_LANGUAGE_PROJECTS
+    project_weights = [w * (1 - non_language_share) for w in zipf_weights(len(projects), zipf_s)]
+    project_weights += [sum(project_weights) * non_language_share / len(NON_LANGUAGE_PROJECTS)] * len(NON_LANGUAGE_PROJECTS)
+    # Cumulative weights, computed once: random.choices() would otherwise recompute them on every call
+    project_cum_weights = list(accumulate(project_weights))
+    title_cum_weights = list(accumulate(zipf_weights(n_titles, zipf_s)))
+    title_ranks = list(range(n_titles))
+
+    # Draw the number of pages of every image, then scale to hit n_usages
+    page_counts = [1 + int(rng.expovariate(1 / max(pages_per_image - 1, 1e-9))) if pages_per_image > 1 else 1
+                   for _ in range(n_images)]
+    scale = n_usages / sum(page_counts)
+    page_counts = [max(1, round(count * scale)) for count in page_counts]
+
+    usage, unique = {project: 0 for project in all_projects}, {project: set() for project in all_projects}
+    with open(path + '.details', 'w', encoding='utf-8') as details:
+        for image_number, page_count in enumerate(page_counts):
+            image_projects = {}
+            chosen_projects = rng.choices(all_projects, cum_weights=project_cum_weights, k=page_count)
+            chosen_titles = rng.choices(title_ranks, cum_weights=title_cum_weights, k=page_count)
+            for project, title_rank in zip(chosen_projects, chosen_titles):
+                image_projects.setdefault(project, []).append(f"Article {title_rank} & co")
+            image_name = f"Image_{image_number:07d}_from_the_collection.jpg"
+            details.write(f"<image name={quoteattr(image_name)} url={quoteattr('https://commons.wikimedia.org/wiki/File:' + image_name)}>\n")
+            for project, titles in image_projects.items():
+                details.write(f'<project name="{project}"><namespace name="">')
+                for title in titles:
+                    details.write(f"<page title={quoteattr(title)}/>")
+                details.write('</namespace></project>\n')
+                usage[project] += len(titles)
+                unique[project].add(image_number)
+            details.write('</image>\n')
+
+    with open(path, 'w', encoding='utf-8') as xml, open(path + '.details', 'r', encoding='utf-8') as details:
+        xml.write('<?xml version="1.0" encoding="UTF-8"?>\n<results>\n<category name="Synthetic" depth="0"/>\n<stats>\n')
+        for project in sorted(all_projects, key=lambda project: -usage[project]):
+            if usage[project]:
+                xml.write(f'<usage project="{project}" usage="{usage[project]}" unique="{len(unique[project])}"/>\n')
+        xml.write('</stats>\n<details>\n')
+        for line in details:
+            xml.write(line)
+        xml.write('</details>\n</results>\n')
+    os.remove(path + '.details')
+    return language_labels(projects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic GLAMorous XML for benchmarking.")
+    parser.add_argument('n_usages', type=int, help="Approximate number of image usages")
+    parser.add_argument('path', help="Path of the XML file to write")
+    parser.add_argument('--images', type=int, default=None, help="Number of images (default: usages / pages per image)")
+    parser.add_argument('--projects', type=int, default=30, help="Number of Wikipedia language versions")
+    parser.add_argument('--pages-per-image', type=float, default=3.0, help="Average number of pages per image")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of the project and title distributions")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--labels', default=None, help="Also write the language labels to this JSON file")
+    args = parser.parse_args()
+
+    labels = generate_glamorous_xml(args.path, args.n_usages, n_images=args.images, n_projects=args.projects,
+                                    pages_per_image=args.pages_per_image, zipf_s=args.zipf, seed=args.seed)
+    if args.labels:
+        with open(args.labels, 'w', encoding='utf-8') as file:
+            json.dump(labels, file, indent=1)
+    print(f"Wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+This module provides the configuration object of a GLAMorousToHTML run.
+
+The configuration used to be read from 'setup.py' at import time, by general.py among others, which made it
+impossible to import general.py without a 'setup.py', and tied every process to one configuration. Instead, the
+settings are now collected in a GlamorousConfig object, which is created explicitly and passed to the functions that
+need it, such as read_xml_data() in general.py and GLAMorousToHTML.main(). 'setup.py' is only read when a
+configuration is created from it with GlamorousConfig.from_setup().
+
+Usage:
+    config = GlamorousConfig(read_mode='local', local_xml_file='data/xml/KB.xml')
+    data = read_xml_data(config.read_mode, config=config, streaming=True)
+or, with the settings of 'setup.py':
+    config = GlamorousConfig.from_setup()
+"""
+
+import importlib
+
+CONFIG_FIELDS = ('read_mode', 'local_xml_file', 'xml_url', 'wp_fulllanguagelabel_lang')
+
+
+class GlamorousConfig:
+    """
+    The settings of a GLAMorousToHTML run.
+    Parameters:
+    - read_mode (str, optional): 'http' (default) to fetch the GLAMorous XML from Toolforge, or 'local' to read it from
+      a local file.
+    - local_xml_file (str, optional): The path of the local GLAMorous XML file, used in 'local' mode.
+    - xml_url (str, optional): The GLAMorous XML URL, used in 'http' mode.
+    - wp_fulllanguagelabel_lang (str, optional): The language of the full Wikipedia language names. Defaults to 'en'.
+    """
+
+    def __init__(self, read_mode='http', local_xml_file=None, xml_url=None, wp_fulllanguagelabel_lang='en'):
+        self.read_mode = read_mode
+        self.local_xml_file = local_xml_file
+        self.xml_url = xml_url
+        self.wp_fulllanguagelabel_lang = wp_fulllanguagelabel_lang
+
+    @classmethod
+    def from_setup(cls, module_name='setup'):
+        """
+        Creates a configuration from the settings in 'setup.py' (or another module). Settings that are missing from the
+        module keep their defaults.
+        Raises:
+        - ImportError: If the module cannot be imported.
+        """
+        setup = importlib.import_module(module_name)
+        return cls(**{field: getattr(setup, field) for field in CONFIG_FIELDS if hasattr(setup, field)})
+
+    def __repr__(self):
+        return f"GlamorousConfig({', '.join(f'{field}={getattr(self, field)!r}' for field in CONFIG_FIELDS)})"
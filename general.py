@@ -30,10 +30,13 @@ transforming data, or generating reports. By centralizing these utilities, the m
 and simplifies maintenance.
 
 Dependencies:
-- External libraries such as requests, SPARQLWrapper, urllib3, xmltodict, and pandas, facilitating web requests,
-  SPARQL queries, XML parsing, and data manipulation.
-- Local configurations from 'setup.py', ensuring that the module operates within the context of predefined
-  project settings and preferences.
+- External libraries such as urllib3, xmltodict, and pandas, facilitating web requests, SPARQL queries,
+  XML parsing, and data manipulation. All network calls go through the shared, retrying connection pool in 'http_client.py'.
+  These libraries are imported lazily, on first use (see lazy_imports.py), so importing this module is fast, and
+  processes that do not need pandas (for instance) never pay for importing it.
+- A configuration object (GlamorousConfig in 'config.py') for the settings of a run, such as the read mode and the
+  location of the XML. Importing this module has no side effects and does not need a 'setup.py'; the settings in
+  'setup.py' are only read by read_xml_data() when it is called without XML location and without configuration.
 
 Example Use Case:
 To fetch and parse XML data from a Wikimedia Commons category, validate URLs, and load project configurations
@@ -46,25 +49,59 @@ to Wikimedia projects. Users may need to adapt these utilities or extend them ba
 of their specific projects or scripts.
 """
 
-from SPARQLWrapper import SPARQLWrapper, JSON
+from __future__ import annotations
+
 import traceback
-import urllib3
-import xmltodict
 import json
 import os
 from urllib.parse import urlparse
-from datetime import date
-from typing import Union, Optional, List
-import pandas as pd
-from pandas import DataFrame
+from datetime import date, datetime
+from typing import Union, Optional, List, TYPE_CHECKING
 import logging
-import requests
 import ast
+import tempfile
+import gzip
+import hashlib
+import re
+import shutil
+import xml.etree.ElementTree as ET
+import threading
+import time
+import http_client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from config import GlamorousConfig
+from lazy_imports import lazy_import
+
+# Heavy dependencies, imported on first use
+pd = lazy_import('pandas')
+urllib3 = lazy_import('urllib3')
+xmltodict = lazy_import('xmltodict')
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 
 today = date.today().strftime("%d%m%Y") #20122022
 today2 = date.today().strftime("%d-%m-%Y")  #20-12-2022
 
+# Local on-disk cache for the Wikipedia language labels retrieved from Wikidata, see get_languages_dict()
+LANGUAGES_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+LANGUAGES_CACHE_VERSION = 1  # Increase when the format of the cached data changes, to invalidate existing cache files
+LANGUAGES_CACHE_TTL = 30 * 24 * 3600  # 30 days, in seconds
+
+# Local on-disk cache for Wikidata labels, keyed by (QID, language), see fetch_labels()
+LABELS_CACHE_PATH = os.path.join(LANGUAGES_CACHE_DIR, 'wikidata_labels.json')
+LABELS_CACHE_VERSION = 1
+LABELS_CACHE_MAX_ENTRIES = 200000  # When exceeded, the least recently used labels are evicted
+WBGETENTITIES_MAX_IDS = 50  # Maximum number of ids per wbgetentities request, imposed by the Wikidata API
+
+def _open_text(file_path: str, mode: str, compressed: Optional[bool] = None):
+    """Opens a UTF-8 text file for reading ('r') or writing ('w'), gzip-compressed if 'compressed' or if the path ends with '.gz'."""
+    if compressed or (compressed is None and file_path.endswith('.gz')):
+        return gzip.open(file_path, mode + 't', encoding='utf-8')
+    return open(file_path, mode, encoding='utf-8')
+
+
 def load_dict(file_path: str):
     """
     Loads and returns a dictionary from a JSON file specified by the given file path.
@@ -79,6 +116,7 @@ def load_dict(file_path: str):
     - dict or None: Returns the loaded dictionary if the file is successfully read and parsed.
                     Returns None if the file does not exist, the content cannot be decoded as JSON,
                     or if an unexpected error occurs.
+    Gzip-compressed JSON files (with a '.gz' extension) are decompressed transparently.
     Example of JSON file content:
     ```json
     {
@@ -91,7 +129,7 @@ def load_dict(file_path: str):
         print(f"File not found: {file_path}")
         return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
+        with _open_text(file_path, 'r') as file:
             dictfile = file.read()
             loaded_dict = json.loads(dictfile)
     except json.JSONDecodeError:
@@ -122,6 +160,30 @@ def save_dict(file_path: str, data_dict: dict):
         print(f"An error occurred while writing to the file: {file_path}. Error: {e}")
         return False
 
+def save_dict_atomic(file_path: str, data_dict: dict):
+    """
+    Writes a dictionary to a JSON file atomically: the data is first written to a temporary file in the same directory,
+    which then replaces the target file in one step. Concurrent readers (e.g. other runs sharing a cache file) therefore
+    never see a half-written file. The directory is created if necessary.
+    If the file path ends with '.gz', the JSON is gzip-compressed.
+    Parameters:
+    - file_path (str): The path where the JSON file should be written.
+    - data_dict (dict): The dictionary that should be saved to the JSON file.
+    Raises:
+    - OSError: If the file cannot be written.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        with _open_text(tmp_path, 'w', compressed=file_path.endswith('.gz')) as file:
+            json.dump(data_dict, file, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
 
 def get_institution_details(countries_dict, country_key, institute_index):
     """
@@ -144,6 +206,19 @@ def get_institution_details(countries_dict, country_key, institute_index):
         # Handles cases where the country_key is not found or the index is out of range
         return None
 
+def get_country_institutions(countries_dict, country_key):
+    """
+    Retrieves the details of all institutions within a given country from the provided dictionary.
+    Parameters:
+    - countries_dict (dict): A dictionary keyed by country names, each containing a dictionary of institutions and their details.
+    - country_key (str): The name of the country whose institutions are to be queried.
+    Returns:
+    - list: A list with, for every institution of the country, the list returned by get_institution_details().
+      Empty if the country is not found.
+    """
+    return [get_institution_details(countries_dict, country_key, index)
+            for index in range(len(countries_dict.get(country_key, {})))]
+
 def is_valid_url(url):
     """
     Checks if the provided URL is valid.
@@ -167,13 +242,16 @@ def get_remote_xml(url):
     Returns:
     - dict: A dictionary representation of the XML data. Returns None if parsing fails.
     """
-    http = urllib3.PoolManager()
     try:
-        response = http.request('GET', url)
-        if response.status != 200:
-            print(f"Failed to fetch XML: HTTP {response.status}")
-            return None
-        data = xmltodict.parse(response.data, attr_prefix='', dict_constructor=dict)
+        # The response is parsed while it is being received, instead of after it has been buffered as a whole
+        response = http_client.request('GET', url, preload_content=False)
+        try:
+            if response.status != 200:
+                print(f"Failed to fetch XML: HTTP {response.status}")
+                return None
+            data = xmltodict.parse(LiveResponseReader(response), attr_prefix='', dict_constructor=dict)
+        finally:
+            response.release_conn()
         return data
     except urllib3.exceptions.HTTPError as e:
         print(f"HTTP error encountered: {e}")
@@ -182,28 +260,498 @@ def get_remote_xml(url):
     return None
 
 
-# Custom project import
-# DO NOT place this import on top of this page (otherwise you might get a circular import)
-from setup import local_xml_file, xml_url
-def read_xml_data(readmode, local_xml_file_path=local_xml_file, remote_xml_url=xml_url):
+# Compression of archived GLAMorous XML files: file name suffix and compression level per method
+XML_ARCHIVE_COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+XML_ARCHIVE_LEVELS = {'gzip': 6, 'zstd': 10}
+_COMPRESSION_MAGIC_NUMBERS = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+
 
+def _import_zstandard():
+    """Imports zstandard, an optional dependency that is only needed for zstd-compressed XML files."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd-compressed XML files require zstandard, install it with 'pip install zstandard'.") from e
+    return zstandard
+
+
+def xml_file_compression(file_path):
+    """
+    Detects the compression of a file from its first bytes (not from its name).
+    Returns:
+    - str: 'gzip' or 'zstd', or None if the file is not compressed.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(4)
+    return next((method for magic, method in _COMPRESSION_MAGIC_NUMBERS.items() if head.startswith(magic)), None)
+
+
+def open_xml_source(file_path):
+    """
+    Opens an XML file for reading in binary mode. Gzip and zstd-compressed files are detected automatically and
+    decompressed while they are read, so they can be parsed incrementally without ever being decompressed as a whole.
+    Parameters:
+    - file_path (str): The path of the (compressed) XML file.
+    Returns:
+    - file object: A binary file object, to be closed by the caller.
+    """
+    compression = xml_file_compression(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'zstd':
+        return _import_zstandard().ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    return open(file_path, 'rb')
+
+
+def open_xml_archive(file_path, compression=None):
+    """
+    Opens a file for writing (raw XML) in binary mode, compressing everything written to it.
+    Parameters:
+    - file_path (str): The path of the file to write.
+    - compression (str, optional): 'gzip', 'zstd', or None (default) for no compression.
+    Returns:
+    - file object: A binary file object, to be closed by the caller.
+    """
+    if compression is None:
+        return open(file_path, 'wb')
+    if compression not in XML_ARCHIVE_COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'. Choose one of {', '.join(XML_ARCHIVE_COMPRESSIONS)}.")
+    if compression == 'gzip':
+        return gzip.open(file_path, 'wb', compresslevel=XML_ARCHIVE_LEVELS['gzip'])
+    compressor = _import_zstandard().ZstdCompressor(level=XML_ARCHIVE_LEVELS['zstd'])
+    return compressor.stream_writer(open(file_path, 'wb'), closefd=True)
+
+
+def xml_archive_path(file_path, compression=None):
+    """Returns the path of the archive of an XML file, e.g. 'data/xml/X.xml' becomes 'data/xml/X.xml.zst' for zstd."""
+    return file_path + XML_ARCHIVE_COMPRESSIONS.get(compression, '')
+
+
+def download_to_file(url, file_path, compression=None):
+    """
+    Downloads the content at a given URL to a file, in chunks, so the response is never held in memory as a whole.
+    Parameters:
+    - url (str): The URL to download.
+    - file_path (str): The path of the file to write the content to. Its directory is created if necessary.
+    - compression (str, optional): 'gzip' or 'zstd' to compress the content while writing it, see open_xml_archive().
+      Defaults to None (no compression).
+    Returns:
+    - bool: True if the download succeeded, False otherwise.
+    """
+    try:
+        response = http_client.request('GET', url, preload_content=False)
+        try:
+            if response.status != 200:
+                print(f"Failed to download {url}: HTTP {response.status}")
+                return False
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+            with open_xml_archive(file_path, compression) as f:
+                shutil.copyfileobj(response, f)
+        finally:
+            response.release_conn()
+        return True
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        print(f"Failed to download {url}: {e}")
+        return False
+
+
+def _image_element_to_record(image_elem):
+    """
+    Converts a single <image> element of the GLAMorous XML into a normalized image record.
+    The record has the same keys as the dicts produced by xmltodict.parse(..., attr_prefix=''), but 'project' and
+    'page' are always lists, so downstream code does not have to deal with the single-dict vs. list quirk.
+    Parameters:
+    - image_elem (xml.etree.ElementTree.Element): A fully parsed <image> element.
+    Returns:
+    - dict: The normalized image record.
+    Example:
+        {'name': 'AMH-7230-KB_Map_of_Borneo.jpg',
+         'project': [{'name': 'fr.wikipedia', 'namespace': {'page': [{'title': 'Bornéo'}]}}]}
+    """
+    record = dict(image_elem.attrib)
+    projects = []
+    for project_elem in image_elem.iter('project'):
+        namespace_elem = project_elem.find('namespace')
+        namespace = dict(namespace_elem.attrib) if namespace_elem is not None else {}
+        namespace['page'] = [dict(page_elem.attrib) for page_elem in project_elem.iter('page')]
+        project = dict(project_elem.attrib)
+        project['namespace'] = namespace
+        projects.append(project)
+    record['project'] = projects
+    return record
+
+
+def _iterparse_glamorous(xml_source):
+    """
+    Incrementally parses GLAMorous XML with xml.etree.ElementTree.iterparse, yielding one item at a time.
+    Every <image> element is converted into a normalized record and then cleared and detached from its parent,
+    so memory use stays flat regardless of the number of images in the category.
+    Parameters:
+    - xml_source (str or file object): Path to an XML file (which may be gzip or zstd-compressed, see
+      open_xml_source()), or a binary file-like object to read the XML from.
+    Yields:
+    - tuple: ('stats', list) once, when the <stats> element is closed, holding the attribute dicts of all
+             <usage> elements (e.g. {'project': 'nl.wikipedia', 'usage': '1234', 'unique': '567'}), and
+             ('image', dict) for every <image> element, see _image_element_to_record().
+    """
+    if isinstance(xml_source, (str, os.PathLike)):
+        with open_xml_source(xml_source) as xml_file:
+            yield from _iterparse_glamorous(xml_file)
+        return
+    open_elements = []  # Stack of currently open elements, used to detach consumed elements from their parent
+    usage = []
+    for event, elem in ET.iterparse(xml_source, events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if elem.tag == 'usage':
+            usage.append(dict(elem.attrib))
+        elif elem.tag == 'stats':
+            elem.clear()
+            yield 'stats', usage
+        elif elem.tag == 'image':
+            record = _image_element_to_record(elem)
+            elem.clear()
+            if open_elements:
+                open_elements[-1].remove(elem)  # Free the element, only the current image is ever kept in memory
+            yield 'image', record
+
+
+def iter_glamorous_images(xml_source):
+    """
+    Streams the image records from GLAMorous XML, one at a time.
+    Parameters:
+    - xml_source (str or file object): Path to an XML file, or a binary file-like object to read the XML from.
+    Yields:
+    - dict: A normalized image record, see _image_element_to_record().
+    """
+    for kind, item in _iterparse_glamorous(xml_source):
+        if kind == 'image':
+            yield item
+
+
+class GlamorousXMLStream:
+    """
+    Streaming view of a GLAMorous XML document, as a memory-flat alternative to xmltodict.parse().
+    On creation, only the <stats> part of the document is parsed, so the project usage statistics are
+    available right away as 'usage'. Iterating over the stream yields the normalized image records one by one.
+    If the XML source is a file path or a seekable file, the stream can be iterated multiple times
+    (every iteration re-reads the source); other sources can only be iterated once.
+    Attributes:
+    - xml_source (str or file object): The XML source.
+    - usage (list): The attribute dicts of all <usage> elements in <stats>.
+    """
+
+    def __init__(self, xml_source):
+        self.xml_source = xml_source
+        self.usage = []
+        self._pending = []  # Image records read while looking for <stats>, if <details> happens to come first
+        self._events = self._open()
+        for kind, item in self._events:
+            if kind == 'stats':
+                self.usage = item
+                break
+            self._pending.append(item)
+
+    def _is_reopenable(self):
+        return isinstance(self.xml_source, (str, os.PathLike)) or \
+            (hasattr(self.xml_source, 'seekable') and self.xml_source.seekable())
+
+    def _open(self):
+        if hasattr(self.xml_source, 'seek'):
+            self.xml_source.seek(0)
+        return _iterparse_glamorous(self.xml_source)
+
+    def __iter__(self):
+        if self._events is not None:
+            # First iteration: continue the parse that was started in __init__
+            events, pending = self._events, self._pending
+            self._events, self._pending = None, []
+        elif self._is_reopenable():
+            events, pending = self._open(), []
+        else:
+            raise RuntimeError("This GLAMorous XML stream can only be iterated once.")
+        yield from pending
+        for kind, item in events:
+            if kind == 'image':
+                yield item
+
+
+def stream_to_glamorous_dict(stream):
+    """
+    Wraps a GlamorousXMLStream in the nested dictionary structure returned by xmltodict, so the stream can be used as a
+    drop-in replacement for the output of read_xml_data() in get_wikiprojects(),
+    transform_imagekeybased_to_wikiprojectkeybased() and add_images_to_dict().
+    Parameters:
+    - stream (GlamorousXMLStream): The stream to wrap.
+    Returns:
+    - dict: {'results': {'stats': {'usage': [...]}, 'details': {'image': stream}}}
+    """
+    return {'results': {'stats': {'usage': stream.usage}, 'details': {'image': stream}}}
+
+
+class LiveResponseReader:
+    """
+    Binary file-like view of a urllib3 response that was requested with preload_content=False, for parsers that read
+    their input in chunks (ET.iterparse, xmltodict/expat). The body is decompressed while it is read, and the
+    connection is returned to the pool as soon as the body has been read completely, or the reader is closed.
+    The reader is deliberately not seekable, so a GlamorousXMLStream over it is single-pass.
+    Parameters:
+    - response (urllib3.BaseHTTPResponse): The streamed response.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.closed = False
+
+    def read(self, size=-1):
+        if self.closed:
+            return b''
+        data = self.response.read(None if size is None or size < 0 else size, decode_content=True)
+        if not data:
+            self.close()
+        return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.response.release_conn()
+
+
+def get_remote_xml_stream(url, spool=True):
+    """
+    Fetches XML data from a given URL as a GlamorousXMLStream.
+    By default, the response body is copied in chunks to an anonymous temporary file, so neither the raw response nor
+    the parsed XML tree is ever held in memory as a whole. The temporary file is deleted automatically once the stream
+    is discarded.
+    With spool=False, the stream parses the live response instead: the <stats> part is parsed before this function
+    returns, and the image records are parsed while the rest of the response is still coming in. Downloading and
+    processing then overlap, so the total time is roughly the longer of the two rather than their sum. Such a stream
+    can only be iterated once, and network errors surface while iterating it (as urllib3.exceptions.HTTPError).
+    Parameters:
+    - url (str): The URL from which to fetch the XML data.
+    - spool (bool, optional): Whether to download the response to a temporary file first. Defaults to True.
+    Returns:
+    - GlamorousXMLStream: A stream over the XML, re-iterable if spooled. Returns None if fetching or parsing fails.
+    """
+    try:
+        response = http_client.request('GET', url, preload_content=False)
+        if not spool and response.status == 200:
+            reader = LiveResponseReader(response)
+            try:
+                return GlamorousXMLStream(reader)
+            except BaseException:
+                reader.close()
+                raise
+        try:
+            if response.status != 200:
+                print(f"Failed to fetch XML: HTTP {response.status}")
+                return None
+            spool_file = tempfile.TemporaryFile()
+            try:
+                shutil.copyfileobj(response, spool_file)
+            except BaseException:
+                spool_file.close()
+                raise
+        finally:
+            response.release_conn()
+        try:
+            return GlamorousXMLStream(spool_file)
+        except BaseException:
+            spool_file.close()
+            raise
+    except urllib3.exceptions.HTTPError as e:
+        print(f"HTTP error encountered: {e}")
+    except Exception as e:
+        print(f"Failed to parse XML from response: {traceback.format_exc()}")
+    return None
+
+
+# Validators (ETag, Last-Modified) and content hashes of the GLAMorous XML read before, see read_xml_data(skip_unchanged=True)
+XML_STATE_PATH = os.path.join(LANGUAGES_CACHE_DIR, 'xml_state.json')
+XML_UNCHANGED = 'XML_UNCHANGED'  # Returned instead of the data when the XML has not changed since it was last read
+_xml_state_lock = threading.Lock()
+
+
+def load_xml_state(source: str, state_path: str = XML_STATE_PATH) -> dict:
+    """
+    Returns the validators of the XML that was last read from 'source' (a URL or a local file path):
+    {'etag': ..., 'last_modified': ..., 'sha256': ..., 'updated': ...}, or an empty dict if it has not been read before.
+    """
+    state = load_dict(state_path) if os.path.exists(state_path) else None
+    return state.get(source, {}) if isinstance(state, dict) else {}
+
+
+def save_xml_state(source: str, validators: Optional[dict], state_path: str = XML_STATE_PATH) -> None:
+    """
+    Stores (or, if 'validators' is None, forgets) the validators of the XML that was read from 'source'.
+    Forgetting makes sure the XML is processed again the next time, e.g. after the report could not be written.
+    """
+    with _xml_state_lock:
+        state = load_dict(state_path) if os.path.exists(state_path) else None
+        state = state if isinstance(state, dict) else {}
+        if validators is None:
+            if state.pop(source, None) is None:
+                return
+        else:
+            state[source] = {**validators, 'updated': datetime.now().isoformat(timespec='seconds')}
+        save_dict_atomic(state_path, state)
+
+
+def _hash_copy(source, target=None) -> str:
+    """
+    Reads a binary file object in chunks, copying it to the binary file object 'target' (if given), and returns the
+    SHA-256 hash of its content.
+    """
+    sha256 = hashlib.sha256()
+    while True:
+        chunk = source.read(1024 * 1024)
+        if not chunk:
+            return sha256.hexdigest()
+        sha256.update(chunk)
+        if target is not None:
+            target.write(chunk)
+
+
+def _fetch_if_changed(url: str, target, state_path: str):
+    """
+    Conditional GET of 'url', with the ETag and Last-Modified of the previous response, see fetch_xml_if_changed().
+    Returns:
+    - tuple: (status, validators), with status True if the content was written to the binary file object 'target',
+      False if it is unchanged (HTTP 304, or the same content hash as before), or None if the request failed.
+    """
+    previous = load_xml_state(url, state_path)
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+    response = http_client.request('GET', url, headers=headers, preload_content=False)
+    try:
+        if response.status == 304:
+            return False, previous
+        if response.status != 200:
+            print(f"Failed to fetch XML: HTTP {response.status}")
+            return None, None
+        validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'),
+                      'sha256': _hash_copy(response, target)}
+    finally:
+        response.release_conn()
+    # Servers without validators (or with validators that change on every request) still get caught by the hash
+    return validators['sha256'] != previous.get('sha256'), validators
+
+
+def fetch_xml_if_changed(url: str, file_path: str, state_path: str = XML_STATE_PATH, compression: Optional[str] = None):
+    """
+    Downloads the XML at 'url' to 'file_path', unless it has not changed since the previous call for the same URL.
+    The ETag and Last-Modified headers of the previous response are sent along (conditional GET), so that a server that
+    supports them answers with a bodyless HTTP 304 if nothing has changed. If the server sends the content anyway,
+    its SHA-256 hash is compared with that of the previous response. The new validators are stored in 'state_path'
+    right away; use fetch_xml_file_if_changed() to store them only once the XML has been processed.
+    Parameters:
+    - url (str): The URL to download.
+    - file_path (str): The path of the file to write the content to. It is only replaced if the content has changed.
+    - state_path (str, optional): The JSON file with the validators per URL. Defaults to XML_STATE_PATH.
+    - compression (str, optional): 'gzip' or 'zstd' to compress the file, see open_xml_archive(). The content hash is
+      that of the uncompressed XML. Defaults to None (no compression).
+    Returns:
+    - str: 'file_path' if the content has changed (or is new), XML_UNCHANGED if it has not changed, or None if the
+      download failed.
+    """
+    result, validators = fetch_xml_file_if_changed(url, file_path, state_path, compression)
+    if result is not None:
+        save_xml_state(url, validators, state_path)
+    return result
+
+
+def fetch_xml_file_if_changed(url: str, file_path: str, state_path: str = XML_STATE_PATH, compression: Optional[str] = None):
+    """
+    Like fetch_xml_if_changed(), but without storing the new validators. The caller stores them with
+    save_xml_state(url, validators, state_path) once the XML has been processed, so XML that was downloaded but never
+    processed (e.g. because the run was killed) is not skipped as unchanged the next time.
+    Returns:
+    - tuple: (result, validators): the result of fetch_xml_if_changed(), and the new validators (None if the download
+      failed).
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        with open_xml_archive(tmp_path, compression) as tmp:
+            changed, validators = _fetch_if_changed(url, tmp, state_path)
+        if changed:
+            os.replace(tmp_path, file_path)
+            tmp_path = None
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        print(f"Failed to download {url}: {e}")
+        return None, None
+    finally:
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    if changed is None:
+        return None, None
+    return file_path if changed else XML_UNCHANGED, validators
+
+
+def _default_config():
+    """Returns the configuration in 'setup.py', or None (with a message) if there is no 'setup.py'."""
+    try:
+        return GlamorousConfig.from_setup()
+    except ImportError as e:
+        print(f"No XML location given, and no configuration found in setup.py: {e}")
+        return None
+
+
+def read_xml_data(readmode, local_xml_file_path=None, remote_xml_url=None, streaming=False, spool=True,
+                  skip_unchanged=False, state_path=XML_STATE_PATH, config=None):
     """
     Reads XML data based on the specified mode ('local' or 'http'), converts it to a Python dictionary,
     and returns the dictionary.
     Parameters:
     - readmode (str): The mode to read XML data ('local' for local files, 'http' for remote files).
-    - local_xml_file_path (str, optional): The file path to the local XML file. Required if readmode is 'local'.
-    - remote_xml_url (str, optional): The URL to the remote XML file. Required if readmode is 'http'.
+    - local_xml_file_path (str, optional): The file path to the local XML file, used if readmode is 'local'.
+      Defaults to the 'local_xml_file' of the configuration.
+      Gzip and zstd-compressed files (such as the archives written by download_to_file()) are decompressed while they
+      are read, see open_xml_source().
+    - remote_xml_url (str, optional): The URL to the remote XML file, used if readmode is 'http'. Defaults to the
+      'xml_url' of the configuration.
+    - streaming (bool, optional): If True, the XML is not parsed into memory as a whole. Instead, the images under
+      ['results']['details']['image'] are a GlamorousXMLStream that yields one normalized image record at a time.
+      Defaults to False.
+    - spool (bool, optional): Only used when streaming in 'http' mode. If False, the images are parsed from the live
+      response while it is being downloaded, and can be iterated only once, see get_remote_xml_stream(). Defaults to True.
+    - skip_unchanged (bool, optional): If True, the XML is not parsed at all if it is the same as the last time it was
+      read with skip_unchanged=True, and XML_UNCHANGED is returned instead, so the caller can skip regenerating its
+      output. Remote XML is fetched with a conditional GET (see fetch_xml_if_changed()) and spooled to a temporary
+      file, so 'spool' is ignored; local XML is compared by its content hash. Defaults to False.
+    - state_path (str, optional): The JSON file with the validators of the XML read before. Defaults to XML_STATE_PATH.
+    - config (GlamorousConfig, optional): The configuration to take the XML location from, if it is not given. If None,
+      and the XML location is not given either, the configuration is read from 'setup.py'.
     Returns:
-    - dict: A dictionary representation of the XML data. Returns None if an error occurs or the mode is invalid.
+    - dict: A dictionary representation of the XML data. Returns None if an error occurs or the mode is invalid, and
+      XML_UNCHANGED if 'skip_unchanged' is True and the XML has not changed.
+    Note: with skip_unchanged=True, the XML counts as read once this function returns. Callers that fail to process it
+    should call save_xml_state(source, None, state_path), so it is not skipped the next time.
     """
+    if config is None and (local_xml_file_path if readmode == "local" else remote_xml_url) is None:
+        config = _default_config()
+    if config is not None:
+        local_xml_file_path = local_xml_file_path or config.local_xml_file
+        remote_xml_url = remote_xml_url or config.xml_url
+    if skip_unchanged and readmode in ("local", "http"):
+        return _read_xml_data_if_changed(readmode, local_xml_file_path, remote_xml_url, streaming, state_path)
     if readmode == "local":
         if local_xml_file_path is None or not os.path.exists(local_xml_file_path):
             print(f"Local XML file path is not specified or does not exist: {local_xml_file_path}")
             return None
         try:
-            with open(local_xml_file_path, 'r', encoding='utf-8') as f:
-                data = xmltodict.parse(f.read(), attr_prefix='', dict_constructor=dict)
+            if streaming:
+                return stream_to_glamorous_dict(GlamorousXMLStream(local_xml_file_path))
+            with open_xml_source(local_xml_file_path) as f:
+                data = xmltodict.parse(f, attr_prefix='', dict_constructor=dict)
             return data
         except Exception as e:
             print(f"Failed to read or parse local XML file: {e}")
@@ -212,12 +760,63 @@ def read_xml_data(readmode, local_xml_file_path=local_xml_file, remote_xml_url=x
         if remote_xml_url is None or not is_valid_url(remote_xml_url):
             print(f"Remote XML URL is not specified or is invalid: {remote_xml_url}")
             return None
+        if streaming:
+            stream = get_remote_xml_stream(remote_xml_url, spool=spool)
+            return stream_to_glamorous_dict(stream) if stream is not None else None
         return get_remote_xml(remote_xml_url)
     else:
         print("ERROR: Invalid readmode specified. Choose 'local' or 'http'.")
         return None
 
 
+def _read_xml_data_if_changed(readmode, local_xml_file_path, remote_xml_url, streaming, state_path):
+    """The implementation of read_xml_data(skip_unchanged=True)."""
+    if readmode == "local":
+        if local_xml_file_path is None or not os.path.exists(local_xml_file_path):
+            print(f"Local XML file path is not specified or does not exist: {local_xml_file_path}")
+            return None
+        source, xml_source = os.path.abspath(local_xml_file_path), local_xml_file_path
+        with open(local_xml_file_path, 'rb') as xml_file:
+            validators = {'sha256': _hash_copy(xml_file)}
+        changed = validators['sha256'] != load_xml_state(source, state_path).get('sha256')
+    else:
+        if remote_xml_url is None or not is_valid_url(remote_xml_url):
+            print(f"Remote XML URL is not specified or is invalid: {remote_xml_url}")
+            return None
+        source, xml_source = remote_xml_url, tempfile.TemporaryFile()
+        try:
+            changed, validators = _fetch_if_changed(remote_xml_url, xml_source, state_path)
+        except urllib3.exceptions.HTTPError as e:
+            print(f"HTTP error encountered: {e}")
+            xml_source.close()
+            return None
+        if changed is None:
+            xml_source.close()
+            return None
+    owns_file = not isinstance(xml_source, str)  # The temporary file, closed here unless a stream over it is returned
+    try:
+        if not changed:
+            save_xml_state(source, validators, state_path)
+            return XML_UNCHANGED
+        if streaming:
+            data = stream_to_glamorous_dict(GlamorousXMLStream(xml_source))
+            owns_file = False  # Closed (and deleted) once the stream is discarded
+        elif isinstance(xml_source, str):
+            with open_xml_source(xml_source) as xml_file:
+                data = xmltodict.parse(xml_file, attr_prefix='', dict_constructor=dict)
+        else:
+            xml_source.seek(0)
+            data = xmltodict.parse(xml_source, attr_prefix='', dict_constructor=dict)
+    except Exception as e:
+        print(f"Failed to read or parse XML: {e}")
+        return None
+    finally:
+        if owns_file:
+            xml_source.close()
+    save_xml_state(source, validators, state_path)
+    return data
+
+
 def get_wikiprojects(glamorous_dict):
     """
     Extracts all Wikimedia projects reported by the Glamorous tool and calculates the total number of these projects.
@@ -271,6 +870,38 @@ def filter_wikiprojects(projects, skips=None):
     #print(f"{nlist_filtered} filtered projects: {list_filtered}")
     return list_filtered, nlist_filtered
 
+def iter_image_usages(images, projects=None):
+    """
+    Walks through the GLAMorous image records and yields every single usage of an image in a Wikipedia article,
+    i.e. every (image, project, page) combination. This is the one traversal of the image data that the other
+    data transformation functions in this module are built on.
+    Parameters:
+    - images (iterable): The image records, either the list under ['results']['details']['image'] of the dictionary
+                         returned by read_xml_data(), or a GlamorousXMLStream. The 'project' and 'page' entries of
+                         each record can be a dict or a list of dicts.
+    - projects (collection, optional): If given, only usages in these Wikimedia projects (e.g. 'fr.wikipedia') are
+                         yielded. Passing a set or dict makes this check constant time.
+    Yields:
+    - tuple: (image name, project code, Wikipedia article URL), for instance
+             ('AMH-7230-KB_Map_of_Borneo.jpg', 'fr.wikipedia', 'https://fr.wikipedia.org/wiki/Bornéo')
+    """
+    for image in images:
+        image_key = image.get('name', 'XX') # "Album_amicorum_Jacoba_Bolten_-_79_L_40_-_57r.jpg"
+        names = image.get('project', []) # can be a dict or a list of dicts
+        if isinstance(names, dict):
+            names = [names]  # Normalize names to always be a list for consistent processing
+        for name in names:
+            wiki = name.get('name', 'XX') # 'fr.wikipedia'
+            if projects is not None and wiki not in projects:
+                continue
+            pages = name.get('namespace', {}).get('page', []) # can be a dict or a list of dicts
+            if isinstance(pages, dict):
+                pages = [pages] # Normalize pages to always be a list for consistent processing
+            for page in pages:
+                wikipagetitle = page.get('title', 'XX')
+                yield image_key, wiki, f"https://{wiki}.org/wiki/{wikipagetitle.replace(' ', '_')}"
+
+
 def transform_imagekeybased_to_wikiprojectkeybased(data, projects):
     """
     Transforms Glamorous data from using image names (such as 'AMH-7230-KB_Map_of_Borneo.jpg') as primary keys
@@ -302,25 +933,8 @@ def transform_imagekeybased_to_wikiprojectkeybased(data, projects):
 
     # Fill pdict with data
     images = data.get('results', 'XX').get('details', 'XX').get('image', 'XX')
-    for index, image in enumerate(images):
-        names = image.get('project', 'XX') # can be a dict or a list of dicts
-        image_key = image.get('name', 'XX') # "Album_amicorum_Jacoba_Bolten_-_79_L_40_-_57r.jpg"
-        #print(f"** {image_key} -- {image}")
-        if isinstance(names, dict):
-            names = [names]  # Normalize names to always be a list for consistent processing
-        for name in names:
-            wiki = name.get('name', 'XX') # 'fr.wikipedia'
-            pages = name.get('namespace', 'XX').get('page', 'XX') # can be a dict or a list of dicts
-            if isinstance(pages, dict):
-                pages = [pages] # Normalize pages to always be a list for consistent processing
-            for page in pages:
-                wikipagetitle = page.get('title', 'XX')
-                wiki_url = f"https://{wiki}.org/wiki/{wikipagetitle.replace(' ', '_')}"
-                if wiki in projects:
-                    pdict[wiki].append(wiki_url)
-                else:
-                    pass
-        else: pass
+    for image_key, wiki, wiki_url in iter_image_usages(images, pdict):
+        pdict[wiki].append(wiki_url)
     #for p in pdict.items():
     #    print(f"project = {p}")
     return pdict
@@ -366,7 +980,7 @@ def dedup_sort_order_projectsdict(pdict, projects):
     #    print(f"{key}: {len(deduped_sorted_ordered_dict[key])} - {deduped_sorted_ordered_dict[key]} ")
     return deduped_sorted_ordered_dict
 
-def get_languages_dict(lang="en"):
+def query_languages_dict(lang="en"):
     # TODO: Adapt this query because language of a Wikipedia is not always uniquely defined, see for instance
     #   Norwegian Wikipedia, https://www.wikidata.org/wiki/Q191769#P407
     #   --> https://kbnlwikimedia.github.io/GLAMorousToHTML/GLAMorous_ImagesfromNationaalArchief_Wikipedia_Mainnamespace_16012024.html
@@ -378,6 +992,7 @@ def get_languages_dict(lang="en"):
     and their corresponding language labels in the specified language.
     It does not yet addresses the complexity of language representation in Wikipedia, such as the Norwegian Wikipedia, which has multiple
     language labels for the same language variant (e.g., Nynorsk).
+    This function always queries Wikidata; use get_languages_dict() to benefit from the local cache.
     Parameters:
      - lang (str): A language code (e.g., 'nl' for Dutch) to retrieve the language labels. Defaults to 'en' if not specified.
     Returns:
@@ -395,45 +1010,180 @@ def get_languages_dict(lang="en"):
     }}""".format(lang)
 
     def get_results(endpoint_url, query):
-        user_agent = "GLAMorousToHTML Python script by User:OlafJanssen"
-        sparql = SPARQLWrapper(endpoint_url, agent=user_agent)
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        return sparql.query().convert()
+        return http_client.get_json(endpoint_url, fields={'query': query, 'format': 'json'},
+                                    headers={'Accept': 'application/sparql-results+json'})
 
     results = get_results(endpoint_url, query)
     return results["results"]["bindings"]
 
+
+def _languages_cache_path(cache_dir, lang):
+    return os.path.join(cache_dir, f"languages_{lang}.json")
+
+
+def _load_languages_cache(cache_dir, lang):
+    """
+    Loads the cached language labels for 'lang'. Returns None if there is no usable cache file, for instance because it
+    was written by an older version of this module (see LANGUAGES_CACHE_VERSION).
+    """
+    cache_path = _languages_cache_path(cache_dir, lang)
+    if not os.path.exists(cache_path):
+        return None
+    cached = load_dict(cache_path)
+    if not isinstance(cached, dict) or cached.get('version') != LANGUAGES_CACHE_VERSION or cached.get('lang') != lang:
+        return None
+    return cached
+
+
+def _refresh_languages_cache(cache_dir, lang):
+    """
+    Queries Wikidata for the language labels in 'lang' and (atomically) writes them to the cache, so that concurrent
+    runs never read a half-written cache file.
+    Returns:
+    - list: The freshly retrieved language labels, see query_languages_dict().
+    """
+    bindings = query_languages_dict(lang)
+    cache_entry = {'version': LANGUAGES_CACHE_VERSION, 'lang': lang, 'fetched': time.time(), 'bindings': bindings}
+    save_dict_atomic(_languages_cache_path(cache_dir, lang), cache_entry)
+    return bindings
+
+
+_revalidating_languages = set()  # (cache_dir, lang) of the background refreshes that are running
+_revalidating_languages_lock = threading.Lock()
+
+
+def _revalidate_languages_cache(cache_dir, lang):
+    """Background refresh of a stale cache entry. On failure, the stale entry is simply kept."""
+    try:
+        _refresh_languages_cache(cache_dir, lang)
+    except Exception as e:
+        print(f"Could not refresh the cached language labels for '{lang}', keeping the stale ones: {e}")
+    finally:
+        with _revalidating_languages_lock:
+            _revalidating_languages.discard((cache_dir, lang))
+
+
+def get_languages_dict(lang="en", cache_dir=LANGUAGES_CACHE_DIR, ttl=LANGUAGES_CACHE_TTL, offline=False, wait=False):
+    """
+    Retrieves a list of Wikipedia language labels in a specified language, using a local on-disk cache of the Wikidata
+    query in query_languages_dict(). The cache is keyed by 'lang' and shared by all runs and all categories:
+    1) If the cached labels are younger than 'ttl' seconds, they are returned without contacting Wikidata.
+    2) If they are older (stale), they are returned right away, while Wikidata is queried in a background thread
+       to update the cache for the next run (stale-while-revalidate).
+    3) If there are no cached labels yet, Wikidata is queried and the result is cached.
+    If Wikidata cannot be reached (or throttles us) and there are cached labels, these are used regardless of their age.
+    Parameters:
+     - lang (str): A language code (e.g., 'nl' for Dutch) to retrieve the language labels. Defaults to 'en' if not specified.
+     - cache_dir (str, optional): The directory holding the cache files. Defaults to LANGUAGES_CACHE_DIR.
+     - ttl (float, optional): Time to live of the cached labels, in seconds. Defaults to LANGUAGES_CACHE_TTL (30 days).
+     - offline (bool, optional): If True, Wikidata is never contacted and only the cached labels (of any age) are used.
+       Defaults to False.
+     - wait (bool, optional): If True, stale labels are refreshed before returning instead of in the background, for
+       long-running processes that keep the labels for a long time (see report_daemon.py). Defaults to False.
+    Returns:
+    - list: A list of dictionaries, each containing the 'wikiurl' and its corresponding 'languageLabel', see query_languages_dict().
+    Raises:
+    - RuntimeError: In offline mode, if there are no cached labels for 'lang'.
+    """
+    cached = _load_languages_cache(cache_dir, lang)
+    if offline:
+        if cached is None:
+            raise RuntimeError(f"Offline mode: no cached language labels for '{lang}' in {cache_dir}")
+        return cached['bindings']
+    if cached is None:
+        return _refresh_languages_cache(cache_dir, lang)
+    if time.time() - cached.get('fetched', 0) > ttl and wait:
+        try:
+            return _refresh_languages_cache(cache_dir, lang)
+        except Exception as e:
+            print(f"Could not refresh the cached language labels for '{lang}', keeping the stale ones: {e}")
+    elif time.time() - cached.get('fetched', 0) > ttl:
+        with _revalidating_languages_lock:
+            start = (cache_dir, lang) not in _revalidating_languages
+            _revalidating_languages.add((cache_dir, lang))
+        if start:  # A daemon thread, so a short run does not wait for the query at exit
+            threading.Thread(target=_revalidate_languages_cache, args=(cache_dir, lang), daemon=True).start()
+    return cached['bindings']
+
+# Wikipedias whose (legacy) subdomain differs from the language code used on Wikidata, or vice versa.
+# Both directions are added to the language index, so either form of the project code resolves to the same label.
+LANGUAGE_DOMAIN_ALIASES = {
+    'be-x-old.wikipedia': 'be-tarask.wikipedia',
+    'zh-min-nan.wikipedia': 'nan.wikipedia',
+    'zh-yue.wikipedia': 'yue.wikipedia',
+    'zh-classical.wikipedia': 'lzh.wikipedia',
+    'bat-smg.wikipedia': 'sgs.wikipedia',
+    'fiu-vro.wikipedia': 'vro.wikipedia',
+    'roa-rup.wikipedia': 'rup.wikipedia',
+    'map-bms.wikipedia': 'bms.wikipedia',
+    'no.wikipedia': 'nb.wikipedia',
+}
+
+LANGUAGE_NOT_FOUND = 'get_full_language_name: Full language name not found'
+
+
+def normalize_language_domain(key):
+    """
+    Normalizes a Wikimedia project code as used by GLAMorous (e.g. 'nds_nl.wikipedia') to the domain form used
+    in the Wikipedia URLs on Wikidata (e.g. 'nds-nl.wikipedia').
+    """
+    return key.replace("_", "-")
+
+
+def build_language_index(ldictlist):
+    """
+    Compiles the list of language labels returned by get_languages_dict() into a language index: a plain dictionary
+    mapping the normalized domain of each Wikipedia (e.g. 'nds-nl.wikipedia') to its full language name.
+    The index is built once and can then be reused for any number of lookups, each of which is a single dictionary hit.
+    Being a plain dictionary of strings, it can also be stored as JSON.
+    If a domain occurs more than once in 'ldictlist', the first label is used, as in the linear scan this index replaces.
+    Legacy and current domains listed in LANGUAGE_DOMAIN_ALIASES (such as 'be-x-old.wikipedia' and 'be-tarask.wikipedia')
+    are added as aliases of each other.
+    Parameters:
+    - ldictlist (list): A list of dictionaries, where each dictionary contains 'wikiurl' and 'languageLabel' keys.
+    Returns:
+    - dict: The language index, {domain: full language name}.
+    Example:
+    >>> build_language_index([{'wikiurl': {'value': 'https://nds-nl.wikipedia.org/'}, 'languageLabel': {'value': 'Low Saxon'}}])
+    {'nds-nl.wikipedia': 'Low Saxon'}
+    """
+    language_index = {}
+    for lang in ldictlist:
+        wiki_url = lang.get('wikiurl', {}).get('value', '')
+        domain = wiki_url.split("//")[-1].split(".org")[0]
+        language_index.setdefault(domain, lang.get('languageLabel', {}).get('value', 'XX'))
+    for legacy_domain, current_domain in LANGUAGE_DOMAIN_ALIASES.items():
+        if current_domain in language_index:
+            language_index.setdefault(legacy_domain, language_index[current_domain])
+        elif legacy_domain in language_index:
+            language_index[current_domain] = language_index[legacy_domain]
+    return language_index
+
+
 def get_full_language_name(ldictlist, key):
     """
     Extracts the full language name corresponding to a given language code/key from a dictionary containing language data.
-    The function searches through a dictionary where each entry represents a language, containing both a Wikipedia
-    project URL ('wikiurl') and a language label ('languageLabel'). It matches the given language code (key) against
-    the domain part of each 'wikiurl' to find the corresponding full language name.
+    The function matches the given language code (key) against the domain part of the Wikipedia project URLs ('wikiurl')
+    to find the corresponding full language name ('languageLabel').
     Parameters:
-    - ldictlist (list): A list of dictionaries, where each dictionary contains 'wikiurl' and 'languageLabel' keys.
-                       The 'wikiurl' should contain the URL of a Wikipedia project, and 'languageLabel' should contain
-                       the full language name.
+    - ldictlist (list or dict): Either a language index as returned by build_language_index() (fast), or a list of
+                       dictionaries, where each dictionary contains 'wikiurl' and 'languageLabel' keys. In the latter case,
+                       the list is compiled into a language index first, so callers doing multiple lookups should
+                       build the index once themselves.
     - key (str): The language code to search for, which may use underscores ('_') instead of dashes ('-') as found in the URLs.
     Returns:
-    - str: The full language name associated with the given language code if found, or 'Full language name not found' if not found.
+    - str: The full language name associated with the given language code if found, or LANGUAGE_NOT_FOUND if not found.
 
     Example:
     >>> ldictlist = [
     ...     {'wikiurl': {'value': 'https://en.wikipedia.org/'}, 'languageLabel': {'value': 'English'}},
     ...     {'wikiurl': {'value': 'https://nds-nl.wikipedia.org/'}, 'languageLabel': {'value': 'Low Saxon'}},
     ... ]
-    >>> print(extract_full_language_name(ldictlist, 'nds_nl.wikipedia'))
+    >>> print(get_full_language_name(build_language_index(ldictlist), 'nds_nl.wikipedia'))
     'Low Saxon'
     """
-    normalized_key = key.replace("_", "-")
-    for lang in ldictlist:
-        wiki_url = lang.get('wikiurl', {}).get('value', '')
-        domain = wiki_url.split("//")[-1].split(".org")[0]
-        if domain == normalized_key:
-            full_language = lang.get('languageLabel', {}).get('value', 'XX')
-            return full_language
-    return 'get_full_language_name: Full language name not found'
+    language_index = ldictlist if isinstance(ldictlist, dict) else build_language_index(ldictlist)
+    return language_index.get(normalize_language_domain(key), LANGUAGE_NOT_FOUND)
 
 def add_full_language_names_to_dict(dso_pdict, ldictlist):
     """
@@ -441,15 +1191,17 @@ def add_full_language_names_to_dict(dso_pdict, ldictlist):
     Parameters:
     - dso_pdict (shorthand for 'deduped_sorted_ordered_projectsdict') (dict): A dictionary with Wikimedia project
       codes as keys (e.g., 'en.wikipedia') and lists of URLs as values.
-    - ldictlist (list): A list of dictionaries, where each dictionary contains 'wikiurl' and 'languageLabel' keys
-      with the URL of a Wikimedia project and the full language name, respectively.
+    - ldictlist (list or dict): A list of dictionaries, where each dictionary contains 'wikiurl' and 'languageLabel' keys
+      with the URL of a Wikimedia project and the full language name, respectively, or a language index compiled
+      from such a list by build_language_index().
     This function updates dso_pdict by adding a new key-value pair ('fullLanguageName': <name>)
     to each project entry, containing the full language name associated with the project's language code.
     Note: If the full language name cannot be found, the entry for that project is skipped with a warning.
     """
+    language_index = ldictlist if isinstance(ldictlist, dict) else build_language_index(ldictlist)
     for key in list(dso_pdict.keys()):
-        fulllang = get_full_language_name(ldictlist, key)  # Assuming this function returns 'XX' if not found
-        if fulllang == 'get_full_language_name: Full language name not found':
+        fulllang = get_full_language_name(language_index, key)
+        if fulllang == LANGUAGE_NOT_FOUND:
             print(f"Warning: Full language name not found for key '{key}'. Skipping...")
             continue
         dso_pdict[key] = {
@@ -523,7 +1275,32 @@ def initialize_articles_pictures_dict(sorted_projects_dict):
     return init_articles_pictures_dict
 
 
-def add_image_to_article(articles_pictures_dict, project, wptitle, picture_name):
+def build_article_index(articles_pictures_dict):
+    """
+    Builds a per-project hash index on the articles in an articles and pictures dictionary, so an article entry can be
+    looked up by its URL in constant time, rather than by scanning the list of articles of its project.
+    Parameters:
+    - articles_pictures_dict (dict): A dictionary as returned by initialize_articles_pictures_dict().
+    Returns:
+    - dict: A dictionary with the project codes as keys. Each key maps to a dictionary of article URLs ('wikiURL'),
+      each of which maps to a tuple of 1) the article entry itself and 2) a set of the image names in its 'imagesInArticle'.
+      Together with the 'imagesInArticle' list, this set forms an ordered set of images for that article.
+    Example:
+        {'en.wikipedia': {
+            'https://en.wikipedia.org/wiki/Python_(programming_language)': (
+                {'wikiURL': 'https://en.wikipedia.org/wiki/Python_(programming_language)', 'imagesInArticle': ['logo.png']},
+                {'logo.png'})}}
+    """
+    return {
+        project_code: {
+            article['wikiURL']: (article, set(article['imagesInArticle']))
+            for article in project_info.get('articles', [])
+        }
+        for project_code, project_info in articles_pictures_dict.items()
+    }
+
+
+def add_image_to_article(articles_pictures_dict, project, wptitle, picture_name, article_index=None):
     """
     Helper function that adds an image to an article within a specific project in the articles and pictures dictionary.
     If the article already exists, the image name is appended to the 'imagesInArticle' list of that article,
@@ -540,6 +1317,9 @@ def add_image_to_article(articles_pictures_dict, project, wptitle, picture_name)
       and identify the correct article entry within the project.
     - picture_name (str): The name of the image to be added to the article's entry. This is the file name
       of the image as it appears in the Wikimedia project.
+    - article_index (dict, optional): An index as returned by build_article_index(), which is kept up to date by this
+      function. If given, the article and the image are looked up in constant time. If not given, the articles of the
+      project are scanned linearly.
     Returns:
     - None: This function modifies 'articles_pictures_dict' in place and does not return a value.
 
@@ -550,6 +1330,21 @@ def add_image_to_article(articles_pictures_dict, project, wptitle, picture_name)
     If the article does not exist, it creates a new entry with 'logo.png' as the first image.
     """
     wiki_url = f"https://{project}.org/wiki/{wptitle.replace(' ', '_')}"
+
+    if article_index is not None:
+        project_index = article_index.setdefault(project, {})
+        indexed_article = project_index.get(wiki_url)
+        if indexed_article is None:
+            article_entry = {'wikiURL': wiki_url, 'imagesInArticle': [picture_name]}
+            articles_pictures_dict[project]['articles'].append(article_entry)
+            project_index[wiki_url] = (article_entry, {picture_name})
+        else:
+            article_entry, images_in_article = indexed_article
+            if picture_name not in images_in_article:
+                images_in_article.add(picture_name)
+                article_entry['imagesInArticle'].append(picture_name)
+        return
+
     project_articles = articles_pictures_dict.get(project, {}).get('articles', [])
     article_entry = next((article for article in project_articles if article['wikiURL'] == wiki_url), None)
 
@@ -595,8 +1390,12 @@ def add_images_to_dict(sorted_projects_dict, pictures):
 
     Calling `add_images_to_dict(sorted_projects_dict, pictures)` would add 'PythonLogo.png' to the 'imagesInArticle' list
     for the 'Python_(programming_language)' article within the 'en.wikipedia' project.
+
+    Note: Articles are looked up through a per-project URL index (see build_article_index()), so this function runs in
+    time linear in the number of (image, project, page) combinations, rather than quadratic.
     """
     articles_pictures_dict = initialize_articles_pictures_dict(sorted_projects_dict)
+    article_index = build_article_index(articles_pictures_dict)
 
     for entry in pictures:
         picture_name = entry.get('name', 'Unknown Image Name')
@@ -610,7 +1409,7 @@ def add_images_to_dict(sorted_projects_dict, pictures):
                 titles = [titles] if isinstance(titles, dict) else titles  # Normalize titles to list for consistent processing
                 for title in titles:
                     wptitle = title.get('title', 'Unknown Title')
-                    add_image_to_article(articles_pictures_dict,project_code, wptitle, picture_name)
+                    add_image_to_article(articles_pictures_dict, project_code, wptitle, picture_name, article_index)
 
     # Example print to check the outcome
     # for project, info in articles_pictures_dict.items():
@@ -621,6 +1420,9 @@ def add_images_to_dict(sorted_projects_dict, pictures):
     return articles_pictures_dict
 
 
+IMAGE_SEPARATOR = ' -- '  # Separator of the image names in the 'Images' column of the report DataFrame
+
+
 def convert_to_dataframe(articles_pictures_dict):
     """
     Converts the articles and pictures dictionary into a pandas DataFrame.
@@ -634,7 +1436,11 @@ def convert_to_dataframe(articles_pictures_dict):
     Returns:
     - DataFrame: A pandas DataFrame with columns for 'Project Code', 'Full Language Name', 'Article URL', 'ArticleTitle,
      'NumberOfImages' and 'Images'. Each row represents an article, including its associated project and images.
+    Note: Instead of an articles and pictures dictionary, a UsageMatrix (see usage_matrix.py) can be passed as well.
     """
+    if hasattr(articles_pictures_dict, 'to_dataframe'):  # A UsageMatrix
+        return articles_pictures_dict.to_dataframe()
+
     data = []  # Initialize an empty list to hold row data for the DataFrame
 
     for project_code, project_info in articles_pictures_dict.items():
@@ -643,7 +1449,7 @@ def convert_to_dataframe(articles_pictures_dict):
             wiki_url = article.get('wikiURL', 'Unknown URL')
             images = article.get('imagesInArticle', [])
             # Assuming you want to keep the images list as a string of comma-separated values
-            images_str = ' -- '.join(images)
+            images_str = IMAGE_SEPARATOR.join(images)
             data.append({
                 'ProjectCode': project_code,
                 'FullLanguageName': full_language_name,
@@ -658,6 +1464,103 @@ def convert_to_dataframe(articles_pictures_dict):
     return df
 
 
+def build_project_articles(images, projects):
+    """
+    The single traversal of the image data of build_projects_dataframe(): collects, per project, the articles and the
+    images used in them, using dicts as insertion-ordered sets. This is the normalized form of the usage data, which
+    is also stored as a snapshot by incremental.py, to find what has changed since the previous run.
+    Parameters:
+    - images (iterable): The image records, see iter_image_usages().
+    - projects (list): A list of Wikimedia project names (e.g. 'fr.wikipedia'). Only usages in these projects are
+                       taken into account.
+    Returns:
+    - dict: {project: {article URL: {image name: None}}}, with the images of an article in the order in which they
+            occur in the image data.
+    """
+    project_articles = {project: {} for project in projects}
+    for picture_name, project_code, wiki_url in iter_image_usages(images, project_articles):
+        project_articles[project_code].setdefault(wiki_url, {})[picture_name] = None
+    return project_articles
+
+
+def order_projects(project_articles, language_index):
+    """
+    Orders the projects of build_project_articles() by the descending number of unique articles, and then alphabetically
+    by full language name. Projects for which no full language name can be found are skipped with a warning.
+    Parameters:
+    - project_articles (dict): As returned by build_project_articles().
+    - language_index (dict): A language index, as returned by build_language_index().
+    Returns:
+    - list: A list of (project code, full language name) tuples, in report order.
+    """
+    full_language_names = {}
+    for project_code in project_articles:
+        fulllang = get_full_language_name(language_index, project_code)
+        if fulllang == LANGUAGE_NOT_FOUND:
+            print(f"Warning: Full language name not found for key '{project_code}'. Skipping...")
+            continue
+        full_language_names[project_code] = fulllang
+    ordered_projects = sorted(full_language_names,
+                              key=lambda project: (-len(project_articles[project]), full_language_names[project]))
+    return [(project_code, full_language_names[project_code]) for project_code in ordered_projects]
+
+
+def project_articles_to_dataframe(project_articles, ldictlist, ordered_projects=None):
+    """
+    Converts the output of build_project_articles() into the DataFrame of build_projects_dataframe().
+    Parameters:
+    - project_articles (dict): As returned by build_project_articles().
+    - ldictlist (list or dict): The language labels returned by get_languages_dict(), or a language index compiled
+                       from them by build_language_index().
+    - ordered_projects (list, optional): The (project code, full language name) tuples to include, in report order,
+                       as returned by order_projects(). Defaults to all projects of 'project_articles'.
+    Returns:
+    - DataFrame: A pandas DataFrame with the same columns as returned by convert_to_dataframe().
+    """
+    if ordered_projects is None:
+        language_index = ldictlist if isinstance(ldictlist, dict) else build_language_index(ldictlist)
+        ordered_projects = order_projects(project_articles, language_index)
+
+    columns = {'ProjectCode': [], 'FullLanguageName': [], 'ArticleURL': [], 'ArticleTitle': [], 'Images': [], 'NumberOfImages': []}
+    for project_code, full_language_name in ordered_projects:
+        articles = project_articles[project_code]
+        for wiki_url in sorted(articles):
+            images_in_article = articles[wiki_url]
+            columns['ProjectCode'].append(project_code)
+            columns['FullLanguageName'].append(full_language_name)
+            columns['ArticleURL'].append(wiki_url)
+            columns['ArticleTitle'].append(wiki_url.split('/wiki/')[1])
+            columns['Images'].append(IMAGE_SEPARATOR.join(images_in_article))
+            columns['NumberOfImages'].append(len(images_in_article))
+    return pd.DataFrame(columns, columns=list(columns))
+
+
+def build_projects_dataframe(images, projects, ldictlist):
+    """
+    Single-pass equivalent of steps 1-7 in GLAMorousToHTML.main(): transform_imagekeybased_to_wikiprojectkeybased(),
+    dedup_sort_order_projectsdict(), add_full_language_names_to_dict(), sort_projects_by_urlcount_and_fulllanguage_name(),
+    add_images_to_dict() and convert_to_dataframe().
+    The image data is traversed only once, building a project -> article -> images structure directly
+    (see build_project_articles()), from which the final sorted DataFrame is produced (see project_articles_to_dataframe()).
+    No intermediate copies of the nested dictionaries are made, and since the images are read only once, they can come
+    straight from a (single-use) GlamorousXMLStream.
+    The output is identical to that of the step-by-step functions:
+    - Projects are ordered by the descending number of unique articles, and then alphabetically by full language name.
+      Projects for which no full language name can be found are skipped with a warning.
+    - Within a project, articles are sorted alphabetically by URL.
+    - Within an article, images are listed without duplicates, in the order in which they occur in the image data.
+    Parameters:
+    - images (iterable): The image records, see iter_image_usages().
+    - projects (list): A list of Wikimedia project names (e.g. 'fr.wikipedia'), as returned by filter_wikiprojects().
+                       Only usages in these projects are taken into account.
+    - ldictlist (list or dict): The language labels returned by get_languages_dict(), or a language index compiled
+                       from them by build_language_index().
+    Returns:
+    - DataFrame: A pandas DataFrame with the same columns as returned by convert_to_dataframe().
+    """
+    return project_articles_to_dataframe(build_project_articles(images, projects), ldictlist)
+
+
 #============================================================
 
 def read_excel_to_df(excel_file: str, sheet_name: Optional[str] = None) -> DataFrame:
@@ -688,12 +1591,284 @@ def read_excel_to_df(excel_file: str, sheet_name: Optional[str] = None) -> DataF
         raise Exception(f"An error occurred while reading the Excel file: {excel_file}.") from e
 
 
-def write_df_to_excel(df: pd.DataFrame, datadir: str, excelpath: str, sheetname: str) -> None:
+# Columnar sidecar cache of Excel reports, see read_excel_cached()
+EXCEL_CACHE_DIR = os.path.join(LANGUAGES_CACHE_DIR, 'excel')
+EXCEL_CACHE_VERSION = 2  # Increase when the way workbooks are converted changes, to invalidate existing sidecar files
+EXCEL_SIDECAR_PATTERN = re.compile(r'v(\d+)_([0-9a-f]{64})_\w+\.parquet')
+_excel_cache_indexes = {}  # In-memory copies of the file hash indexes, keyed by cache directory
+_excel_cache_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(lock_path: str):
+    """
+    Holds an exclusive lock on 'lock_path' (created if necessary), shared by all processes, e.g. the worker processes
+    of GLAMorousToHTML_bulk.py. Falls back to no locking on platforms without fcntl or msvcrt.
+    """
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            try:
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            except ImportError:
+                pass
+        yield  # The lock is released when the file is closed
+
+
+def _excel_cache_index(cache_dir: str) -> dict:
+    """Returns the file hash index of 'cache_dir', {absolute path: {'size', 'mtime_ns', 'sha256'}}, loading it on first use."""
+    with _excel_cache_lock:
+        if cache_dir not in _excel_cache_indexes:
+            index_path = os.path.join(cache_dir, 'index.json')
+            index = load_dict(index_path) if os.path.exists(index_path) else None
+            _excel_cache_indexes[cache_dir] = index if isinstance(index, dict) else {}
+        return _excel_cache_indexes[cache_dir]
+
+
+def file_content_hash(file_path: str, cache_dir: str = EXCEL_CACHE_DIR) -> str:
+    """
+    Returns the SHA-256 hash of the contents of a file. The hash is remembered in a small index in 'cache_dir', together
+    with the size and modification time of the file, so an unchanged file is not read and hashed again.
+    Parameters:
+    - file_path (str): The file to hash.
+    - cache_dir (str, optional): The directory of the index. Defaults to EXCEL_CACHE_DIR.
+    Returns:
+    - str: The hexadecimal SHA-256 hash.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    index = _excel_cache_index(cache_dir)
+    entry = index.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    with _excel_cache_lock, _file_lock(os.path.join(cache_dir, 'index.lock')):
+        # Merge with the index on disk, which other processes may have updated since it was loaded
+        index_path = os.path.join(cache_dir, 'index.json')
+        on_disk = load_dict(index_path) if os.path.exists(index_path) else None
+        index.update(on_disk if isinstance(on_disk, dict) else {})
+        index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        for stale_path in [indexed for indexed in index if not os.path.exists(indexed)]:
+            del index[stale_path]
+        save_dict_atomic(index_path, index)
+        _evict_excel_sidecars(cache_dir, {entry['sha256'] for entry in index.values()})
+    return digest.hexdigest()
+
+
+def _evict_excel_sidecars(cache_dir: str, hashes: set) -> None:
+    """
+    Removes the sidecar files in 'cache_dir' of workbooks that have changed or no longer exist (whose hash is not in
+    'hashes'), and those of earlier versions of EXCEL_CACHE_VERSION.
+    """
+    for name in os.listdir(cache_dir):
+        match = EXCEL_SIDECAR_PATTERN.fullmatch(name)
+        if match and (int(match.group(1)) != EXCEL_CACHE_VERSION or match.group(2) not in hashes):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def read_excel_cached(excel_file: str, columns: Optional[List[str]] = None, sheet_name: Optional[str] = None,
+                      cache_dir: str = EXCEL_CACHE_DIR) -> DataFrame:
+    """
+    Fast, cached alternative to read_excel_to_df(), for repeatedly reading the Excel reports in the 'data/' folder.
+    On the first read of a workbook, its contents are stored in a Parquet sidecar file in 'cache_dir', keyed by the
+    SHA-256 hash of the workbook contents (see file_content_hash()). Later reads of the same workbook are served
+    from the sidecar file, reading only the requested columns, until the contents of the workbook change. The sidecar
+    files of workbooks that have changed, or have been removed, are deleted whenever a workbook is hashed again.
+    Parameters:
+    - excel_file (str): The path to the Excel file to read.
+    - columns (list, optional): The columns to read, e.g. ['ProjectCode', 'ArticleURL']. Defaults to all columns.
+    - sheet_name (str, optional): The name of the sheet to read. If None (default), the first sheet, concatenated with
+      the other sheets that write_df_to_excel() wrote along with it: its overflow sheets ('<sheet>_2', '<sheet>_3', ...),
+      or the other per-project sheets of a workbook written with shard_by='ProjectCode'. Sheets that other scripts
+      added to the workbook, such as '<sheet>_wd', are not read, see report_sheet_names().
+    - cache_dir (str, optional): The directory of the sidecar files. Defaults to EXCEL_CACHE_DIR ('cache/excel').
+    Returns:
+    - DataFrame: A pandas DataFrame with the (requested columns of the) data of the workbook.
+    Raises:
+    - FileNotFoundError: If the Excel file cannot be found at the specified path.
+    - ValueError: If the specified sheet name or columns do not exist in the Excel file.
+    Note: The sidecar files require pyarrow. If it is not installed, the workbook is read with pandas every time.
+    """
+    if not os.path.exists(excel_file):
+        raise FileNotFoundError(f"The file {excel_file} cannot be found.")
+    try:
+        _import_pyarrow()
+    except ImportError:
+        return _read_excel_sheets(excel_file, sheet_name, columns)
+
+    sheet_key = 'report' if sheet_name is None else hashlib.sha256(sheet_name.encode('utf-8')).hexdigest()[:16]
+    sidecar_path = os.path.join(cache_dir, f"v{EXCEL_CACHE_VERSION}_{file_content_hash(excel_file, cache_dir)}_{sheet_key}.parquet")
+    if not os.path.exists(sidecar_path):
+        df = _read_excel_sheets(excel_file, sheet_name)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, sidecar_path)
+        except Exception as e:  # E.g. columns with mixed types that Parquet cannot store: just do not cache
+            os.remove(tmp_path)
+            print(f"Could not cache {excel_file} as Parquet: {e}")
+            return df[columns] if columns is not None else df
+        if columns is None:
+            return df
+    try:
+        return pd.read_parquet(sidecar_path, columns=columns)
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"Columns {columns} do not all exist in the file: {excel_file}.") from e
+
+
+PROJECT_SHEET_PATTERN = re.compile(r'[a-z0-9_-]+\.wik[a-z]+(_\d+)?')  # E.g. 'nds_nl.wikipedia', or its overflow 'en.wikipedia_2'
+
+
+def report_sheet_names(sheet_names: List[str]) -> List[str]:
+    """
+    Returns the sheets of a workbook that hold the report written by write_df_to_excel(): the first sheet and its
+    numbered overflow sheets, or, if the report was written with one sheet per project (shard_by='ProjectCode'), all
+    per-project sheets. Other sheets, such as the '<sheet>_wd' and '<sheet>_wd_bak' sheets of the Wikidata scripts,
+    are left out.
+    Parameters:
+    - sheet_names (list): The sheet names of the workbook, in workbook order.
+    Returns:
+    - list: The names of the report sheets.
+    """
+    if not sheet_names:
+        return []
+    first = sheet_names[0]
+    if PROJECT_SHEET_PATTERN.fullmatch(first):
+        return [name for name in sheet_names if PROJECT_SHEET_PATTERN.fullmatch(name)]
+    names, number = [first], 2
+    while True:  # The overflow sheet names of excel_shards()
+        suffix = f"_{number}"
+        overflow = first[:EXCEL_MAX_SHEETNAME_LENGTH - len(suffix)] + suffix
+        if overflow not in sheet_names:
+            return names
+        names.append(overflow)
+        number += 1
+
+
+def _read_excel_sheets(excel_file: str, sheet_name: Optional[str] = None, columns: Optional[List[str]] = None) -> DataFrame:
+    """
+    Reads one sheet of a workbook, or if 'sheet_name' is None the report sheets (see report_sheet_names()) concatenated,
+    optionally only some columns.
+    """
+    try:
+        if sheet_name is None:
+            with pd.ExcelFile(excel_file) as workbook:
+                sheets = pd.read_excel(workbook, sheet_name=report_sheet_names(workbook.sheet_names), usecols=columns)
+        else:
+            sheets = pd.read_excel(excel_file, sheet_name=sheet_name, usecols=columns)
+    except ValueError as ve:
+        raise ValueError(f"The sheet '{sheet_name}' or columns {columns} do not exist in the file: {excel_file}.") from ve
+    if isinstance(sheets, dict):
+        return pd.concat(sheets.values(), ignore_index=True) if sheets else pd.DataFrame()
+    return sheets
+
+
+EXCEL_MAX_ROWS = 1048576  # Maximum number of rows of an Excel sheet, including the header row
+EXCEL_MAX_SHEETNAME_LENGTH = 31
+
+
+def _excel_sheet_name(name: str, used_names: set) -> str:
+    """Makes a valid, unique Excel sheet name: at most 31 characters, without the characters []:*?/\\."""
+    name = ''.join('_' if char in '[]:*?/\\' else char for char in name)[:EXCEL_MAX_SHEETNAME_LENGTH] or 'Sheet'
+    candidate, number = name, 1
+    while candidate.lower() in used_names:
+        number += 1
+        suffix = f"_{number}"
+        candidate = name[:EXCEL_MAX_SHEETNAME_LENGTH - len(suffix)] + suffix
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def excel_shards(df: pd.DataFrame, sheetname: str, shard_by: Optional[str] = None, max_rows: int = EXCEL_MAX_ROWS):
+    """
+    Splits a DataFrame into parts that each fit in one Excel sheet.
+    Parameters:
+    - df (pd.DataFrame): The DataFrame to split.
+    - sheetname (str): The base sheet name.
+    - shard_by (str, optional): A column name, such as 'ProjectCode', to write one sheet per value of that column,
+      named after the value. If None (default), the DataFrame is written to one sheet named 'sheetname', with numbered
+      overflow sheets ('sheetname_2', 'sheetname_3', ...) if it does not fit in one sheet.
+    - max_rows (int, optional): The maximum number of rows per sheet, including the header row. Defaults to Excel's limit.
+    Returns:
+    - list: A list of (sheet name, DataFrame) tuples. A part that is too large for one sheet is split into overflow sheets.
+    """
+    rows_per_sheet = max_rows - 1  # Leave room for the header row
+    if shard_by is None:
+        groups = [(sheetname, df)]
+    else:
+        groups = [(str(value), group) for value, group in df.groupby(shard_by, sort=False)]
+    used_names, shards = set(), []
+    for name, group in groups:
+        for number, start in enumerate(range(0, max(len(group), 1), rows_per_sheet), start=1):
+            shards.append((_excel_sheet_name(name if number == 1 else f"{name}_{number}", used_names),
+                           group.iloc[start:start + rows_per_sheet]))
+    return shards
+
+
+def _write_excel_streaming(shards, excelpath: str) -> None:
+    """
+    Writes (sheet name, DataFrame) tuples to an Excel file row by row, in constant memory: with xlsxwriter in
+    'constant_memory' mode, or with an openpyxl write-only workbook if xlsxwriter is not installed.
+    As with pandas' openpyxl writer, strings are written as plain strings (never as formulas or hyperlinks), and the
+    header row is bold.
+    """
+    try:
+        import xlsxwriter  # Optional dependency, only needed for the fast mode
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(excelpath, {'constant_memory': True, 'strings_to_formulas': False,
+                                                   'strings_to_urls': False, 'strings_to_numbers': False})
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+        try:
+            for name, shard in shards:
+                worksheet = workbook.add_worksheet(name)
+                worksheet.write_row(0, 0, [str(column) for column in shard.columns], header_format)
+                for row_number, row in enumerate(shard.itertuples(index=False, name=None), start=1):
+                    worksheet.write_row(row_number, 0, row)
+        finally:
+            workbook.close()
+    else:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        workbook = Workbook(write_only=True)
+        for name, shard in shards:
+            worksheet = workbook.create_sheet(name)
+            header = []
+            for column in shard.columns:
+                cell = WriteOnlyCell(worksheet, value=str(column))
+                cell.font = Font(bold=True)
+                header.append(cell)
+            worksheet.append(header)
+            for row in shard.itertuples(index=False, name=None):
+                worksheet.append(row)
+        workbook.save(excelpath)
+
+
+def write_df_to_excel(df: pd.DataFrame, datadir: str, excelpath: str, sheetname: str, fast: bool = False,
+                      shard_by: Optional[str] = None, max_rows: int = EXCEL_MAX_ROWS) -> None:
     """
     Writes the given pandas DataFrame to an Excel file in the specified directory with comprehensive error handling.
     This function ensures the specified 'data' directory exists, creating it if necessary. It then writes the DataFrame
     to an Excel file at the specified path, using a specified sheet name. Errors during the writing process are caught
     and reported.
+    DataFrames with more rows than fit in one Excel sheet (1,048,576 including the header) are split over multiple
+    sheets automatically, see excel_shards().
     Parameters:
     - df (pd.DataFrame): The DataFrame to be written to the Excel file.
     - datadir (str): The directory path where the Excel file will be saved. This function will attempt to create
@@ -702,6 +1877,12 @@ def write_df_to_excel(df: pd.DataFrame, datadir: str, excelpath: str, sheetname:
                        should reflect the intended location within the 'datadir'.
     - sheetname (str): The name of the Excel sheet where the DataFrame will be written. If the sheet already exists,
                        it will be overwritten.
+    - fast (bool, optional): If True, the workbook is streamed to disk row by row in constant memory (with xlsxwriter,
+                       or openpyxl in write-only mode if xlsxwriter is not installed), instead of being built in memory
+                       by pandas and openpyxl. This is many times faster for large DataFrames. Defaults to False.
+    - shard_by (str, optional): A column name, such as 'ProjectCode', to write one sheet per value of that column.
+                       Defaults to None: one sheet, with numbered overflow sheets if needed.
+    - max_rows (int, optional): The maximum number of rows per sheet, including the header row. Defaults to Excel's limit.
     Returns:
     - None: The function's primary purpose is to write data to an Excel file and does not return a value.
     Raises:
@@ -722,64 +1903,281 @@ def write_df_to_excel(df: pd.DataFrame, datadir: str, excelpath: str, sheetname:
         logging.error(f"Failed to create directory {datadir}: {e}")
         return
     try:
-        # Write (in append mode) the DataFrame to an Excel file with the specified sheet name
-        #TODO: Create toggle for these two modes ('a' and 'w')
-        #with pd.ExcelWriter(excelpath, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-        with pd.ExcelWriter(excelpath, engine='openpyxl', mode='w') as writer:
-            df.to_excel(writer, index=False, sheet_name=sheetname)
-        logging.info(f"Successfully wrote sheet '{sheetname}' to '{excelpath}'.")
+        shards = excel_shards(df, sheetname, shard_by, max_rows)
+        if fast:
+            _write_excel_streaming(shards, excelpath)
+        else:
+            # Write (in append mode) the DataFrame to an Excel file with the specified sheet name
+            #TODO: Create toggle for these two modes ('a' and 'w')
+            #with pd.ExcelWriter(excelpath, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+            with pd.ExcelWriter(excelpath, engine='openpyxl', mode='w') as writer:
+                for name, shard in shards:
+                    shard.to_excel(writer, index=False, sheet_name=name)
+        if len(shards) > 1:
+            logging.info(f"Successfully wrote {len(shards)} sheets ('{shards[0][0]}', ...) to '{excelpath}'.")
+        else:
+            logging.info(f"Successfully wrote sheet '{sheetname}' to '{excelpath}'.")
     except Exception as e:
         logging.error(f"An occurred while writing to Excel: {e}")
 
-def fetch_labels_for_qids(qids: Union[str, List[str]], language_code: str = 'en') -> Optional[Union[str, List[str]]]:
+
+# Columnar report output, see write_df_to_parquet() and write_report_files()
+REPORT_FORMATS = ('xlsx', 'parquet', 'feather', 'csv.gz')
+DICTIONARY_ENCODED_COLUMNS = ['ProjectCode', 'FullLanguageName']  # Few distinct values, repeated on every row
+REPORT_ROW_GROUP_SIZE = 100000  # Rows per Parquet row group / Arrow record batch
+
+
+def _import_pyarrow():
+    """Imports pyarrow, an optional dependency that is only needed for the Parquet and Feather output."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.feather
+    except ImportError as e:
+        raise ImportError("Parquet and Feather output require pyarrow, install it with 'pip install pyarrow'.") from e
+    return pyarrow
+
+
+def iter_arrow_batches(df: pd.DataFrame, row_group_size: int = REPORT_ROW_GROUP_SIZE):
     """
-    Fetches labels for given Wikidata QID(s) in the specified language using a single API call.
-    This function supports fetching labels for both a single QID and multiple QIDs by utilizing the Wikidata API's
-    capability to process multiple QIDs separated by '|'. The function returns the label(s) in the specified language.
+    Converts a report DataFrame into Arrow record batches of at most 'row_group_size' rows, one at a time, so the
+    DataFrame never has to be copied into Arrow memory as a whole.
+    The columns in DICTIONARY_ENCODED_COLUMNS are dictionary-encoded, with one dictionary shared by all batches
+    (as required by the Arrow IPC/Feather file format). Readers get them back as pandas categoricals.
+    Parameters:
+    - df (pd.DataFrame): The DataFrame, as returned by convert_to_dataframe() or build_projects_dataframe().
+    - row_group_size (int, optional): The maximum number of rows per batch.
+    Returns:
+    - tuple: The Arrow schema, and a generator of pyarrow.RecordBatch objects.
+    """
+    pa = _import_pyarrow()
+    encoded = {column: pd.Categorical(df[column]) for column in DICTIONARY_ENCODED_COLUMNS if column in df.columns}
+    dictionaries = {column: pa.array(categorical.categories.astype(str)) for column, categorical in encoded.items()}
+    fields = []
+    for column in df.columns:
+        if column in encoded:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, pa.Array.from_pandas(df[column].iloc[:0]).type))
+    schema = pa.schema(fields)
+
+    def batches():
+        for start in range(0, len(df), row_group_size):
+            stop = min(start + row_group_size, len(df))
+            arrays = []
+            for column in df.columns:
+                if column in encoded:
+                    indices = pa.array(encoded[column].codes[start:stop].astype('int32'))
+                    arrays.append(pa.DictionaryArray.from_arrays(indices, dictionaries[column]))
+                else:
+                    array = pa.Array.from_pandas(df[column].iloc[start:stop], type=schema.field(column).type)
+                    if isinstance(array, pa.ChunkedArray):  # Arrow-backed columns, e.g. read back from Parquet
+                        array = array.combine_chunks()
+                    arrays.append(array)
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    return schema, batches()
 
+
+def write_df_to_parquet(df: pd.DataFrame, path: str, row_group_size: int = REPORT_ROW_GROUP_SIZE,
+                        compression: str = 'zstd') -> None:
+    """
+    Writes a report DataFrame to a Parquet file, one row group at a time, with 'ProjectCode' and 'FullLanguageName'
+    dictionary-encoded (see iter_arrow_batches()). Unlike Excel, Parquet has no row limit, and it can be loaded
+    quickly, and column by column, by pandas, Polars, DuckDB, Spark, ...
     Parameters:
-    - qids (Union[str, List[str]]): A single Wikidata item ID (QID) as a string, or a list of QIDs for which to fetch labels.
-    - language_code (str, optional): The language code for the labels to fetch. Defaults to 'en' (English).
+    - df (pd.DataFrame): The DataFrame to write.
+    - path (str): The path of the Parquet file.
+    - row_group_size (int, optional): The number of rows per row group. Defaults to REPORT_ROW_GROUP_SIZE.
+    - compression (str, optional): The Parquet compression codec. Defaults to 'zstd'.
+    Raises:
+    - ImportError: If pyarrow is not installed.
+    """
+    pa = _import_pyarrow()
+    schema, batches = iter_arrow_batches(df, row_group_size)
+    with pa.parquet.ParquetWriter(path, schema, compression=compression) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
 
-    Returns:
-    - Optional[Union[str, List[str]]]: If a single QID is provided, returns a single label as a string. If multiple QIDs
-      are provided, returns a list of labels corresponding to each QID. Returns None for any QID whose label cannot be retrieved.
 
+def write_df_to_feather(df: pd.DataFrame, path: str, row_group_size: int = REPORT_ROW_GROUP_SIZE) -> None:
+    """
+    Writes a report DataFrame to a Feather (Arrow IPC) file, one record batch at a time, with 'ProjectCode' and
+    'FullLanguageName' dictionary-encoded (see iter_arrow_batches()). Feather files can be memory-mapped by readers.
     Raises:
-    - requests.exceptions.RequestException: If the request to the Wikidata API fails.
-    - ValueError: If there's an issue decoding the JSON response from the API.
+    - ImportError: If pyarrow is not installed.
     """
-    # Convert qids to a single string separated by '|' if it's a list
-    qids_param = '|'.join(qids) if isinstance(qids, list) else qids
+    pa = _import_pyarrow()
+    schema, batches = iter_arrow_batches(df, row_group_size)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema,
+                                                         options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
 
-    api_url = f'https://www.wikidata.org/w/api.php?action=wbgetentities&ids={qids_param}&props=labels&languages={language_code}&format=json'
-    headers = {'Accept': 'application/json', 'User-Agent': 'Wikidata Label Fetcher - by User:OlafJanssen'}
+def write_df_to_csv_gz(df: pd.DataFrame, path: str, row_group_size: int = REPORT_ROW_GROUP_SIZE) -> None:
+    """Writes a report DataFrame to a gzip-compressed CSV file (UTF-8), in chunks of 'row_group_size' rows."""
+    df.to_csv(path, index=False, encoding='utf-8', compression={'method': 'gzip', 'compresslevel': 6}, chunksize=row_group_size)
 
+
+def write_report_files(df: pd.DataFrame, datadir: str, basename: str, sheetname: str,
+                       formats=('xlsx',), fast_excel: bool = False, shard_by: Optional[str] = None) -> List[str]:
+    """
+    Writes a report DataFrame to one or more output formats, e.g. 'data/<basename>.parquet' and 'data/<basename>.xlsx'.
+    Parameters:
+    - df (pd.DataFrame): The DataFrame to write.
+    - datadir (str): The directory to write the files to. It is created if necessary.
+    - basename (str): The file name without extension, e.g. 'ImagesfromtheRijksmuseum_Wikipedia_NS0_02052024'.
+    - sheetname (str): The Excel sheet name, only used for 'xlsx'.
+    - formats (iterable, optional): The formats to write, any of REPORT_FORMATS. Defaults to ('xlsx',).
+    - fast_excel (bool, optional): Use the fast, constant-memory Excel writer, see write_df_to_excel(). Defaults to False.
+    - shard_by (str, optional): Write one Excel sheet per value of this column, see write_df_to_excel(). Defaults to None.
+    Returns:
+    - list: The paths of the files that were written.
+    Raises:
+    - ValueError: If an unknown format is requested.
+    - ImportError: If 'parquet' or 'feather' is requested and pyarrow is not installed.
+    """
+    unknown = [fmt for fmt in formats if fmt not in REPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown report format(s) {unknown}, choose from {list(REPORT_FORMATS)}")
+    os.makedirs(datadir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(datadir, f"{basename}.{fmt}")
+        if fmt == 'xlsx':
+            write_df_to_excel(df, datadir, path, sheetname, fast=fast_excel, shard_by=shard_by)
+        elif fmt == 'parquet':
+            write_df_to_parquet(df, path)
+        elif fmt == 'feather':
+            write_df_to_feather(df, path)
+        elif fmt == 'csv.gz':
+            write_df_to_csv_gz(df, path)
+        paths.append(path)
+    return paths
+
+
+_labels_caches = {}  # In-memory copies of the label cache files, keyed by cache file path
+
+
+def _get_labels_cache(cache_path):
+    """
+    Returns the label cache stored at 'cache_path', loading it from disk on first use in this process.
+    The cache is a dictionary {'<QID>|<language code>': [label, last used timestamp]}.
+    """
+    if cache_path not in _labels_caches:
+        cached = load_dict(cache_path) if os.path.exists(cache_path) else None
+        if isinstance(cached, dict) and cached.get('version') == LABELS_CACHE_VERSION:
+            _labels_caches[cache_path] = cached.get('entries', {})
+        else:
+            _labels_caches[cache_path] = {}
+    return _labels_caches[cache_path]
+
+
+def _save_labels_cache(cache_path, entries, max_entries=LABELS_CACHE_MAX_ENTRIES):
+    """
+    Evicts the least recently used labels if the cache holds more than 'max_entries' labels, and writes it to disk.
+    """
+    if len(entries) > max_entries:
+        for key, _ in sorted(entries.items(), key=lambda item: item[1][1])[:len(entries) - max_entries]:
+            del entries[key]
     try:
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status()  # Raises a HTTPError for bad responses
-        data = response.json()
-
-        if isinstance(qids, list):
-            labels = []
-            for qid in qids:
-                label = data.get('entities', {}).get(qid, {}).get('labels', {}).get(language_code, {}).get('value', None)
-                labels.append(label if label is not None else '')
-            # Filter out None values or replace them with an empty string (or a placeholder)
-            labels_str = " -- ".join(filter(None, labels))
-            print(f'Labels for {" -- ".join(qids)} : {labels_str}')
-            return labels
+        save_dict_atomic(cache_path, {'version': LABELS_CACHE_VERSION, 'entries': entries})
+    except OSError as e:
+        print(f"Could not write the Wikidata label cache {cache_path}: {e}")
+
+
+def _fetch_labels_chunk(qids: List[str], language_code: str) -> dict:
+    """
+    Fetches the labels of at most WBGETENTITIES_MAX_IDS QIDs with a single wbgetentities call.
+    Returns:
+    - dict: {QID: label}, with None for QIDs without a label in the requested language.
+    """
+    fields = {'action': 'wbgetentities', 'ids': '|'.join(qids), 'props': 'labels', 'languages': language_code, 'format': 'json'}
+    data = http_client.get_json('https://www.wikidata.org/w/api.php', fields=fields)
+    entities = data.get('entities', {})
+    return {qid: entities.get(qid, {}).get('labels', {}).get(language_code, {}).get('value', None) for qid in qids}
+
+
+def fetch_labels(qids: List[str], language_code: str = 'en', cache_path: str = LABELS_CACHE_PATH,
+                 max_workers: int = 4) -> dict:
+    """
+    Fetches the labels of any number of Wikidata QIDs in the specified language, as cheaply as possible:
+    1) Duplicate QIDs are requested only once.
+    2) Labels that were fetched before (in this or an earlier run) are taken from a persistent cache, keyed by
+       (QID, language code). When the cache grows beyond LABELS_CACHE_MAX_ENTRIES, the least recently used labels are evicted.
+    3) The remaining QIDs are requested in chunks of WBGETENTITIES_MAX_IDS (50), the maximum the Wikidata API accepts
+       per wbgetentities call. The chunks are requested concurrently, within the rate limits of http_client.py.
+    Parameters:
+    - qids (List[str]): The Wikidata item IDs (QIDs) to fetch labels for.
+    - language_code (str, optional): The language code for the labels to fetch. Defaults to 'en' (English).
+    - cache_path (str, optional): The path of the cache file. Defaults to LABELS_CACHE_PATH.
+    - max_workers (int, optional): The maximum number of concurrent requests. Defaults to 4.
+    Returns:
+    - dict: {QID: label} for every QID in 'qids'. The label is None if the item has no label in the requested language,
+      or if it could not be retrieved (in which case an error message is printed, and the QID is not cached).
+    """
+    cache = _get_labels_cache(cache_path)
+    now = time.time()
+    labels = {}
+    missing = []
+    for qid in dict.fromkeys(qids):
+        cached = cache.get(f"{qid}|{language_code}")
+        if cached is not None:
+            labels[qid] = cached[0]
+            cached[1] = now
         else:
-            label = data.get('entities', {}).get(qids, {}).get('labels', {}).get(language_code, {}).get('value', None)
-            print(f'Label for {qids} : {label}')
-            return label
-
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return None if isinstance(qids, list) else [None] * len(qids)
-    except ValueError as e:
-        print(f"JSON decoding error: {e}")
-        return None if isinstance(qids, list) else [None] * len(qids)
+            missing.append(qid)
+
+    chunks = [missing[i:i + WBGETENTITIES_MAX_IDS] for i in range(0, len(missing), WBGETENTITIES_MAX_IDS)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_fetch_labels_chunk, chunk, language_code): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    chunk_labels = future.result()
+                except (urllib3.exceptions.HTTPError, ValueError) as e:
+                    print(f"Failed to fetch labels for {len(futures[future])} QIDs: {e}")
+                    labels.update(dict.fromkeys(futures[future]))
+                    continue
+                labels.update(chunk_labels)
+                for qid, label in chunk_labels.items():
+                    cache[f"{qid}|{language_code}"] = [label, now]
+
+    if missing:  # Updated 'last used' timestamps of cache hits are saved along with the next new labels
+        _save_labels_cache(cache_path, cache)
+    return labels
+
+
+def fetch_labels_for_qids(qids: Union[str, List[str]], language_code: str = 'en') -> Optional[Union[str, List[str]]]:
+    """
+    Fetches labels for given Wikidata QID(s) in the specified language.
+    This function supports fetching labels for both a single QID and multiple QIDs. It is a thin wrapper around
+    fetch_labels(), so any number of QIDs can be passed (they are requested in chunks of 50, the maximum of the
+    Wikidata API), and labels that were fetched before are taken from the local label cache.
+
+    Parameters:
+    - qids (Union[str, List[str]]): A single Wikidata item ID (QID) as a string, or a list of QIDs for which to fetch labels.
+    - language_code (str, optional): The language code for the labels to fetch. Defaults to 'en' (English).
+
+    Returns:
+    - Optional[Union[str, List[str]]]: If a single QID is provided, returns a single label as a string. If multiple QIDs
+      are provided, returns a list of labels corresponding to each QID. Returns None for a single QID whose label cannot
+      be retrieved, and an empty string for such a QID in a list.
+
+    Note: Request errors (after retrying, see http_client.py) and JSON decoding errors are caught and reported.
+    """
+    if isinstance(qids, list):
+        fetched = fetch_labels(qids, language_code)
+        labels = [fetched.get(qid) or '' for qid in qids]
+        # Filter out None values or replace them with an empty string (or a placeholder)
+        labels_str = " -- ".join(filter(None, labels))
+        print(f'Labels for {" -- ".join(qids)} : {labels_str}')
+        return labels
+    else:
+        label = fetch_labels([qids], language_code).get(qids)
+        print(f'Label for {qids} : {label}')
+        return label
 
 def safe_eval(x):
     """
@@ -0,0 +1,156 @@
+"""
+This module provides the one HTTP client layer shared by all network calls in this project: fetching GLAMorous XML
+from Toolforge, SPARQL queries to the Wikidata Query Service (WDQS) and Wikidata API calls.
+
+Features:
+- A single urllib3 connection pool per run, created on first use, with keep-alive connections that are reused
+  across all calls (and threads), so connection setup happens only once per host.
+- Gzip-compressed responses, which are decompressed transparently (also when streaming).
+- Automatic retries with exponential backoff and jitter on connection errors and on transient server responses
+  (429 Too Many Requests, 5xx), honouring the 'Retry-After' header that Toolforge and WDQS send when throttling.
+- Per-host rate limits: a minimum interval between two requests to the same host, see HOST_RATE_LIMITS.
+- Optional recording and replaying of responses, and redirection of all requests to a local stand-in server, for
+  offline tests and benchmarks, see http_replay.py.
+
+Usage:
+    response = request('GET', url)                                    # urllib3.BaseHTTPResponse
+    response = request('GET', url, preload_content=False)             # Streaming, see urllib3 docs
+    data = get_json(url, fields={'action': 'wbgetentities', ...})    # Parsed JSON
+"""
+
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import http_replay
+from lazy_imports import lazy_import
+
+urllib3 = lazy_import('urllib3')  # Imported on first use, so importing this module is fast
+
+USER_AGENT = "GLAMorousToHTML Python script by User:OlafJanssen"
+
+# Maximum number of requests per second, per host. Hosts not listed here are not rate limited.
+HOST_RATE_LIMITS = {
+    'glamtools.toolforge.org': 2,
+    'query.wikidata.org': 2,
+    'www.wikidata.org': 10,
+}
+
+# Maximum number of keep-alive connections per host
+HTTP_POOL_MAXSIZE = 10
+
+# Settings of the urllib3.util.Retry of the connection pool
+HTTP_RETRY_SETTINGS = dict(
+    total=6,
+    backoff_factor=1,  # 0s, 2s, 4s, 8s, ... between retries
+    backoff_jitter=1,  # Plus a random 0-1s, so concurrent workers do not retry in lockstep
+    backoff_max=120,
+    status_forcelist=(429, 500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,  # After the last retry, return the response, so callers can report its status
+)
+
+_http = None
+_http_lock = threading.Lock()
+
+
+class HostRateLimiter:
+    """
+    Thread-safe rate limiter that enforces a minimum interval between two requests to the same host.
+    Parameters:
+    - rate_limits (dict): The maximum number of requests per second, keyed by host name.
+    """
+
+    def __init__(self, rate_limits):
+        self.rate_limits = rate_limits
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        """Blocks until a request to 'host' is allowed."""
+        rate = self.rate_limits.get(host)
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = HostRateLimiter(HOST_RATE_LIMITS)
+
+
+def get_http():
+    """
+    Returns the connection pool shared by all network calls, creating it on first use.
+    Returns:
+    - urllib3.PoolManager: The shared connection pool.
+    """
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                _http = urllib3.PoolManager(
+                    maxsize=HTTP_POOL_MAXSIZE,
+                    retries=urllib3.util.Retry(**HTTP_RETRY_SETTINGS),
+                    headers={'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'},
+                )
+    return _http
+
+
+def request(method, url, headers=None, **kwargs):
+    """
+    Sends an HTTP request through the shared connection pool, respecting the per-host rate limits.
+    Depending on the configuration of http_replay.py, the response is replayed from (or recorded to) disk, and the
+    request is sent to a local stand-in server instead of the real service.
+    Parameters:
+    - method (str): The HTTP method, e.g. 'GET'.
+    - url (str): The URL to request.
+    - headers (dict, optional): Extra request headers, on top of the User-Agent and Accept-Encoding headers.
+    - kwargs: Any other keyword arguments of urllib3.PoolManager.request(), such as 'fields' or 'preload_content'.
+    Returns:
+    - urllib3.BaseHTTPResponse: The response.
+    Raises:
+    - urllib3.exceptions.HTTPError: If the request fails, also after retrying, or if there is no recorded response
+      in replay mode.
+    """
+    replay_config = http_replay.get_config()
+    store, key = replay_config['store'], None
+    if store is not None:
+        key = http_replay.request_key(method, url, kwargs.get('fields'))
+        response = store.replay(key, kwargs.get('preload_content', True))
+        if response is not None:
+            return response
+        if replay_config['mode'] == 'replay':
+            raise urllib3.exceptions.HTTPError(f"No recorded response for {key} (replay mode)")
+    request_url = url
+    if replay_config['standin_url']:
+        request_url = http_replay.standin_url_for(url, replay_config['standin_url'])
+    rate_limiter.wait(urlparse(request_url).netloc)
+    http = get_http()
+    response = http.request(method, request_url, headers={**http.headers, **(headers or {})}, **kwargs)
+    if store is not None and response.status == 200:
+        return store.record(key, response, url, kwargs.get('preload_content', True))
+    return response
+
+
+def get_json(url, fields=None, headers=None):
+    """
+    Sends a GET request through the shared connection pool and parses the JSON response.
+    Parameters:
+    - url (str): The URL to request.
+    - fields (dict, optional): Query parameters, which are URL-encoded and appended to the URL.
+    - headers (dict, optional): Extra request headers. 'Accept: application/json' is sent by default.
+    Returns:
+    - The parsed JSON response.
+    Raises:
+    - urllib3.exceptions.HTTPError: If the request fails or the response status is not 200.
+    - ValueError: If the response is not valid JSON.
+    """
+    response = request('GET', url, fields=fields, headers={'Accept': 'application/json', **(headers or {})})
+    if response.status != 200:
+        raise urllib3.exceptions.HTTPError(f"HTTP {response.status} for {url}")
+    return json.loads(response.data)
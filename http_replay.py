@@ -0,0 +1,312 @@
+"""
+This module adds a record/replay layer to http_client.py, and a local stand-in server for the web services this
+project depends on: the GLAMorous tool on Toolforge (XML), the Wikidata Query Service (SPARQL JSON) and the Wikidata
+API (wbgetentities JSON).
+
+Record/replay:
+Every response that goes through http_client.request() can be stored on disk, and served from disk on later runs.
+Responses are keyed by their normalized request: the method, host, path and the sorted query parameters, with the
+whitespace in SPARQL queries collapsed, so the same request always maps to the same recording, however its URL was
+built. The bodies are stored gzip-compressed ('<key>.gz', next to a '<key>.json' with the status, content type and
+original URL), and replayed as urllib3 responses, so callers (also streaming ones) cannot tell the difference.
+The mode is set with the environment variable GLAMOROUS_HTTP_REPLAY, or with configure():
+- 'off' (default): all requests go to the network.
+- 'record': recorded responses are replayed, all other requests go to the network and their (HTTP 200) responses
+  are recorded.
+- 'replay': only recorded responses are served. Any other request fails, so a run is guaranteed to be offline.
+Recordings go to 'cache/http/', or to the directory in the environment variable GLAMOROUS_HTTP_REPLAY_DIR.
+
+Stand-in server:
+The stand-in server serves the recordings over HTTP, as if it were Toolforge and Wikidata. When its address is set
+with the environment variable GLAMOROUS_HTTP_STANDIN (or configure(standin_url=...)), http_client.py sends all
+requests to the stand-in instead, e.g. 'https://query.wikidata.org/sparql?...' becomes
+'http://127.0.0.1:8000/query.wikidata.org/sparql?...'. Requests to the stand-in are not rate limited, so the 'http'
+read mode can be tested and benchmarked offline at full speed, over a real socket. The stand-in can also serve a local
+GLAMorous XML file (such as a synthetic one from benchmarks/synthetic_glamorous.py) for every GLAMorous request.
+
+Usage:
+    GLAMOROUS_HTTP_REPLAY=record python GLAMorousToHTML.py    # Record the responses of a live run
+    GLAMOROUS_HTTP_REPLAY=replay python GLAMorousToHTML.py    # Repeat the run offline, from the recordings
+    python http_replay.py serve --port 8000 [--xml synthetic.xml]
+    GLAMOROUS_HTTP_STANDIN=http://127.0.0.1:8000 python GLAMorousToHTML.py
+    python http_replay.py list
+or from Python:
+    server, standin_url = start_standin_server(xml_file='synthetic.xml')
+    configure(standin_url=standin_url)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+REPLAY_ENV_VAR = 'GLAMOROUS_HTTP_REPLAY'
+REPLAY_DIR_ENV_VAR = 'GLAMOROUS_HTTP_REPLAY_DIR'
+STANDIN_ENV_VAR = 'GLAMOROUS_HTTP_STANDIN'
+DEFAULT_REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'http')
+REPLAY_MODES = ('off', 'record', 'replay')
+WHITESPACE_NORMALIZED_PARAMETERS = {'query'}  # SPARQL queries, whose indentation should not matter
+GLAMOROUS_HOST = 'glamtools.toolforge.org'
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def request_key(method, url, fields=None):
+    """
+    Returns the normalized form of a request, which identifies its recording.
+    Parameters:
+    - method (str): The HTTP method, e.g. 'GET'.
+    - url (str): The URL, with or without query string.
+    - fields (dict, optional): Query parameters that are sent on top of the query string of the URL.
+    Returns:
+    - str: For instance 'GET query.wikidata.org/sparql?format=json&query=SELECT ...'.
+    """
+    parts = urlsplit(url)
+    parameters = parse_qsl(parts.query, keep_blank_values=True) + [(str(k), str(v)) for k, v in (fields or {}).items()]
+    parameters = sorted((name, ' '.join(value.split()) if name in WHITESPACE_NORMALIZED_PARAMETERS else value)
+                        for name, value in parameters)
+    return f"{method.upper()} {parts.netloc.lower()}{parts.path or '/'}?{urlencode(parameters)}"
+
+
+class ReplayStore:
+    """
+    On-disk store of recorded HTTP responses, see the module docstring.
+    Parameters:
+    - store_dir (str): The directory of the recordings. Every host gets a subdirectory.
+    """
+
+    def __init__(self, store_dir=DEFAULT_REPLAY_DIR):
+        self.store_dir = store_dir
+
+    def _paths(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        host = re.sub(r'[^\w.-]', '_', key.split(' ', 1)[1].split('/', 1)[0])
+        base = os.path.join(self.store_dir, host, digest)
+        return f"{base}.json", f"{base}.gz"
+
+    def lookup(self, key):
+        """
+        Returns:
+        - tuple: The metadata (dict) and the path of the gzip-compressed body of the recording of 'key', or None.
+        """
+        meta_path, body_path = self._paths(key)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            return json.load(file), body_path
+
+    def save(self, key, body, status=200, content_type='application/octet-stream', url=None):
+        """
+        Stores a response body. The body is compressed while it is copied, so large responses are never held in
+        memory as a whole, and both files are written atomically, so concurrent readers never see partial recordings.
+        Parameters:
+        - key (str): The normalized request, see request_key().
+        - body (bytes or file object): The (decoded) response body, or a binary file-like object to read it from.
+        - status (int, optional): The HTTP status. Defaults to 200.
+        - content_type (str, optional): The Content-Type of the response.
+        - url (str, optional): The original URL, for reference.
+        Returns:
+        - tuple: The metadata (dict) and the path of the gzip-compressed body.
+        """
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as compressed:
+                if isinstance(body, bytes):
+                    compressed.write(body)
+                else:
+                    shutil.copyfileobj(body, compressed, COPY_CHUNK_SIZE)
+            os.replace(tmp_path, body_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        meta = {'key': key, 'url': url, 'status': status, 'content_type': content_type,
+                'recorded': datetime.now().isoformat(timespec='seconds'), 'compressed_size': os.path.getsize(body_path)}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(meta, file, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+        return meta, body_path
+
+    def replay(self, key, preload_content=True):
+        """
+        Returns the recording of 'key' as a urllib3 response, or None if there is no recording.
+        The body is served gzip-compressed and decompressed by urllib3, just like a live response.
+        """
+        recording = self.lookup(key)
+        if recording is None:
+            return None
+        from urllib3.response import HTTPResponse  # Imported here, as urllib3 is only needed once there are recordings
+        meta, body_path = recording
+        headers = {'Content-Type': meta['content_type'], 'Content-Encoding': 'gzip',
+                   'Content-Length': str(os.path.getsize(body_path))}
+        return HTTPResponse(body=open(body_path, 'rb'), headers=headers, status=meta['status'],
+                            preload_content=preload_content, decode_content=True, request_url=meta['url'])
+
+    def record(self, key, response, url=None, preload_content=True):
+        """
+        Records a live response and returns it again, replayed from the recording, as it may have been consumed.
+        The connection of the live response is returned to the pool.
+        """
+        try:
+            body = response.data if preload_content else response  # Streamed responses are copied in chunks
+            self.save(key, body, response.status, response.headers.get('Content-Type', 'application/octet-stream'), url)
+        finally:
+            response.release_conn()
+        return self.replay(key, preload_content)
+
+    def entries(self):
+        """Yields the metadata of all recordings in the store."""
+        for root, _, files in os.walk(self.store_dir):
+            for name in sorted(files):
+                if name.endswith('.json'):
+                    with open(os.path.join(root, name), 'r', encoding='utf-8') as file:
+                        yield json.load(file)
+
+
+def configure(mode=None, store_dir=None, standin_url=None):
+    """
+    Sets the record/replay mode and the stand-in server for all subsequent requests of http_client.py.
+    Arguments that are None are taken from the environment variables GLAMOROUS_HTTP_REPLAY, GLAMOROUS_HTTP_REPLAY_DIR
+    and GLAMOROUS_HTTP_STANDIN.
+    Parameters:
+    - mode (str, optional): 'off', 'record' or 'replay'.
+    - store_dir (str, optional): The directory of the recordings.
+    - standin_url (str, optional): The base URL of a stand-in server, e.g. 'http://127.0.0.1:8000'. Pass '' to
+      send requests to the real services again.
+    Returns:
+    - dict: The new configuration, with the keys 'mode', 'store' (ReplayStore or None) and 'standin_url'.
+    """
+    global _config
+    mode = (mode or os.environ.get(REPLAY_ENV_VAR) or 'off').strip().lower()
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Invalid HTTP replay mode '{mode}'. Choose one of {', '.join(REPLAY_MODES)}.")
+    store_dir = store_dir or os.environ.get(REPLAY_DIR_ENV_VAR) or DEFAULT_REPLAY_DIR
+    standin_url = os.environ.get(STANDIN_ENV_VAR, '') if standin_url is None else standin_url
+    with _config_lock:
+        _config = {'mode': mode, 'store': ReplayStore(store_dir) if mode != 'off' else None,
+                   'standin_url': standin_url.rstrip('/')}
+    return _config
+
+
+def get_config():
+    """Returns the current configuration, see configure(), reading it from the environment on first use."""
+    return _config if _config is not None else configure()
+
+
+def standin_url_for(url, standin_url):
+    """
+    Rewrites a URL to the stand-in server, e.g. 'https://query.wikidata.org/sparql?x=1' with the stand-in
+    'http://127.0.0.1:8000' becomes 'http://127.0.0.1:8000/query.wikidata.org/sparql?x=1'.
+    """
+    parts = urlsplit(url)
+    return f"{standin_url}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else '')
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the recordings of a ReplayStore (and optionally a local GLAMorous XML file) for the URLs rewritten by
+    standin_url_for(). Recordings are sent as stored, gzip-compressed, to clients that accept gzip.
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real services
+    store = None
+    xml_file = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        host, _, path = self.path.lstrip('/').partition('/')
+        key = request_key('GET', f"https://{host}/{path}")
+        recording = self.store.lookup(key) if self.store is not None else None
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if recording is not None:
+            meta, body_path = recording
+            if accepts_gzip:
+                self._send_file(meta['status'], meta['content_type'], body_path, 'gzip')
+            else:
+                with gzip.open(body_path, 'rb') as body:
+                    self._send_body(meta['status'], meta['content_type'], body.read())
+        elif self.xml_file and host == GLAMOROUS_HOST:
+            self._send_file(200, 'text/xml; charset=utf-8', self.xml_file)
+        else:
+            self._send_body(404, 'text/plain; charset=utf-8', f"No recording for {key}\n".encode('utf-8'))
+
+    def _send_headers(self, status, content_type, length, encoding=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+
+    def _send_body(self, status, content_type, body):
+        self._send_headers(status, content_type, len(body))
+        self.wfile.write(body)
+
+    def _send_file(self, status, content_type, path, encoding=None):
+        self._send_headers(status, content_type, os.path.getsize(path), encoding)
+        with open(path, 'rb') as file:
+            shutil.copyfileobj(file, self.wfile, COPY_CHUNK_SIZE)
+
+
+def _make_standin_server(store_dir, xml_file, host, port):
+    handler = type('Handler', (StandinRequestHandler,), {'store': ReplayStore(store_dir), 'xml_file': xml_file})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_standin_server(store_dir=DEFAULT_REPLAY_DIR, xml_file=None, host='127.0.0.1', port=0):
+    """
+    Starts the stand-in server in a background (daemon) thread.
+    Parameters:
+    - store_dir (str, optional): The directory of the recordings to serve.
+    - xml_file (str, optional): A local GLAMorous XML file to serve for every GLAMorous request without a recording.
+    - host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+    - port (int, optional): The port to listen on. Defaults to 0, a free port.
+    Returns:
+    - tuple: The server (call server.shutdown() to stop it) and its base URL, for configure(standin_url=...).
+    """
+    server = _make_standin_server(store_dir, xml_file, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in server and recordings of the GLAMorous and Wikidata services.")
+    parser.add_argument('--dir', default=os.environ.get(REPLAY_DIR_ENV_VAR, DEFAULT_REPLAY_DIR), help="Directory of the recordings")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help="Serve the recordings over HTTP")
+    serve.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    serve.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    serve.add_argument('--xml', default=None, help="GLAMorous XML file to serve for GLAMorous requests without a recording")
+    subparsers.add_parser('list', help="List the recordings")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for meta in ReplayStore(args.dir).entries():
+            print(f"{meta['recorded']}  {meta['status']}  {meta['compressed_size']:>12,}  {meta['key'][:150]}")
+        return
+    server = _make_standin_server(args.dir, args.xml, args.host, args.port)
+    print(f"Serving the recordings in {args.dir} on http://{args.host}:{args.port} "
+          f"(set {STANDIN_ENV_VAR}=http://{args.host}:{args.port} to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+This module adds an incremental mode to the generation of GLAMorousToHTML reports.
+
+The same Commons categories are reported on every month, while from one month to the next usually only a small
+fraction of the image usages changes. Instead of rebuilding every report from scratch, the incremental mode
+1) stores the normalized usage data of every run as a snapshot: {project: {article URL: [image names]}}, see
+   build_project_articles() in general.py, as compressed JSON,
+2) diffs the usage data of a new run against the snapshot of the previous run, giving a compact changeset of the
+   added and removed images, articles and usages, and of the projects affected by these changes,
+3) recomputes only the rows of the affected projects, reusing the rows of all other projects from the previous
+   report DataFrame (see update_projects_dataframe()), which is stored as Parquet next to the snapshot (see
+   save_report_frame(); without pyarrow, all rows are recomputed), and
+4) skips writing (and publishing) a report altogether when nothing has changed.
+
+The changeset also tells the HTML and Excel builders, and downstream publishing, which project (language) sections
+need to be regenerated.
+
+Usage:
+    project_articles = build_project_articles(images, wikiprojects_filtered)
+    previous = load_snapshot(snapshot_path('data/snapshots', category))
+    changeset = diff_project_articles(previous, project_articles)
+    if changeset['summary']['affected_projects']:
+        previous_df = load_report_frame(report_frame_path('data/snapshots', category), previous)
+        wp_df = update_projects_dataframe(previous_df, project_articles, changeset, language_index)
+        ...
+        save_report_frame(report_frame_path('data/snapshots', category), wp_df)
+    save_snapshot(snapshot_path('data/snapshots', category), project_articles)
+"""
+
+import os
+from datetime import datetime
+
+from general import (load_dict, save_dict_atomic, build_language_index, order_projects,
+                     project_articles_to_dataframe, write_df_to_parquet, DICTIONARY_ENCODED_COLUMNS)
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')  # Only needed to update report DataFrames, so imported on first use
+
+SNAPSHOT_VERSION = 1  # Increase when the format of the snapshots changes, to invalidate existing snapshots
+
+
+def snapshot_path(snapshot_dir, category):
+    """
+    Returns the path of the snapshot of a Commons category, e.g. 'data/snapshots/ImagesfromtheRijksmuseum.json.gz'.
+    There is one snapshot per category, which is overwritten by every run.
+    """
+    return os.path.join(snapshot_dir, f"{category.replace(' ', '')}.json.gz")
+
+
+def save_snapshot(path, project_articles):
+    """
+    Stores the normalized usage data of a run as a gzip-compressed JSON snapshot (atomically).
+    Parameters:
+    - path (str): The path of the snapshot file, see snapshot_path().
+    - project_articles (dict): The usage data, as returned by build_project_articles().
+    """
+    save_dict_atomic(path, {
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'projects': {project: {url: list(images) for url, images in articles.items()}
+                     for project, articles in project_articles.items()},
+    })
+
+
+def load_snapshot(path):
+    """
+    Loads the snapshot of the previous run.
+    Returns:
+    - dict: The usage data in the format of build_project_articles(), or None if there is no (usable) snapshot.
+    """
+    if not os.path.exists(path):
+        return None
+    snapshot = load_dict(path)
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    return {project: {url: dict.fromkeys(images) for url, images in articles.items()}
+            for project, articles in snapshot['projects'].items()}
+
+
+def report_frame_path(snapshot_dir, category):
+    """
+    Returns the path of the stored report DataFrame of a Commons category, next to its snapshot, e.g.
+    'data/snapshots/ImagesfromtheRijksmuseum.parquet'.
+    """
+    return os.path.join(snapshot_dir, f"{category.replace(' ', '')}.parquet")
+
+
+def save_report_frame(path, df):
+    """
+    Stores the report DataFrame of a run as Parquet (atomically), for update_projects_dataframe() in the next run.
+    Returns:
+    - bool: True if the DataFrame was stored, False if pyarrow is not installed.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        write_df_to_parquet(df, tmp_path)
+        os.replace(tmp_path, path)
+        tmp_path = None
+    except ImportError:
+        return False
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def load_report_frame(path, previous):
+    """
+    Loads the report DataFrame of the previous run, see save_report_frame().
+    Parameters:
+    - path (str): The path of the stored DataFrame, see report_frame_path().
+    - previous (dict): The usage data of the previous run (see load_snapshot()). The DataFrame is only used if it has
+      one row per article of every project in it, so a DataFrame that is out of step with the snapshot (e.g. after a
+      run that died between writing the two) is never reused.
+    Returns:
+    - DataFrame: The report DataFrame, or None if there is no (usable) stored DataFrame, or pyarrow is not installed.
+    """
+    if previous is None or not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        print(f"Could not read the report DataFrame in {path}: {e}")
+        return None
+    for column in DICTIONARY_ENCODED_COLUMNS:  # Read back as categoricals
+        df[column] = df[column].astype(df[column].cat.categories.dtype)
+    rows_per_project = df['ProjectCode'].value_counts().to_dict()
+    if rows_per_project != {project: len(articles) for project, articles in previous.items() if articles}:
+        return None
+    return df
+
+
+def diff_project_articles(previous, current):
+    """
+    Compares the usage data of two runs.
+    Parameters:
+    - previous (dict or None): The usage data of the previous run, as returned by load_snapshot(). If None, everything
+      in 'current' counts as added.
+    - current (dict): The usage data of the current run, as returned by build_project_articles().
+    Returns:
+    - dict: The changeset, with
+        - 'summary': the numbers of added/removed images, articles and usages, and of affected projects,
+        - 'added_images' and 'removed_images': the images that are used (in the projects taken into account) now,
+          but were not before, and vice versa,
+        - 'projects': for every affected project, the 'added_articles' and 'removed_articles', the 'added_usages' and
+          'removed_usages' as {article URL: [image names]}, and the 'reordered_articles' whose images are the same,
+          but listed in a different order (which changes the 'Images' column of the report).
+    Example:
+        {'summary': {'added_images': 1, 'removed_images': 0, 'added_articles': 1, 'removed_articles': 0,
+                     'added_usages': 1, 'removed_usages': 0, 'affected_projects': 1},
+         'added_images': ['Map_of_Borneo.jpg'], 'removed_images': [],
+         'projects': {'fr.wikipedia': {'added_articles': ['https://fr.wikipedia.org/wiki/Bornéo'], 'removed_articles': [],
+                                       'added_usages': {'https://fr.wikipedia.org/wiki/Bornéo': ['Map_of_Borneo.jpg']},
+                                       'removed_usages': {}, 'reordered_articles': []}}}
+    """
+    previous = previous or {}
+    projects = {}
+    for project in dict.fromkeys(list(current) + list(previous)):
+        old_articles, new_articles = previous.get(project, {}), current.get(project, {})
+        change = {'added_articles': sorted(new_articles.keys() - old_articles.keys()),
+                  'removed_articles': sorted(old_articles.keys() - new_articles.keys()),
+                  'added_usages': {}, 'removed_usages': {}, 'reordered_articles': []}
+        for url in sorted(old_articles.keys() | new_articles.keys()):
+            old_images, new_images = old_articles.get(url, {}), new_articles.get(url, {})
+            added = [image for image in new_images if image not in old_images]
+            removed = [image for image in old_images if image not in new_images]
+            if added:
+                change['added_usages'][url] = added
+            if removed:
+                change['removed_usages'][url] = removed
+            if not added and not removed and list(old_images) != list(new_images):
+                change['reordered_articles'].append(url)
+        if change['added_usages'] or change['removed_usages'] or change['reordered_articles']:
+            projects[project] = change
+
+    old_image_set = {image for articles in previous.values() for images in articles.values() for image in images}
+    new_image_set = {image for articles in current.values() for images in articles.values() for image in images}
+    changeset = {
+        'added_images': sorted(new_image_set - old_image_set),
+        'removed_images': sorted(old_image_set - new_image_set),
+        'projects': projects,
+    }
+    changeset['summary'] = {
+        'added_images': len(changeset['added_images']),
+        'removed_images': len(changeset['removed_images']),
+        'added_articles': sum(len(change['added_articles']) for change in projects.values()),
+        'removed_articles': sum(len(change['removed_articles']) for change in projects.values()),
+        'added_usages': sum(len(images) for change in projects.values() for images in change['added_usages'].values()),
+        'removed_usages': sum(len(images) for change in projects.values() for images in change['removed_usages'].values()),
+        'affected_projects': len(projects),
+    }
+    return {'summary': changeset.pop('summary'), **changeset}
+
+
+def update_projects_dataframe(previous_df, project_articles, changeset, ldictlist):
+    """
+    Builds the report DataFrame of the current run, recomputing only the rows of the projects affected by the changeset,
+    and reusing the rows of all other projects from the report DataFrame of the previous run.
+    The result is identical to project_articles_to_dataframe(project_articles, ldictlist): all projects are
+    ordered again, as the changes in the affected projects can change the order of the other projects too.
+    Parameters:
+    - previous_df (DataFrame or None): The report DataFrame of the previous run. If None, all rows are computed.
+    - project_articles (dict): The usage data of the current run, as returned by build_project_articles().
+    - changeset (dict): The changeset, as returned by diff_project_articles().
+    - ldictlist (list or dict): The language labels returned by get_languages_dict(), or a language index compiled
+      from them by build_language_index().
+    Returns:
+    - DataFrame: The report DataFrame, in the format of build_projects_dataframe().
+    """
+    language_index = ldictlist if isinstance(ldictlist, dict) else build_language_index(ldictlist)
+    ordered_projects = order_projects(project_articles, language_index)
+    if previous_df is None or previous_df.empty:
+        return project_articles_to_dataframe(project_articles, language_index, ordered_projects)
+
+    previous_rows = dict(tuple(previous_df.groupby('ProjectCode', sort=False)))
+    frames = []
+    for project_code, full_language_name in ordered_projects:
+        rows = previous_rows.get(project_code)
+        if project_code in changeset['projects'] or rows is None or rows['FullLanguageName'].iloc[0] != full_language_name:
+            rows = project_articles_to_dataframe(project_articles, language_index, [(project_code, full_language_name)])
+        frames.append(rows)
+    if not frames:
+        return project_articles_to_dataframe({}, language_index, [])
+    df = pd.concat(frames, ignore_index=True)
+    df['NumberOfImages'] = df['NumberOfImages'].astype('int64')
+    return df
+
+
+def save_changeset(path, changeset):
+    """Writes a changeset, as returned by diff_project_articles(), to a JSON file (atomically)."""
+    save_dict_atomic(path, changeset)
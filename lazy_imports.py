@@ -0,0 +1,45 @@
+"""
+This module provides lazy imports for the heavy dependencies of this project (pandas, urllib3, xmltodict, ...).
+
+Importing pandas alone takes a considerable part of a second. Many processes never need it, or only need it late:
+short-lived CLI invocations, the worker processes of GLAMorousToHTML_bulk.py that turn out to have nothing to do,
+and test processes that exercise only the XML or HTTP code. A lazily imported module is a placeholder that imports the
+real module on first attribute access, so the import cost is paid only by the processes that use the module.
+
+Usage:
+    pd = lazy_import('pandas')   # Nothing is imported yet
+    df = pd.DataFrame(...)       # pandas is imported here
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Placeholder for a module that is imported on first attribute access. After the import, the attributes of the real
+    module are copied into the placeholder, so later attribute lookups are as fast as on the real module.
+    Parameters:
+    - name (str): The full name of the module, e.g. 'pandas'.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+
+    def __getattr__(self, attribute):
+        # Only called for attributes that are not (yet) in the placeholder. importlib.import_module() is thread-safe.
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+def lazy_import(name):
+    """
+    Returns a module that is imported on first attribute access, or the module itself if it has been imported already.
+    Parameters:
+    - name (str): The full name of the module, e.g. 'pandas' or 'urllib3'.
+    Returns:
+    - module: The module, or a LazyModule placeholder for it.
+    """
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,196 @@
+"""
+This module provides the job ledger that makes bulk runs of GLAMorousToHTML_bulk.py resumable.
+
+A bulk run over all institutions of a country can take hours, and can die partway through: a Toolforge timeout, or a
+worker process that runs out of memory on one giant category. Without a ledger, the only option is to start the
+whole run again, fetching and parsing every category once more. The ledger records, for every category, which stages
+of the run have completed, along with the artifact that each stage produced:
+- 'fetched': the downloaded GLAMorous XML file in 'data/xml/',
+- 'parsed': the normalized usage data {project: {article URL: [image names]}} (see build_project_articles() in
+  general.py), stored in the ledger directory in the snapshot format of incremental.py,
+- 'report_written': the summary of the written report (Excel, or the formats of --formats), with its paths, and
+- 'html_written': the path of the HTML page, if the run writes HTML pages.
+A rerun with the same ledger directory resumes every category at its first stage that has not completed, so the
+expensive fetch and parse are never redone. Artifacts that have gone missing from disk are recreated from the stage
+before.
+
+The ledger is a directory with one small JSON file per category ('categories/<category>.json'), plus 'run.json' for
+the run as a whole. A category is only handled by one process at a time (first the fetching thread, then one worker
+process), so its file can be updated without locking. All files are written atomically, so a run that is killed
+never leaves a half-written ledger behind.
+
+Usage:
+    ledger = JobLedger('data/ledger')
+    resumed = ledger.start(categories)          # Resumes the previous run, unless it finished
+    if not ledger.completed(category, 'fetched'):
+        ...
+        ledger.mark(category, 'fetched', xml_path)
+    ...
+    ledger.finish()
+"""
+
+import argparse
+import os
+import shutil
+from datetime import datetime
+
+from general import load_dict, save_dict_atomic
+from incremental import snapshot_path, save_snapshot, load_snapshot
+
+LEDGER_STAGES = ('fetched', 'parsed', 'report_written', 'html_written')
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobLedger:
+    """
+    The ledger of a (resumable) bulk run, see the module docstring.
+    Parameters:
+    - ledger_dir (str): The ledger directory, e.g. 'data/ledger'.
+    """
+
+    def __init__(self, ledger_dir):
+        self.ledger_dir = ledger_dir
+        self.run_path = os.path.join(ledger_dir, 'run.json')
+        self.categories_dir = os.path.join(ledger_dir, 'categories')
+        self.parsed_dir = os.path.join(ledger_dir, 'parsed')
+
+    def _load(self, path):
+        return load_dict(path) if os.path.exists(path) else None
+
+    def start(self, categories, restart=False):
+        """
+        Starts a bulk run, or resumes the previous one if it has not finished.
+        Parameters:
+        - categories (list): The Commons categories of the run.
+        - restart (bool, optional): If True, the ledger of an unfinished previous run is discarded. Defaults to False.
+        Returns:
+        - bool: True if the previous run is resumed.
+        """
+        run = self._load(self.run_path)
+        resumed = run is not None and run.get('finished') is None and not restart
+        if resumed:
+            run['categories'] = list(dict.fromkeys(run['categories'] + list(categories)))
+            run['resumed'] = run.get('resumed', []) + [_now()]
+        else:
+            for directory in (self.categories_dir, self.parsed_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+            run = {'started': _now(), 'finished': None, 'categories': list(categories), 'resumed': []}
+        save_dict_atomic(self.run_path, run)
+        return resumed
+
+    def finish(self):
+        """Marks the run as finished, so the next run starts afresh. The parsed usage data is removed."""
+        run = self._load(self.run_path) or {'started': None, 'categories': [], 'resumed': []}
+        run['finished'] = _now()
+        save_dict_atomic(self.run_path, run)
+        shutil.rmtree(self.parsed_dir, ignore_errors=True)
+
+    def record_path(self, category):
+        """Returns the path of the ledger file of a category."""
+        return os.path.join(self.categories_dir, f"{category.replace(' ', '')}.json")
+
+    def record(self, category):
+        """
+        Returns the ledger entry of a category.
+        Returns:
+        - dict: {'category', 'stages': {stage: {'at': timestamp, 'artifact': ...}}, 'result', 'error'}. 'result' is
+          the summary of the category once all its stages have completed, see complete().
+        """
+        return self._load(self.record_path(category)) or {'category': category, 'stages': {}, 'result': None, 'error': None}
+
+    def _save(self, record):
+        save_dict_atomic(self.record_path(record['category']), record)
+
+    def mark(self, category, stage, artifact=None):
+        """Records that a stage of a category has completed, with the artifact (a path, or a summary) it produced."""
+        record = self.record(category)
+        record['stages'][stage] = {'at': _now(), 'artifact': artifact}
+        record['error'] = None
+        self._save(record)
+
+    def completed(self, category, stage):
+        """
+        Returns whether a stage of a category has completed and its artifact is still there.
+        Returns:
+        - bool: True if the stage can be skipped.
+        """
+        entry = self.record(category)['stages'].get(stage)
+        if entry is None:
+            return False
+        if stage == 'parsed':
+            return os.path.exists(self.parsed_path(category))
+        paths = _artifact_paths(entry['artifact'])
+        return all(os.path.exists(path) for path in paths)
+
+    def artifact(self, category, stage):
+        """Returns the artifact of a completed stage of a category, or None."""
+        entry = self.record(category)['stages'].get(stage)
+        return entry['artifact'] if entry else None
+
+    def parsed_path(self, category):
+        """Returns the path of the parsed usage data of a category."""
+        return snapshot_path(self.parsed_dir, category)
+
+    def save_parsed(self, category, project_articles):
+        """Stores the parsed usage data of a category, and marks its 'parsed' stage as completed."""
+        save_snapshot(self.parsed_path(category), project_articles)
+        self.mark(category, 'parsed', self.parsed_path(category))
+
+    def load_parsed(self, category):
+        """Returns the parsed usage data of a category (see build_project_articles()), or None."""
+        return load_snapshot(self.parsed_path(category)) if self.completed(category, 'parsed') else None
+
+    def complete(self, category, result):
+        """Records that all stages of a category have completed, with the summary of its report."""
+        record = self.record(category)
+        record.update(result=result, error=None)
+        self._save(record)
+
+    def fail(self, category, error):
+        """Records the error of a category that failed. Its completed stages are kept, so a rerun resumes from there."""
+        record = self.record(category)
+        record['error'] = {'at': _now(), 'message': str(error)}
+        self._save(record)
+
+    def result(self, category):
+        """Returns the summary of a category whose stages have all completed, or None."""
+        return self.record(category)['result']
+
+    def summary(self):
+        """
+        Returns the state of all categories of the run.
+        Returns:
+        - dict: {category: the last completed stage (or None), 'done' or 'failed'}.
+        """
+        run = self._load(self.run_path) or {'categories': []}
+        summary = {}
+        for category in run['categories']:
+            record = self.record(category)
+            stages = [stage for stage in LEDGER_STAGES if stage in record['stages']]
+            summary[category] = ('done' if record['result'] is not None else 'failed' if record['error'] is not None
+                                 else stages[-1] if stages else None)
+        return summary
+
+
+def _artifact_paths(artifact):
+    """Returns the file paths in an artifact: a path, a list of paths, or a report summary with a 'report' key."""
+    if isinstance(artifact, dict):
+        artifact = artifact.get('report')
+    if artifact is None:
+        return []
+    return [artifact] if isinstance(artifact, str) else list(artifact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the ledger of a (resumable) bulk run of GLAMorousToHTML_bulk.py.")
+    parser.add_argument('--ledger', default=os.path.join('data', 'ledger'), help="The ledger directory")
+    args = parser.parse_args()
+    for category, state in JobLedger(args.ledger).summary().items():
+        print(f"{state or 'pending':>15}  {category}")
+
+
+if __name__ == "__main__":
+    main()
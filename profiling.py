@@ -0,0 +1,111 @@
+"""
+This module provides stage-level instrumentation for the GLAMorousToHTML pipeline: for every stage of a run (read XML,
+filter projects, build DataFrame, write Excel, ...) it records the wall time, the CPU time, the peak memory allocated
+by Python (as measured by tracemalloc) and the number of records processed.
+
+Profiling is off by default. It is switched on by passing enabled=True to StageProfiler, or by setting the
+environment variable GLAMOROUS_PROFILE to '1'. The results of a run can be printed, and exported as JSON and CSV,
+for instance to track performance regressions across production runs.
+
+Usage:
+    profiler = StageProfiler(run_name='KoninklijkeBibliotheekNL')
+    with profiler.stage('read_xml') as stage:
+        data = read_xml_data(read_mode, streaming=True)
+        stage['records'] = len(data['results']['stats']['usage'])
+    ...
+    profiler.print_report()
+    profiler.export()  # profiles/<run_name>_<timestamp>.json and .csv
+
+Note: tracemalloc slows down Python code considerably, so absolute timings of a profiled run are higher than those of
+an unprofiled run. Compare profiled runs with profiled runs.
+"""
+
+import csv
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_ENV_VAR = 'GLAMOROUS_PROFILE'
+PROFILE_DIR_ENV_VAR = 'GLAMOROUS_PROFILE_DIR'
+DEFAULT_PROFILE_DIR = 'profiles'
+PROFILE_FIELDS = ['stage', 'wall_s', 'cpu_s', 'peak_mem_mb', 'records']
+
+
+def profiling_enabled_by_env():
+    """Returns True if profiling is switched on through the GLAMOROUS_PROFILE environment variable."""
+    return os.environ.get(PROFILE_ENV_VAR, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak memory and record counts per pipeline stage.
+    Parameters:
+    - enabled (bool, optional): Whether to profile. If None (default), the GLAMOROUS_PROFILE environment variable decides.
+    - run_name (str, optional): A name for the run, used in the exported file names. Defaults to 'run'.
+    Attributes:
+    - stages (list): A dict per finished stage, with the keys in PROFILE_FIELDS.
+    """
+
+    def __init__(self, enabled=None, run_name='run'):
+        self.enabled = profiling_enabled_by_env() if enabled is None else enabled
+        self.run_name = run_name
+        self.started = datetime.now()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager that profiles the code in its body as the stage 'name'. It yields a dict in which the body can
+        set the number of records processed, as stage['records']. If profiling is disabled, nothing is measured.
+        """
+        record = {'stage': name, 'records': None}
+        if not self.enabled:
+            yield record
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = round(time.perf_counter() - start_wall, 4)
+            record['cpu_s'] = round(time.process_time() - start_cpu, 4)
+            record['peak_mem_mb'] = round((tracemalloc.get_traced_memory()[1] - start_memory) / 2**20, 2)
+            self.stages.append({field: record.get(field) for field in PROFILE_FIELDS})
+
+    def print_report(self):
+        """Prints the profile of all finished stages as a table."""
+        if not self.enabled:
+            return
+        print(f"{'Stage':<20}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak mem (MB)':>15}{'Records':>10}")
+        for stage in self.stages:
+            records = '' if stage['records'] is None else stage['records']
+            print(f"{stage['stage']:<20}{stage['wall_s']:>10}{stage['cpu_s']:>10}{stage['peak_mem_mb']:>15}{records:>10}")
+
+    def export(self, profile_dir=None):
+        """
+        Writes the profile of the run to a JSON and a CSV file, named '<run_name>_<start timestamp>.json/.csv'.
+        Parameters:
+        - profile_dir (str, optional): The directory to write the files to. Defaults to the GLAMOROUS_PROFILE_DIR
+          environment variable, or 'profiles'.
+        Returns:
+        - tuple: The paths of the JSON and the CSV file, or None if profiling is disabled.
+        """
+        if not self.enabled:
+            return None
+        profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV_VAR, DEFAULT_PROFILE_DIR)
+        os.makedirs(profile_dir, exist_ok=True)
+        basename = os.path.join(profile_dir, f"{self.run_name}_{self.started.strftime('%Y%m%d-%H%M%S')}")
+        with open(f"{basename}.json", 'w', encoding='utf-8') as file:
+            json.dump({'run': self.run_name, 'started': self.started.isoformat(), 'stages': self.stages}, file, indent=4)
+        with open(f"{basename}.csv", 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['run'] + PROFILE_FIELDS)
+            writer.writeheader()
+            for stage in self.stages:
+                writer.writerow({'run': self.run_name, **stage})
+        return f"{basename}.json", f"{basename}.csv"
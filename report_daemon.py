@@ -0,0 +1,465 @@
+"""
+This script, report_daemon.py, runs GLAMorousToHTML report generation as a long-running service, as an alternative to
+starting 'python GLAMorousToHTML.py' (or GLAMorousToHTML_bulk.py) from cron for every category.
+
+A one-off run pays the same fixed costs for every report: starting the interpreter and importing pandas, building the
+language table from get_languages_dict(), opening new connections to Toolforge, and, in incremental mode, loading the
+snapshot of the previous run. The daemon pays these costs once, and keeps warm in memory:
+- the language index (refreshed once a day, see LANGUAGE_REFRESH_INTERVAL),
+- the HTTP connection pool of http_client.py, with keep-alive connections to Toolforge, and
+- the usage data of the most recent runs (see SNAPSHOT_CACHE_SIZE), which is what the next run of a category is
+  diffed against in incremental mode (see incremental.py), so snapshots are not reloaded from disk.
+
+Jobs (one job = one report for one Commons category) come from three sources:
+1) a schedule: every category of the given countries is regenerated at a fixed interval (24 hours by default, or per
+   category from a schedule file). The time of the last run of every category is stored, so restarting the daemon
+   does not regenerate everything at once. A category whose run failed is retried with an exponential backoff
+   (RETRY_BACKOFF, doubled after every consecutive failure, up to the interval), so a broken category or an outage
+   of Toolforge does not turn into a stream of requests.
+2) a local queue directory ('data/daemon/queue/'), into which 'python report_daemon.py submit ...' (or any other
+   process) drops JSON job files, and
+3) a small HTTP API on localhost:
+       POST /jobs         {"category": "Images from the Rijksmuseum", "shortname": "Rijksmuseum", "depth": 0}
+       GET  /jobs         The most recent jobs
+       GET  /jobs/<id>    One job
+       GET  /status       Counters, the scheduled categories, their next run and their consecutive failures
+A category is never queued twice: submitting a category that is already queued or running returns the existing job.
+Jobs are processed by a pool of worker threads. Each job streams the GLAMorous XML straight into the parser (see
+get_remote_xml_stream()), and writes the report with the report writers of GLAMorousToHTML_bulk.py. With
+--skip-unchanged, the XML is instead fetched with a conditional GET to 'data/xml/' first (as in GLAMorousToHTML_bulk.py),
+as it has to be complete to tell whether it has changed. Its validators are only stored once the report is written.
+
+Usage:
+    python report_daemon.py serve Netherlands Norway --workers 4 --interval-hours 24 --incremental --skip-unchanged
+    python report_daemon.py submit "Images from the Rijksmuseum" --shortname Rijksmuseum
+    python report_daemon.py submit "Images from the Rijksmuseum" --url http://127.0.0.1:8765
+    python report_daemon.py status --url http://127.0.0.1:8765
+"""
+
+import argparse
+import functools
+import json
+import os
+import signal
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from general import (load_dict, save_dict_atomic, save_xml_state, get_country_institutions, read_xml_data,
+                     fetch_xml_file_if_changed, get_wikiprojects, filter_wikiprojects, get_languages_dict,
+                     build_language_index, build_project_articles, REPORT_FORMATS, XML_UNCHANGED,
+                     LANGUAGES_CACHE_TTL)
+from GLAMorousToHTML_bulk import (category_xml_url, report_basename, write_reports, write_category_report,
+                                  parse_category_xml)
+
+DEFAULT_PORT = 8765
+DEFAULT_INTERVAL = 24 * 3600  # Seconds between two scheduled runs of the same category
+LANGUAGE_REFRESH_INTERVAL = 24 * 3600  # Seconds after which the language index is rebuilt
+SNAPSHOT_CACHE_SIZE = 50  # Number of categories whose usage data is kept in memory for incremental runs
+SCHEDULER_TICK = 1.0  # Seconds between two checks of the schedule and the queue directory
+RETRY_BACKOFF = 5 * 60  # Seconds before a failed scheduled category is retried, doubled after every consecutive failure
+JOB_HISTORY_SIZE = 1000  # Number of finished jobs that are remembered for the HTTP API
+
+
+def queue_dir_path(datadir):
+    """Returns the path of the queue directory of the daemon, e.g. 'data/daemon/queue'."""
+    return os.path.join(datadir, 'daemon', 'queue')
+
+
+def enqueue_job_file(datadir, category, shortname=None, depth=0):
+    """
+    Submits a job through the queue directory, by writing a JSON job file (atomically) that the daemon picks up.
+    Returns:
+    - str: The path of the job file.
+    """
+    path = os.path.join(queue_dir_path(datadir), f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}.json")
+    save_dict_atomic(path, {'category': category, 'shortname': shortname, 'depth': depth})
+    return path
+
+
+class ReportDaemon:
+    """
+    Long-running report service, see the module docstring.
+    Parameters:
+    - institutions (list, optional): The institutions to regenerate on a schedule, as returned by
+      get_country_institutions(). Defaults to none: only jobs from the queue directory and the HTTP API are run.
+    - datadir (str, optional): The directory to write the reports to. Defaults to 'data'.
+    - workers (int, optional): The number of worker threads. Defaults to 4.
+    - lang (str, optional): The language of the full language names. Defaults to 'en'.
+    - report_writer (callable, optional): The report writer, see process_category() in GLAMorousToHTML_bulk.py.
+      Defaults to write_reports() (Excel).
+    - interval (float, optional): The number of seconds between two scheduled runs of a category. Defaults to 24 hours.
+    - schedule (dict, optional): Per-category intervals in seconds, overriding 'interval'.
+    - incremental (bool, optional): If True, reports are only written when the usage data of a category has changed,
+      see incremental.py. Defaults to False.
+    - skip_unchanged (bool, optional): If True, categories whose GLAMorous XML has not changed are not processed at all,
+      see fetch_xml_file_if_changed(). Defaults to False.
+    - history (bool, optional): If True, the usage data of every run is added to the usage history in
+      'usage_history.sqlite' in 'datadir', see usage_history.py. Defaults to False.
+    """
+
+    def __init__(self, institutions=None, datadir='data', workers=4, lang='en', report_writer=write_reports,
+                 interval=DEFAULT_INTERVAL, schedule=None, incremental=False, skip_unchanged=False, history=False):
+        self.institutions = {institution[0]: institution for institution in institutions or []}
+        self.datadir = datadir
+        self.lang = lang
+        self.report_writer = report_writer
+        self.interval = interval
+        self.schedule = schedule or {}
+        self.snapshot_dir = os.path.join(datadir, 'snapshots') if incremental else None
+        self.skip_unchanged = skip_unchanged
+        self.history_path = os.path.join(datadir, 'usage_history.sqlite') if history else None
+        self.xml_state_path = os.path.join(datadir, 'xml', 'xml_state.json')  # Shared with GLAMorousToHTML_bulk.py
+        self.queue_dir = queue_dir_path(datadir)
+        self.last_runs_path = os.path.join(datadir, 'daemon', 'last_runs.json')
+        self.last_runs = (load_dict(self.last_runs_path) if os.path.exists(self.last_runs_path) else None) or {}
+        self.failures_path = os.path.join(datadir, 'daemon', 'failures.json')
+        self.failures = (load_dict(self.failures_path) if os.path.exists(self.failures_path) else None) or {}
+        self.jobs = OrderedDict()  # Job id -> job
+        self.counters = {'done': 0, 'unchanged': 0, 'failed': 0}
+        self.snapshots = OrderedDict()  # Category -> usage data of its last run, least recently used first
+        self._active = {}  # Category -> id of its queued or running job
+        self._language_index, self._language_index_built = None, 0
+        self._lock = threading.Lock()
+        self._language_lock = threading.Lock()  # Only held while the language index is (re)built, not by submit()/status()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._threads = []
+        self._server = None
+        self.started = datetime.now()
+
+    def language_index(self):
+        """Returns the warm language index, rebuilding it once it is older than LANGUAGE_REFRESH_INTERVAL."""
+        with self._language_lock:
+            if self._language_index is None or time.time() - self._language_index_built > LANGUAGE_REFRESH_INTERVAL:
+                # Stale labels are refreshed right away (wait=True), not in the background while the stale ones are
+                # returned, as the index is kept for LANGUAGE_REFRESH_INTERVAL
+                ttl = LANGUAGE_REFRESH_INTERVAL if self._language_index is not None else LANGUAGES_CACHE_TTL
+                self._language_index = build_language_index(get_languages_dict(self.lang, ttl=ttl, wait=True))
+                self._language_index_built = time.time()
+            return self._language_index
+
+    def submit(self, category, shortname=None, depth=0, source='api'):
+        """
+        Queues a report job for a category, unless the category is queued or running already.
+        Parameters:
+        - category (str): The Commons category, without the 'Category:' prefix.
+        - shortname (str, optional): The shortname of the institution, used as Excel sheet name. Defaults to the
+          shortname in the schedule, or the category name without spaces.
+        - depth (int, optional): The GLAMorous search depth. Defaults to 0.
+        - source (str, optional): Where the job comes from: 'api', 'queue' or 'schedule'.
+        Returns:
+        - dict: The (new or existing) job, or None if the daemon is stopping.
+        """
+        with self._lock:
+            if self._stop.is_set():
+                return None
+            if category in self._active:
+                return self.jobs[self._active[category]]
+            known = self.institutions.get(category)
+            shortname = shortname or (known[1] if known else category.replace(' ', ''))
+            job = {'id': uuid.uuid4().hex[:12], 'category': category, 'shortname': shortname, 'depth': int(depth or 0),
+                   'source': source, 'status': 'queued', 'submitted': datetime.now().isoformat(timespec='seconds'),
+                   'started': None, 'finished': None, 'result': None, 'error': None}
+            self.jobs[job['id']] = job
+            self._active[category] = job['id']
+            self._trim_history()
+        try:
+            self._executor.submit(self._run_job, job)
+        except RuntimeError:  # The executor was shut down by stop() in the meantime
+            with self._lock:
+                self.jobs.pop(job['id'], None)
+                self._active.pop(category, None)
+            return None
+        return job
+
+    def recent_jobs(self, limit=100):
+        """Returns (copies of) the most recent jobs, as served by GET /jobs."""
+        with self._lock:
+            return [dict(job) for job in list(self.jobs.values())[-limit:]]
+
+    def get_job(self, job_id):
+        """Returns (a copy of) a job, or None if it is unknown."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] not in ('queued', 'running')]
+        for job_id in finished[:max(0, len(self.jobs) - JOB_HISTORY_SIZE)]:
+            del self.jobs[job_id]
+
+    def _run_job(self, job):
+        category = job['category']
+        institution = [category, job['shortname'], None, job['depth']]
+        url = category_xml_url(institution)
+        job.update(status='running', started=datetime.now().isoformat(timespec='seconds'))
+        try:
+            language_index = self.language_index()
+            project_articles, validators = self._fetch_usage_data(institution, url)
+            if project_articles == XML_UNCHANGED:
+                status, result = 'unchanged', None
+            else:
+                with self._lock:
+                    previous = self.snapshots.get(category)
+                result = write_category_report(project_articles, institution, language_index, self.datadir,
+                                               self.report_writer, self.snapshot_dir, previous, self.history_path)
+                if self.snapshot_dir is not None:
+                    self._remember_snapshot(category, project_articles)
+                status = 'done' if result['report'] is not None else 'unchanged'
+            if validators is not None:  # Only now, so a job that dies halfway is not skipped as unchanged next time
+                save_xml_state(url, validators, self.xml_state_path)
+            job.update(status=status, result=result)
+            self._record_run(category)
+        except Exception as e:
+            job.update(status='failed', error=str(e))
+            self._record_run(category, failed=True)
+            print(f"Failed to process {category}: {e}")
+        finally:
+            job['finished'] = datetime.now().isoformat(timespec='seconds')
+            with self._lock:
+                self.counters[job['status']] += 1
+                self._active.pop(category, None)
+        print(f"{job['status'].capitalize()}: {category}")
+
+    def _fetch_usage_data(self, institution, url):
+        """
+        Fetches and parses the GLAMorous XML of a category.
+        Returns:
+        - tuple: (project_articles, validators): the usage data (see build_project_articles()), or XML_UNCHANGED, and
+          with skip_unchanged the new validators of the XML, to be stored once the report has been written.
+        Raises:
+        - ValueError: If the XML cannot be fetched or parsed.
+        """
+        if self.skip_unchanged:
+            # A conditional GET, to a file in 'data/xml/' as in GLAMorousToHTML_bulk.py, as the hash of the whole XML
+            # decides whether it has changed before it is parsed
+            xml_path = os.path.join(self.datadir, 'xml', f"{report_basename(institution[0])}.xml")
+            xml_path, validators = fetch_xml_file_if_changed(url, xml_path, self.xml_state_path)
+            if xml_path is None:
+                raise ValueError(f"Could not fetch the GLAMorous XML of {institution[0]}")
+            if xml_path == XML_UNCHANGED:
+                return XML_UNCHANGED, validators
+            return parse_category_xml(xml_path), validators
+        data = read_xml_data('http', remote_xml_url=url, streaming=True, spool=False)
+        if data is None:
+            raise ValueError(f"Could not fetch or parse the GLAMorous XML of {institution[0]}")
+        images = data['results']['details']['image']
+        return build_project_articles(images, filter_wikiprojects(get_wikiprojects(data)[0])[0]), None
+
+    def _remember_snapshot(self, category, project_articles):
+        with self._lock:
+            self.snapshots[category] = project_articles
+            self.snapshots.move_to_end(category)
+            while len(self.snapshots) > SNAPSHOT_CACHE_SIZE:
+                self.snapshots.popitem(last=False)
+
+    def _record_run(self, category, failed=False):
+        """Stores the time of a run of a category, and counts its consecutive failures for the retry backoff."""
+        with self._lock:
+            self.last_runs[category] = time.time()
+            if failed:
+                self.failures[category] = self.failures.get(category, 0) + 1
+            else:
+                self.failures.pop(category, None)
+            last_runs, failures = dict(self.last_runs), dict(self.failures)
+        save_dict_atomic(self.last_runs_path, last_runs)
+        save_dict_atomic(self.failures_path, failures)
+
+    def next_run(self, category):
+        """
+        Returns the time (as a UNIX timestamp) of the next scheduled run of a category: its interval after the last run,
+        or, if the last run failed, RETRY_BACKOFF after it, doubled for every earlier consecutive failure (but never
+        later than the interval).
+        """
+        interval = self.schedule.get(category, self.interval)
+        failures = self.failures.get(category, 0)
+        if failures:
+            interval = min(interval, RETRY_BACKOFF * 2 ** (failures - 1))
+        return self.last_runs.get(category, 0) + interval
+
+    def run_due_jobs(self):
+        """Queues the scheduled categories that are due, and the jobs in the queue directory."""
+        now = time.time()
+        for category, institution in self.institutions.items():
+            if self.next_run(category) <= now and category not in self._active:
+                self.submit(category, institution[1], institution[3] if len(institution) > 3 else 0, source='schedule')
+        if os.path.isdir(self.queue_dir):
+            for name in sorted(os.listdir(self.queue_dir)):
+                if self._stop.is_set():
+                    break  # Leave the remaining job files for the next start
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.queue_dir, name)
+                request = load_dict(path)
+                os.remove(path)
+                if isinstance(request, dict) and request.get('category'):
+                    self.submit(request['category'], request.get('shortname'), request.get('depth', 0), source='queue')
+                else:
+                    print(f"Ignored invalid job file {name}")
+
+    def status(self):
+        """Returns the state of the daemon, as served by GET /status."""
+        with self._lock:
+            return {'started': self.started.isoformat(timespec='seconds'), 'counters': dict(self.counters),
+                    'active': len(self._active), 'snapshots_in_memory': len(self.snapshots),
+                    'failing': dict(self.failures),
+                    'scheduled': {category: datetime.fromtimestamp(self.next_run(category)).isoformat(timespec='seconds')
+                                  for category in self.institutions}}
+
+    def _scheduler_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due_jobs()
+            except Exception as e:
+                print(f"Scheduler error: {e}")
+            self._stop.wait(SCHEDULER_TICK)
+
+    def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """
+        Starts the scheduler and (unless 'port' is None) the HTTP API, in background threads.
+        Returns:
+        - str: The base URL of the HTTP API, or None.
+        """
+        os.makedirs(self.queue_dir, exist_ok=True)
+        self._threads.append(threading.Thread(target=self._scheduler_loop, name='scheduler', daemon=True))
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), type('Handler', (DaemonRequestHandler,), {'daemon': self}))
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name='http-api', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return f"http://{host}:{self._server.server_address[1]}" if self._server else None
+
+    def stop(self, wait=True):
+        """Stops accepting jobs, and (if 'wait') waits for the running jobs to finish."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """The HTTP API of the ReportDaemon in the 'daemon' class attribute, see the module docstring."""
+    protocol_version = 'HTTP/1.1'
+    daemon = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.rstrip('/')
+        if path == '/status':
+            self._send_json(200, self.daemon.status())
+        elif path == '/jobs':
+            self._send_json(200, self.daemon.recent_jobs())
+        elif path.startswith('/jobs/') and self.daemon.get_job(path[len('/jobs/'):]) is not None:
+            self._send_json(200, self.daemon.get_job(path[len('/jobs/'):]))
+        else:
+            self._send_json(404, {'error': f"Not found: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': f"Not found: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            category = request['category']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': "Expected a JSON object with a 'category'"})
+            return
+        job = self.daemon.submit(category, request.get('shortname'), request.get('depth', 0))
+        if job is None:
+            self._send_json(503, {'error': "The daemon is stopping"})
+        else:
+            self._send_json(202, job)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _api_request(url, data=None):
+    """Sends a request to the HTTP API of a running daemon and returns the decoded JSON response."""
+    request = urllib.request.Request(url, data=json.dumps(data).encode('utf-8') if data is not None else None,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run GLAMorousToHTML report generation as a long-running service.")
+    parser.add_argument('--datadir', default='data', help="Directory to write the reports to")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help="Run the daemon")
+    serve.add_argument('countries', nargs='*', help="Country keys in category_logo_dict.json, whose categories are regenerated on a schedule")
+    serve.add_argument('--dict', default='category_logo_dict.json', help="The JSON file with the institutions per country")
+    serve.add_argument('--workers', type=int, default=4, help="Number of worker threads")
+    serve.add_argument('--lang', default='en', help="Language of the full Wikipedia language names")
+    serve.add_argument('--interval-hours', type=float, default=DEFAULT_INTERVAL / 3600, help="Hours between two scheduled runs of a category")
+    serve.add_argument('--schedule', default=None, help="JSON file with the interval in hours per category, overriding --interval-hours")
+    serve.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=['xlsx'], help="Report formats to write (default: xlsx)")
+    serve.add_argument('--fast-excel', action='store_true', help="Write Excel files with the fast, constant-memory writer")
+    serve.add_argument('--incremental', action='store_true', help="Only write reports for categories whose usage data changed")
+    serve.add_argument('--skip-unchanged', action='store_true', help="Skip categories whose GLAMorous XML is unchanged")
+    serve.add_argument('--history', action='store_true', help="Add the usage data of every run to the usage history in DATADIR/usage_history.sqlite")
+    serve.add_argument('--host', default='127.0.0.1', help="Address of the HTTP API")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port of the HTTP API, 0 to disable it")
+    submit = subparsers.add_parser('submit', help="Submit a report job")
+    submit.add_argument('category', help="The Commons category, e.g. 'Images from the Rijksmuseum'")
+    submit.add_argument('--shortname', default=None, help="The shortname of the institution (Excel sheet name)")
+    submit.add_argument('--depth', type=int, default=0, help="The GLAMorous search depth")
+    submit.add_argument('--url', default=None, help="Submit through the HTTP API at this URL, instead of the queue directory")
+    status = subparsers.add_parser('status', help="Show the status of a running daemon")
+    status.add_argument('--url', default=f"http://127.0.0.1:{DEFAULT_PORT}", help="The URL of the HTTP API")
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        if args.url:
+            print(json.dumps(_api_request(f"{args.url.rstrip('/')}/jobs", {'category': args.category, 'shortname': args.shortname,
+                                                                           'depth': args.depth}), indent=1))
+        else:
+            print(f"Queued {enqueue_job_file(args.datadir, args.category, args.shortname, args.depth)}")
+        return
+    if args.command == 'status':
+        print(json.dumps(_api_request(f"{args.url.rstrip('/')}/status"), indent=1, ensure_ascii=False))
+        return
+
+    institutions = []
+    if args.countries:
+        countries_dict = load_dict(args.dict)
+        if countries_dict is None:
+            return
+        institutions = [institution for country in args.countries
+                        for institution in get_country_institutions(countries_dict, country)]
+    schedule = {category: hours * 3600 for category, hours in (load_dict(args.schedule) or {}).items()} if args.schedule else None
+    daemon = ReportDaemon(institutions, datadir=args.datadir, workers=args.workers, lang=args.lang,
+                          report_writer=functools.partial(write_reports, formats=tuple(args.formats), fast_excel=args.fast_excel),
+                          interval=args.interval_hours * 3600, schedule=schedule, incremental=args.incremental,
+                          skip_unchanged=args.skip_unchanged, history=args.history)
+    api_url = daemon.start(args.host, args.port or None)
+    print(f"Report daemon started: {len(institutions)} scheduled categories, {args.workers} workers"
+          + (f", HTTP API on {api_url}" if api_url else ''))
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    try:
+        while not stopping.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("Stopping, waiting for the running jobs to finish...")
+    daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""
+This module provides a time-series store of the GLAMorous usage data, to follow the uptake of the images of a
+Commons category over time, e.g. the use of KB images in Wikipedia from 2014 to 2022 (see 'stories/'), without
+comparing separate dated reports by hand.
+
+Every run of a category adds a snapshot: its normalized set of (image, project, article) usages, with the date of the
+run. Consecutive snapshots of a category mostly contain the same usages, so the store is delta encoded: every usage
+is stored once per uninterrupted period in which it was present, as an interval of snapshot numbers
+(first_seq, last_seq), with last_seq NULL as long as the usage is present in the latest snapshot. Adding a snapshot
+only writes the usages that were added or removed since the previous snapshot, so dozens of monthly snapshots take
+little more space than one.
+
+At the same time, the number of usages, articles and images per language is stored for every snapshot, so the trend
+queries are answered from small tables:
+- snapshot_totals(): the totals of every snapshot of a category,
+- language_trend(): the usages (or articles, or images) per language over time, as a date x language table,
+- first_last_seen(): for every image of a category, the dates of the first and last snapshots it was used in,
+- image_history(): the same for one image, in all categories,
+- usages_at(): the full usage data of a category as of any snapshot.
+
+The store is an SQLite database (by default 'data/usage_history.sqlite'), separate from the query index of
+usage_index.py: the images and projects tables have the same form, but the articles have no title here, and an article
+may be stored before its project is known. Snapshots of a category must be added in chronological order; adding a
+snapshot with the same date as the latest one replaces it, so rerunning a category on the same day is harmless.
+
+Usage:
+    with UsageHistory('data/usage_history.sqlite') as history:
+        history.add_project_articles('Media contributed by Koninklijke Bibliotheek', project_articles, language_index)
+        history.language_trend('Media contributed by Koninklijke Bibliotheek')
+or from the command line:
+    python usage_history.py backfill Netherlands               # Add all dated reports of the Dutch institutions
+    python usage_history.py add data/ImagesfromHetUtrechtsArchief_Wikipedia_NS0_02052024.xlsx --category "Images from Het Utrechts Archief"
+    python usage_history.py snapshots "Images from Het Utrechts Archief"
+    python usage_history.py trend "Images from Het Utrechts Archief" --metric articles --csv trend.csv
+    python usage_history.py seen "Images from Het Utrechts Archief" --csv seen.csv
+    python usage_history.py image "AMH-7230-KB_Map_of_Borneo.jpg"
+GLAMorousToHTML_bulk.py adds a snapshot of every category it processes when run with --history.
+"""
+
+import argparse
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import date, datetime
+
+from general import load_dict
+from lazy_imports import lazy_import
+from usage_index import (UsageDatabase, intern_values, known_languages, normalize_image_name, usages_from_articles_pictures,
+                         usages_from_project_articles, usages_from_report)
+
+pd = lazy_import('pandas')  # Only needed for the trend queries
+
+USAGE_HISTORY_PATH = os.path.join('data', 'usage_history.sqlite')
+USAGE_HISTORY_VERSION = 1  # Stored as the 'user_version' of the database. Increase when the schema changes
+USAGE_HISTORY_APPLICATION_ID = 0x474C4853  # 'GLHS', stored as the 'application_id', see UsageDatabase
+TREND_METRICS = ('usages', 'articles', 'images')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS snapshots (series_id INTEGER NOT NULL REFERENCES series (id), seq INTEGER NOT NULL,
+                                      taken TEXT NOT NULL, added TEXT NOT NULL, usages INTEGER NOT NULL,
+                                      articles INTEGER NOT NULL, images INTEGER NOT NULL, languages INTEGER NOT NULL,
+                                      PRIMARY KEY (series_id, seq), UNIQUE (series_id, taken));
+CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE, language TEXT);
+CREATE TABLE IF NOT EXISTS images (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS articles (id INTEGER PRIMARY KEY, project_id INTEGER REFERENCES projects (id),
+                                     url TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS intervals (series_id INTEGER NOT NULL, article_id INTEGER NOT NULL, image_id INTEGER NOT NULL,
+                                      first_seq INTEGER NOT NULL, last_seq INTEGER,
+                                      PRIMARY KEY (series_id, article_id, image_id, first_seq)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshot_counts (series_id INTEGER NOT NULL, seq INTEGER NOT NULL, project_id INTEGER NOT NULL,
+                                            usages INTEGER NOT NULL, articles INTEGER NOT NULL, images INTEGER NOT NULL,
+                                            PRIMARY KEY (series_id, seq, project_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS intervals_by_image ON intervals (series_id, image_id, first_seq, last_seq);
+"""
+
+
+def snapshot_date(taken):
+    """
+    Normalizes the date of a snapshot to an ISO date string.
+    Parameters:
+    - taken (date, datetime or str): The date, as a date, an ISO date ('2024-05-02') or in the format of the report
+      file names ('02052024'). None means today.
+    Returns:
+    - str: The ISO date, e.g. '2024-05-02'.
+    """
+    if taken is None:
+        return date.today().isoformat()
+    if isinstance(taken, datetime):
+        return taken.date().isoformat()
+    if isinstance(taken, date):
+        return taken.isoformat()
+    if len(taken) == 8 and taken.isdigit():
+        return datetime.strptime(taken, '%d%m%Y').date().isoformat()
+    return date.fromisoformat(taken).isoformat()
+
+
+class UsageHistory(UsageDatabase):
+    """
+    The time-series store of the usage data, see the module docstring.
+    Parameters:
+    - path (str, optional): The path of the database file, created if it does not exist. Defaults to USAGE_HISTORY_PATH
+      ('data/usage_history.sqlite').
+    """
+
+    def __init__(self, path=USAGE_HISTORY_PATH):
+        super().__init__(path, SCHEMA, USAGE_HISTORY_VERSION, USAGE_HISTORY_APPLICATION_ID, 'usage history')
+
+    # Adding snapshots
+
+    def _series_id(self, category, create=False):
+        if create:
+            self.connection.execute('INSERT OR IGNORE INTO series (name) VALUES (?)', (category,))
+        row = self.connection.execute('SELECT id FROM series WHERE name = ?', (category,)).fetchone()
+        if row is None:
+            raise KeyError(f"No snapshots of '{category}' in {self.path}")
+        return row[0]
+
+    def latest_date(self, category):
+        """Returns the (ISO) date of the latest snapshot of a category, or None if it has no snapshots."""
+        row = self.connection.execute("""
+            SELECT MAX(s.taken) FROM snapshots s JOIN series c ON c.id = s.series_id WHERE c.name = ?""",
+                                      (category,)).fetchone()
+        return row[0]
+
+    def _drop_snapshot(self, series_id, seq):
+        """Removes the latest snapshot of a series, restoring the intervals to the state of the snapshot before."""
+        self.connection.execute('DELETE FROM intervals WHERE series_id = ? AND first_seq = ?', (series_id, seq))
+        self.connection.execute('UPDATE intervals SET last_seq = NULL WHERE series_id = ? AND last_seq = ?',
+                                (series_id, seq - 1))  # The usages that were removed in the dropped snapshot
+        self.connection.execute('DELETE FROM snapshot_counts WHERE series_id = ? AND seq = ?', (series_id, seq))
+        self.connection.execute('DELETE FROM snapshots WHERE series_id = ? AND seq = ?', (series_id, seq))
+
+    def add_usages(self, category, usages, languages=None, taken=None):
+        """
+        Adds a snapshot of the usage data of a Commons category.
+        Parameters:
+        - category (str): The Commons category (institution).
+        - usages (iterable): (project code, article URL, image names) tuples, see usage_index.py.
+        - languages (dict, optional): The full language name of every project code.
+        - taken (date or str, optional): The date of the snapshot, see snapshot_date(). Defaults to today.
+        Returns:
+        - dict: The number of usages in the snapshot, and the numbers of 'added' and 'removed' usages compared with the
+          previous snapshot.
+        Raises:
+        - ValueError: If the category has a snapshot that is more recent than 'taken'.
+        """
+        taken = snapshot_date(taken)
+        usages = [(project, url, list(images)) for project, url, images in usages]
+        with self.connection:
+            series_id = self._series_id(category, create=True)
+            latest = self.connection.execute('SELECT seq, taken FROM snapshots WHERE series_id = ? ORDER BY seq DESC LIMIT 1',
+                                             (series_id,)).fetchone()
+            if latest is not None and latest['taken'] > taken:
+                raise ValueError(f"'{category}' has a snapshot of {latest['taken']} already, snapshots must be added "
+                                 f"in chronological order")
+            if latest is not None and latest['taken'] == taken:
+                self._drop_snapshot(series_id, latest['seq'])
+                seq = latest['seq']
+            else:
+                seq = latest['seq'] + 1 if latest is not None else 1
+
+            project_ids = intern_values(self.connection, 'projects', 'code', (project for project, _, _ in usages))
+            self.connection.executemany('UPDATE projects SET language = ? WHERE code = ? AND language IS NOT ?',
+                                        ((language, project, language)
+                                         for project, language in known_languages(languages or {}).items()
+                                         if project in project_ids))
+            article_ids = intern_values(self.connection, 'articles', 'url', (url for _, url, _ in usages))
+            self.connection.executemany('UPDATE articles SET project_id = ? WHERE id = ? AND project_id IS NULL',
+                                        ((project_ids[project], article_ids[url]) for project, url, _ in usages))
+            image_ids = intern_values(self.connection, 'images', 'name', (image for _, _, images in usages for image in images))
+
+            current = set()
+            counts = defaultdict(lambda: [0, set(), set()])  # Project id -> [usages, article ids, image ids]
+            for project, url, images in usages:
+                article_id, project_count = article_ids[url], counts[project_ids[project]]
+                for image in images:
+                    if (article_id, image_ids[image]) not in current:
+                        current.add((article_id, image_ids[image]))
+                        project_count[0] += 1
+                        project_count[1].add(article_id)
+                        project_count[2].add(image_ids[image])
+
+            present = set(map(tuple, self.connection.execute(
+                'SELECT article_id, image_id FROM intervals WHERE series_id = ? AND last_seq IS NULL', (series_id,))))
+            removed, added = present - current, sorted(current - present)
+            self.connection.executemany("""
+                UPDATE intervals SET last_seq = ? WHERE series_id = ? AND article_id = ? AND image_id = ? AND last_seq IS NULL""",
+                                        ((seq - 1, series_id, article_id, image_id) for article_id, image_id in removed))
+            self.connection.executemany('INSERT INTO intervals VALUES (?, ?, ?, ?, NULL)',
+                                        ((series_id, article_id, image_id, seq) for article_id, image_id in added))
+
+            self.connection.executemany('INSERT INTO snapshot_counts VALUES (?, ?, ?, ?, ?, ?)',
+                                        ((series_id, seq, project_id, count[0], len(count[1]), len(count[2]))
+                                         for project_id, count in counts.items() if count[0]))
+            self.connection.execute('INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (series_id, seq, taken, datetime.now().isoformat(timespec='seconds'), len(current),
+                                     len({article_id for article_id, _ in current}),
+                                     len({image_id for _, image_id in current}),
+                                     sum(1 for count in counts.values() if count[0])))
+        return {'category': category, 'taken': taken, 'usages': len(current), 'added': len(added), 'removed': len(removed)}
+
+    def add_project_articles(self, category, project_articles, language_index=None, taken=None):
+        """Adds a snapshot from the output of build_project_articles(), see add_usages() and usage_index.py."""
+        return self.add_usages(category, *usages_from_project_articles(project_articles, language_index), taken=taken)
+
+    def add_articles_pictures(self, category, articles_pictures_dict, taken=None):
+        """Adds a snapshot from the output of add_images_to_dict(), see add_usages() and usage_index.py."""
+        return self.add_usages(category, *usages_from_articles_pictures(articles_pictures_dict), taken=taken)
+
+    def add_report(self, category, report, taken):
+        """Adds a snapshot from a report DataFrame or report file, see add_usages() and usage_index.py."""
+        return self.add_usages(category, *usages_from_report(report), taken=taken)
+
+    # Trend queries
+
+    def categories(self):
+        """Returns the Commons categories that have snapshots."""
+        return [row[0] for row in self.connection.execute('SELECT name FROM series ORDER BY name')]
+
+    def snapshot_totals(self, category):
+        """
+        Returns the totals of every snapshot of a category.
+        Returns:
+        - DataFrame: One row per snapshot date, with the numbers of 'usages', 'articles', 'images' and 'languages'.
+        """
+        df = pd.read_sql_query("""
+            SELECT s.taken AS date, s.usages, s.articles, s.images, s.languages
+            FROM snapshots s WHERE s.series_id = ? ORDER BY s.seq""", self.connection, params=(self._series_id(category),))
+        return df.set_index(pd.to_datetime(df.pop('date')).rename('date'))
+
+    def language_trend(self, category=None, metric='usages', by='language'):
+        """
+        Returns the usages (or articles, or images) per language over time.
+        Parameters:
+        - category (str, optional): The Commons category. If None, the sum over all categories, where every category
+          counts with its latest snapshot at (or before) each date. Articles and images that several categories have
+          in common are then counted once per category.
+        - metric (str, optional): 'usages' (default), 'articles' or 'images'.
+        - by (str, optional): 'language' (default) for the full language names, or 'project' for the project codes.
+        Returns:
+        - DataFrame: One row per snapshot date and one column per language, ordered by the value at the latest date.
+        """
+        if metric not in TREND_METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {TREND_METRICS}")
+        column = 'COALESCE(p.language, p.code)' if by == 'language' else 'p.code'
+        series_id = self._series_id(category) if category is not None else None
+        condition, parameters = ('WHERE s.series_id = ?', (series_id,)) if category is not None else ('', ())
+        snapshots = pd.read_sql_query(f"SELECT s.series_id, s.taken AS date FROM snapshots s {condition}",
+                                      self.connection, params=parameters)
+        counts = pd.read_sql_query(f"""
+            SELECT n.series_id, s.taken AS date, {column} AS label, SUM(n.{metric}) AS value
+            FROM snapshot_counts n JOIN snapshots s ON s.series_id = n.series_id AND s.seq = n.seq
+                 JOIN projects p ON p.id = n.project_id
+            {condition} GROUP BY n.series_id, s.seq, {column}""", self.connection, params=parameters)
+        if snapshots.empty:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+        snapshots['date'] = pd.to_datetime(snapshots['date'])
+        counts['date'] = pd.to_datetime(counts['date'])
+        dates = pd.DatetimeIndex(sorted(snapshots['date'].unique()), name='date')
+        series_counts = dict(tuple(counts.groupby('series_id')))
+        trends = []
+        for series_id, series_dates in snapshots.groupby('series_id')['date']:
+            # A snapshot without usages has no counts, but must count as zero rather than be skipped
+            series = series_counts.get(series_id, counts.iloc[:0])
+            table = series.pivot_table(index='date', columns='label', values='value', aggfunc='sum', fill_value=0)
+            table = table.reindex(pd.DatetimeIndex(sorted(series_dates), name='date'), fill_value=0)
+            # A category counts with its latest snapshot at each date, and not at all before its first snapshot
+            trends.append(table.reindex(dates).ffill().fillna(0))
+        trend = pd.concat(trends).groupby(level=0).sum().astype('int64')
+        trend = trend[trend.iloc[-1].sort_values(ascending=False).index]
+        trend.columns.name = by
+        return trend
+
+    def first_last_seen(self, category):
+        """
+        Returns, for every image of a category, the dates of the first and the last snapshot in which it is used.
+        Returns:
+        - DataFrame: One row per image, with 'first_seen' and 'last_seen' dates, and 'in_use' (whether it is used in the
+          latest snapshot), ordered by 'first_seen'.
+        """
+        series_id = self._series_id(category)
+        latest = self.connection.execute('SELECT MAX(seq) FROM snapshots WHERE series_id = ?', (series_id,)).fetchone()[0]
+        df = pd.read_sql_query("""
+            SELECT i.name AS image, f.taken AS first_seen, l.taken AS last_seen, v.last_seq = ? AS in_use
+            FROM (SELECT image_id, MIN(first_seq) AS first_seq, MAX(COALESCE(last_seq, ?)) AS last_seq
+                  FROM intervals WHERE series_id = ? GROUP BY image_id) v
+                 JOIN images i ON i.id = v.image_id
+                 JOIN snapshots f ON f.series_id = ? AND f.seq = v.first_seq
+                 JOIN snapshots l ON l.series_id = ? AND l.seq = v.last_seq
+            ORDER BY f.seq, i.name""", self.connection, params=(latest, latest, series_id, series_id, series_id))
+        df['first_seen'], df['last_seen'] = pd.to_datetime(df['first_seen']), pd.to_datetime(df['last_seen'])
+        df['in_use'] = df['in_use'].astype(bool)
+        return df
+
+    def image_history(self, image):
+        """
+        Returns the history of one image, in every category it belongs to.
+        Parameters:
+        - image (str): The image name, with or without 'File:' prefix, with spaces or underscores.
+        Returns:
+        - list: {'category', 'first_seen', 'last_seen', 'in_use', 'usages'} dicts, 'usages' being the number of
+          articles the image is used in according to the latest snapshot of the category.
+        """
+        return [dict(row) for row in self.connection.execute("""
+            SELECT c.name AS category, f.taken AS first_seen, l.taken AS last_seen, v.last_seq = m.seq AS in_use, v.usages
+            FROM (SELECT t.series_id, MIN(t.first_seq) AS first_seq,
+                         MAX(COALESCE(t.last_seq, (SELECT MAX(seq) FROM snapshots WHERE series_id = t.series_id))) AS last_seq,
+                         SUM(t.last_seq IS NULL) AS usages
+                  FROM images i CROSS JOIN series r CROSS JOIN intervals t ON t.series_id = r.id AND t.image_id = i.id
+                  WHERE i.name = ? GROUP BY t.series_id) v
+                 JOIN series c ON c.id = v.series_id
+                 JOIN snapshots f ON f.series_id = v.series_id AND f.seq = v.first_seq
+                 JOIN snapshots l ON l.series_id = v.series_id AND l.seq = v.last_seq
+                 JOIN (SELECT series_id, MAX(seq) AS seq FROM snapshots GROUP BY series_id) m ON m.series_id = v.series_id
+            ORDER BY c.name""", (normalize_image_name(image),))]
+
+    def usages_at(self, category, taken=None):
+        """
+        Reconstructs the usage data of a category as of a snapshot.
+        Parameters:
+        - category (str): The Commons category.
+        - taken (date or str, optional): The date; the latest snapshot at or before this date is used. Defaults to the
+          latest snapshot.
+        Returns:
+        - dict: {project: {article URL: {image name: None}}}, as returned by build_project_articles(), or None if the
+          category has no snapshot at that date. The images of an article are in alphabetical order.
+        """
+        series_id = self._series_id(category)
+        row = self.connection.execute('SELECT MAX(seq) FROM snapshots WHERE series_id = ? AND taken <= ?',
+                                      (series_id, snapshot_date(taken) if taken is not None else '9999-12-31')).fetchone()
+        if row[0] is None:
+            return None
+        project_articles = {}
+        for project, url, image in self.connection.execute("""
+                SELECT p.code, a.url, i.name
+                FROM intervals t JOIN articles a ON a.id = t.article_id JOIN projects p ON p.id = a.project_id
+                     JOIN images i ON i.id = t.image_id
+                WHERE t.series_id = ? AND t.first_seq <= ? AND (t.last_seq IS NULL OR t.last_seq >= ?)
+                ORDER BY p.code, a.url, i.name""", (series_id, row[0], row[0])):
+            project_articles.setdefault(project, {}).setdefault(url, {})[image] = None
+        return project_articles
+
+    def stats(self):
+        """
+        Returns the size of the store.
+        Returns:
+        - dict: The numbers of categories, snapshots, usages in all snapshots together, and stored intervals.
+        """
+        snapshots, usages = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(usages), 0) FROM snapshots').fetchone()
+        return {'categories': len(self.categories()), 'snapshots': snapshots, 'usages': usages,
+                'intervals': self.connection.execute('SELECT COUNT(*) FROM intervals').fetchone()[0]}
+
+
+def record_snapshot(history_path, category, project_articles, language_index=None, taken=None):
+    """
+    Adds a snapshot of a run to the store in 'history_path', see UsageHistory.add_project_articles(). Errors are printed,
+    so a failure to record the history never fails the run itself.
+    Returns:
+    - dict: The summary of the snapshot, or None if it could not be added.
+    """
+    try:
+        with UsageHistory(history_path) as history:
+            return history.add_project_articles(category, project_articles, language_index, taken)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Could not add the snapshot of {category} to {history_path}: {e}")
+        return None
+
+
+def backfill_reports(history, category, datadir='data'):
+    """
+    Adds the dated Excel reports of a category in 'datadir' (see dated_report_paths() in aggregation.py) that are more
+    recent than its latest snapshot, in chronological order.
+    Returns:
+    - list: The summaries of the added snapshots.
+    """
+    from aggregation import dated_report_paths
+
+    latest = history.latest_date(category)
+    summaries = []
+    for taken, path in dated_report_paths(category, datadir):
+        if latest is not None and snapshot_date(taken) <= latest:
+            continue
+        summaries.append(history.add_report(category, path, taken))
+        print(f"Added the snapshot of {summaries[-1]['taken']} of '{category}': {summaries[-1]['usages']} usages, "
+              f"{summaries[-1]['added']} added, {summaries[-1]['removed']} removed")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the time series of the GLAMorous usage data.")
+    parser.add_argument('--history', default=USAGE_HISTORY_PATH, help="The usage history database file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill = subparsers.add_parser('backfill', help="Add the dated reports of all institutions of one or more countries")
+    backfill.add_argument('countries', nargs='+', help="Country keys in category_logo_dict.json, such as 'Netherlands'")
+    backfill.add_argument('--dict', default='category_logo_dict.json', help="The JSON file with the institutions per country")
+    backfill.add_argument('--datadir', default='data', help="Directory with the Excel reports")
+    add = subparsers.add_parser('add', help="Add one report file as a snapshot")
+    add.add_argument('report', help="The report file (.xlsx, .parquet, .feather or .csv.gz)")
+    add.add_argument('--category', required=True, help="The Commons category (institution) of the report")
+    add.add_argument('--date', default=None, help="The date of the report (default: the date in the file name)")
+    snapshots = subparsers.add_parser('snapshots', help="The totals of every snapshot of a category")
+    trend = subparsers.add_parser('trend', help="The usages (or articles, or images) per language over time")
+    trend.add_argument('--metric', choices=TREND_METRICS, default='usages', help="What to count per language")
+    seen = subparsers.add_parser('seen', help="The first and last date every image of a category was used")
+    for subparser in (snapshots, trend, seen):
+        subparser.add_argument('category', nargs='?' if subparser is trend else None,
+                               help="The Commons category" + (" (default: all categories)" if subparser is trend else ''))
+        subparser.add_argument('--csv', default=None, help="Also write the result to this CSV file (';'-separated)")
+    image = subparsers.add_parser('image', help="The history of one image")
+    image.add_argument('name', help="The image name, e.g. 'AMH-7230-KB_Map_of_Borneo.jpg'")
+    subparsers.add_parser('stats', help="The size of the store")
+    args = parser.parse_args()
+
+    with UsageHistory(args.history) as history:
+        if args.command == 'backfill':
+            countries_dict = load_dict(args.dict)
+            if countries_dict is None:
+                return
+            for country in args.countries:
+                for category in countries_dict.get(country, {}):
+                    backfill_reports(history, category, args.datadir)
+        elif args.command == 'add':
+            taken = args.date or os.path.basename(args.report).split('.')[0].rsplit('_', 1)[-1]
+            print(history.add_report(args.category, args.report, taken))
+        elif args.command == 'image':
+            for row in history.image_history(args.name):
+                print(f"{row['first_seen']} - {row['last_seen']}  {'in use' if row['in_use'] else 'no longer used'}"
+                      f" ({row['usages']} articles)  {row['category']}")
+        elif args.command == 'stats':
+            print(history.stats())
+        else:
+            result = {'snapshots': lambda: history.snapshot_totals(args.category),
+                      'trend': lambda: history.language_trend(args.category, args.metric),
+                      'seen': lambda: history.first_last_seen(args.category)}[args.command]()
+            with pd.option_context('display.max_rows', 100, 'display.width', 200):
+                print(result)
+            if args.csv:
+                result.to_csv(args.csv, sep=';', encoding='utf-8-sig')
+
+
+if __name__ == "__main__":
+    main()
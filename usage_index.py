@@ -0,0 +1,548 @@
+"""
+This module provides a persistent query index over the GLAMorous usage data, for quick lookups such as
+"which articles use image X", "which of our images are used in article Y" and "which images are used in the most
+languages", without running the pipeline again or searching the 'Images' column of the Excel reports.
+
+The index is an SQLite database (by default 'data/usage_index.sqlite'), in which image names, Wikipedia articles and
+projects are stored once, and every usage of an image in an article is one row of the 'usages' table:
+    categories (id, name, indexed)             The Commons categories (institutions) that have been indexed
+    projects   (id, code, language)            E.g. ('fr.wikipedia', 'French')
+    images     (id, name)                      E.g. 'AMH-7230-KB_Map_of_Borneo.jpg'
+    articles   (id, project_id, url, title)    E.g. 'https://fr.wikipedia.org/wiki/Bornéo', title 'Bornéo'
+    usages     (category_id, article_id, image_id, position)
+The 'usages' table is indexed by article and by image, so every lookup is a handful of B-tree searches, taking
+milliseconds even for the largest categories. The number of languages and articles every image is used in is kept in
+the 'image_stats' table, per category and over all categories (category_id 0), so ranking the images needs no scan
+of the usages either. When a category is indexed, only the stats of its images are recomputed. Indexing a category
+replaces its previous usages, so the index always reflects the most recent run of every category.
+
+The usage data can be indexed from:
+- the output of add_images_to_dict() (the step-by-step pipeline), with add_articles_pictures(),
+- the output of build_project_articles() (the streaming pipeline, and the snapshots of incremental.py), with
+  add_project_articles(), or
+- a report DataFrame (see convert_to_dataframe()) or report file in the 'data/' folder, with add_report(), so
+  existing reports can be indexed without parsing the GLAMorous XML again.
+
+Usage:
+    with UsageIndex('data/usage_index.sqlite') as index:
+        index.add_articles_pictures('Media contributed by Koninklijke Bibliotheek', articles_pictures_dict)
+        index.articles_for_image('AMH-7230-KB_Map_of_Borneo.jpg')
+        index.images_in_article('https://fr.wikipedia.org/wiki/Bornéo')
+        index.top_images(by='languages', limit=10)
+or from the command line:
+    python usage_index.py build Netherlands                  # Index the latest reports of all Dutch institutions
+    python usage_index.py add data/KB_Wikipedia_NS0_02052024.xlsx --category "Media contributed by Koninklijke Bibliotheek"
+    python usage_index.py image "AMH-7230-KB_Map_of_Borneo.jpg"
+    python usage_index.py article "https://fr.wikipedia.org/wiki/Bornéo"
+    python usage_index.py article Bornéo --project fr.wikipedia
+    python usage_index.py project nl.wikipedia
+    python usage_index.py language Dutch
+    python usage_index.py top-images --by languages --limit 20
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from urllib.parse import unquote
+
+from general import load_dict, read_excel_cached, get_full_language_name, LANGUAGE_NOT_FOUND, IMAGE_SEPARATOR
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')  # Only needed to read report files
+
+USAGE_INDEX_PATH = os.path.join('data', 'usage_index.sqlite')
+USAGE_INDEX_VERSION = 1  # Stored as the 'user_version' of the database. Increase when the schema changes
+USAGE_INDEX_APPLICATION_ID = 0x474C4958  # 'GLIX', stored as the 'application_id', to tell the index from other databases
+REPORT_COLUMNS = ['ProjectCode', 'FullLanguageName', 'ArticleURL', 'Images']
+USAGE_INDEX_CACHE_SIZE = 256 * 1024 * 1024  # Bytes of SQLite page cache, which keeps (re)indexing large categories fast
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, indexed TEXT);
+CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE, language TEXT);
+CREATE TABLE IF NOT EXISTS images (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS articles (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL REFERENCES projects (id),
+                                     url TEXT NOT NULL UNIQUE, title TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS usages (category_id INTEGER NOT NULL REFERENCES categories (id),
+                                   article_id INTEGER NOT NULL REFERENCES articles (id),
+                                   image_id INTEGER NOT NULL REFERENCES images (id),
+                                   position INTEGER NOT NULL,
+                                   PRIMARY KEY (category_id, article_id, image_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS image_stats (category_id INTEGER NOT NULL, image_id INTEGER NOT NULL,
+                                        languages INTEGER NOT NULL, articles INTEGER NOT NULL,
+                                        PRIMARY KEY (category_id, image_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS usages_by_image ON usages (image_id, article_id);
+CREATE INDEX IF NOT EXISTS image_stats_by_languages ON image_stats (category_id, languages DESC, articles DESC);
+CREATE INDEX IF NOT EXISTS image_stats_by_articles ON image_stats (category_id, articles DESC, languages DESC);
+CREATE INDEX IF NOT EXISTS usages_by_article ON usages (article_id, position);
+CREATE INDEX IF NOT EXISTS articles_by_title ON articles (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS articles_by_project ON articles (project_id);
+CREATE INDEX IF NOT EXISTS projects_by_language ON projects (language COLLATE NOCASE);
+"""
+
+
+def normalize_image_name(name):
+    """
+    Normalizes an image name as typed by a user to the form used by GLAMorous, e.g.
+    'File:Map of Borneo.jpg' -> 'Map_of_Borneo.jpg'.
+    """
+    name = name.strip()
+    if name[:5].lower() == 'file:':
+        name = name[5:]
+    return name.replace(' ', '_')
+
+
+def article_title(url):
+    """
+    Returns the (human readable) title of a Wikipedia article from its URL, e.g.
+    'https://fr.wikipedia.org/wiki/%C3%8Eles_de_la_Sonde' -> 'Îles de la Sonde'.
+    """
+    return unquote(url.split('/wiki/', 1)[-1]).replace('_', ' ')
+
+
+def intern_values(connection, table, column, values):
+    """
+    Returns {value: id} for the given values of a unique column of an SQLite table, inserting the values that are missing.
+    Parameters:
+    - connection (sqlite3.Connection): The database connection.
+    - table, column (str): The table and its unique column, e.g. 'images' and 'name'.
+    - values (iterable): The values, e.g. image names. Duplicates are allowed.
+    """
+    values = list(dict.fromkeys(values))
+    connection.executemany(f'INSERT OR IGNORE INTO {table} ({column}) VALUES (?)', ((value,) for value in values))
+    ids = {}
+    for start in range(0, len(values), 500):  # Stay below the maximum number of SQL variables
+        chunk = values[start:start + 500]
+        query = f"SELECT {column}, id FROM {table} WHERE {column} IN ({','.join('?' * len(chunk))})"
+        ids.update(connection.execute(query, chunk).fetchall())
+    return ids
+
+
+def known_languages(languages):
+    """
+    Returns the full language names of the project codes, without the placeholders of unknown languages: None (e.g.
+    no 'fullLanguageName' in the output of add_images_to_dict()), NaN and 'Unknown' (in report files), and
+    LANGUAGE_NOT_FOUND. These must never overwrite a language name stored for another category.
+    """
+    return {project: language for project, language in languages.items()
+            if isinstance(language, str) and language not in ('', 'Unknown', LANGUAGE_NOT_FOUND)}
+
+
+def usages_from_articles_pictures(articles_pictures_dict):
+    """
+    Turns the output of add_images_to_dict() into usage tuples.
+    Returns:
+    - tuple: (usages, languages): an iterator of (project code, article URL, image names) tuples, and the full language
+      name of every project code.
+    """
+    usages = ((project, article['wikiURL'], article['imagesInArticle'])
+              for project, info in articles_pictures_dict.items() for article in info.get('articles', []))
+    return usages, {project: info.get('fullLanguageName') for project, info in articles_pictures_dict.items()}
+
+
+def usages_from_project_articles(project_articles, language_index=None):
+    """
+    Turns the output of build_project_articles() into usage tuples, see usages_from_articles_pictures().
+    The full language names are only known if a language index (see build_language_index()) is given.
+    """
+    usages = ((project, url, images) for project, articles in project_articles.items() for url, images in articles.items())
+    languages = {}
+    if language_index is not None:
+        for project in project_articles:
+            language = get_full_language_name(language_index, project)
+            if language != LANGUAGE_NOT_FOUND:
+                languages[project] = language
+    return usages, languages
+
+
+def usages_from_report(report):
+    """
+    Turns a report into usage tuples, see usages_from_articles_pictures().
+    Parameters:
+    - report (DataFrame or str): A report DataFrame (see convert_to_dataframe()), or the path of a report file
+      ('.xlsx', '.parquet', '.feather' or '.csv.gz', see write_report_files()).
+    """
+    if isinstance(report, (str, os.PathLike)):
+        report = read_report(str(report))
+    df = report[REPORT_COLUMNS].fillna({'Images': ''})
+    usages = ((project, url, [image for image in images.split(IMAGE_SEPARATOR) if image])
+              for project, url, images in zip(df['ProjectCode'], df['ArticleURL'], df['Images'].astype(str)))
+    return usages, dict(zip(df['ProjectCode'], df['FullLanguageName']))
+
+
+def read_report(path):
+    """Reads the columns needed for the index from a report file, see write_report_files() in general.py."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=REPORT_COLUMNS)
+    if path.endswith('.feather'):
+        return pd.read_feather(path, columns=REPORT_COLUMNS)
+    if path.endswith('.csv.gz'):
+        return pd.read_csv(path, usecols=REPORT_COLUMNS, keep_default_na=False)
+    return read_excel_cached(path, REPORT_COLUMNS)
+
+
+class UsageDatabase:
+    """
+    The SQLite setup shared by the usage index (UsageIndex) and the usage history (UsageHistory in usage_history.py):
+    opens (or creates) the database file in WAL mode, checks that it is a database of the right kind and version, and
+    creates the schema. Can be used as a context manager, which closes the connection.
+    Parameters:
+    - path (str): The path of the database file, created if it does not exist.
+    - schema (str): The SQL script that creates the tables and indexes (with IF NOT EXISTS).
+    - version (int): The version of the schema, stored as the 'user_version' of the database.
+    - application_id (int): Stored as the 'application_id' of the database, so the index and the history (whose
+      tables have the same names, but not the same columns) are never opened from the same file.
+    - kind (str): The kind of database, for the error messages, e.g. 'usage index'.
+    - cache_size (int, optional): The size of the SQLite page cache in bytes. Defaults to the SQLite default.
+    Raises:
+    - ValueError: If the file is a database of another kind or version.
+    """
+
+    def __init__(self, path, schema, version, application_id, kind, cache_size=None):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        try:
+            self.connection.execute('PRAGMA journal_mode=WAL')  # Readers are not blocked while data is added
+            self.connection.execute('PRAGMA synchronous=NORMAL')  # Safe in WAL mode: a crash can only lose the last commit
+            if cache_size is not None:
+                self.connection.execute(f'PRAGMA cache_size=-{cache_size // 1024}')
+            found_id = self.connection.execute('PRAGMA application_id').fetchone()[0]
+            if found_id not in (0, application_id):
+                raise ValueError(f"{path} is not a {kind}, but another database.")
+            found_version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            if found_version not in (0, version):
+                raise ValueError(f"{path} is a version {found_version} {kind}, expected version {version}. "
+                                 f"Delete it and build it again.")
+            with self.connection:
+                self.connection.executescript(schema)
+                self.connection.execute(f'PRAGMA user_version = {version}')
+                self.connection.execute(f'PRAGMA application_id = {application_id}')
+        except Exception:
+            self.connection.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
+
+
+class UsageIndex(UsageDatabase):
+    """
+    The SQLite query index over the usage data, see the module docstring.
+    Parameters:
+    - path (str, optional): The path of the database file, created if it does not exist. Defaults to USAGE_INDEX_PATH
+      ('data/usage_index.sqlite').
+    """
+
+    def __init__(self, path=USAGE_INDEX_PATH):
+        super().__init__(path, SCHEMA, USAGE_INDEX_VERSION, USAGE_INDEX_APPLICATION_ID, 'usage index',
+                         cache_size=USAGE_INDEX_CACHE_SIZE)
+
+    # Building the index
+
+    def add_usages(self, category, usages, languages=None):
+        """
+        Indexes the usage data of a Commons category, replacing the usages indexed for it before.
+        Parameters:
+        - category (str): The Commons category (institution) the usages belong to.
+        - usages (iterable): (project code, article URL, image names) tuples, with the image names in report order.
+        - languages (dict, optional): The full language name of every project code.
+        Returns:
+        - int: The number of indexed usages.
+        """
+        usages = [(project, url, list(images)) for project, url, images in usages]
+        languages = known_languages(languages or {})
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO categories (name) VALUES (?)', (category,))
+            self.connection.execute('UPDATE categories SET indexed = ? WHERE name = ?',
+                                    (datetime.now().isoformat(timespec='seconds'), category))
+            category_id = self.connection.execute('SELECT id FROM categories WHERE name = ?', (category,)).fetchone()[0]
+            self._start_image_stats(category_id)
+            self.connection.execute('DELETE FROM usages WHERE category_id = ?', (category_id,))
+
+            project_ids = intern_values(self.connection, 'projects', 'code', (project for project, _, _ in usages))
+            self.connection.executemany('UPDATE projects SET language = ? WHERE code = ?',
+                                        ((language, project) for project, language in languages.items()
+                                         if project in project_ids))
+            self.connection.executemany('INSERT OR IGNORE INTO articles (project_id, url, title) VALUES (?, ?, ?)',
+                                        ((project_ids[project], url, article_title(url)) for project, url, _ in usages))
+            article_ids = intern_values(self.connection, 'articles', 'url', (url for _, url, _ in usages))
+            image_ids = intern_values(self.connection, 'images', 'name', (image for _, _, images in usages for image in images))
+            # Inserting in primary key order is much faster than in random order
+            rows = sorted((category_id, article_ids[url], image_ids[image], position)
+                          for _, url, images in usages for position, image in enumerate(images))
+            self.connection.executemany('INSERT OR IGNORE INTO usages VALUES (?, ?, ?, ?)', rows)
+            self._refresh_image_stats(category_id)
+            return self.connection.execute('SELECT COUNT(*) FROM usages WHERE category_id = ?', (category_id,)).fetchone()[0]
+
+    def add_articles_pictures(self, category, articles_pictures_dict):
+        """
+        Indexes the output of add_images_to_dict() for a Commons category, see add_usages().
+        Parameters:
+        - category (str): The Commons category (institution).
+        - articles_pictures_dict (dict): As returned by add_images_to_dict(): {project code: {'fullLanguageName': ...,
+          'articles': [{'wikiURL': ..., 'imagesInArticle': [...]}]}}.
+        Returns:
+        - int: The number of indexed usages.
+        """
+        return self.add_usages(category, *usages_from_articles_pictures(articles_pictures_dict))
+
+    def add_project_articles(self, category, project_articles, language_index=None):
+        """
+        Indexes the output of build_project_articles() for a Commons category, see add_usages().
+        Parameters:
+        - category (str): The Commons category (institution).
+        - project_articles (dict): {project: {article URL: {image name: None}}}, as returned by build_project_articles().
+        - language_index (dict, optional): A language index (see build_language_index()), to store the full language
+          name of every project.
+        Returns:
+        - int: The number of indexed usages.
+        """
+        return self.add_usages(category, *usages_from_project_articles(project_articles, language_index))
+
+    def add_report(self, category, report):
+        """
+        Indexes a report of a Commons category, see add_usages().
+        Parameters:
+        - category (str): The Commons category (institution).
+        - report (DataFrame or str): A report DataFrame (see convert_to_dataframe()), or the path of a report file
+          ('.xlsx', '.parquet', '.feather' or '.csv.gz', see write_report_files()).
+        Returns:
+        - int: The number of indexed usages.
+        """
+        return self.add_usages(category, *usages_from_report(report))
+
+    def remove_category(self, category):
+        """Removes the usages of a Commons category from the index."""
+        with self.connection:
+            row = self.connection.execute('SELECT id FROM categories WHERE name = ?', (category,)).fetchone()
+            if row is None:
+                return
+            self._start_image_stats(row[0])
+            self.connection.execute('DELETE FROM usages WHERE category_id = ?', (row[0],))
+            self._refresh_image_stats(row[0])
+            self.connection.execute('DELETE FROM categories WHERE id = ?', (row[0],))
+
+    def _start_image_stats(self, category_id):
+        """Collects the images of a category before its usages are replaced, see _refresh_image_stats()."""
+        self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS changed_images (image_id INTEGER PRIMARY KEY)')
+        self.connection.execute('DELETE FROM changed_images')
+        self.connection.execute('INSERT INTO changed_images SELECT DISTINCT image_id FROM usages WHERE category_id = ?',
+                                (category_id,))
+
+    def _refresh_image_stats(self, category_id):
+        """Recomputes the image stats of a category, and the overall stats of its previous and current images."""
+        self.connection.execute('INSERT OR IGNORE INTO changed_images SELECT DISTINCT image_id FROM usages WHERE category_id = ?',
+                                (category_id,))
+        self.connection.execute('DELETE FROM image_stats WHERE category_id = ?', (category_id,))
+        self.connection.execute("""
+            INSERT INTO image_stats
+            SELECT u.category_id, u.image_id, COUNT(DISTINCT a.project_id), COUNT(DISTINCT u.article_id)
+            FROM usages u JOIN articles a ON a.id = u.article_id WHERE u.category_id = ? GROUP BY u.image_id""",
+                                (category_id,))
+        self.connection.execute('DELETE FROM image_stats WHERE category_id = 0 AND image_id IN changed_images')
+        self.connection.execute("""
+            INSERT INTO image_stats
+            SELECT 0, u.image_id, COUNT(DISTINCT a.project_id), COUNT(DISTINCT u.article_id)
+            FROM changed_images c JOIN usages u ON u.image_id = c.image_id JOIN articles a ON a.id = u.article_id
+            GROUP BY u.image_id""")
+
+    # Lookups
+
+    def _query(self, sql, parameters=()):
+        return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def _category_filter(self, category, alias='u'):
+        if category is None:
+            return '', ()
+        return f' AND {alias}.category_id = (SELECT id FROM categories WHERE name = ?)', (category,)
+
+    def articles_for_image(self, image, category=None):
+        """
+        Returns the Wikipedia articles in which an image is used.
+        Parameters:
+        - image (str): The image name, with or without 'File:' prefix, with spaces or underscores.
+        - category (str, optional): Only usages of this Commons category. Defaults to all categories.
+        Returns:
+        - list: {'project', 'language', 'url', 'title'} dicts, ordered by project and title.
+        """
+        where, parameters = self._category_filter(category)
+        return self._query(f"""
+            SELECT DISTINCT p.code AS project, p.language, a.url, a.title
+            FROM images i JOIN usages u ON u.image_id = i.id JOIN articles a ON a.id = u.article_id
+                 JOIN projects p ON p.id = a.project_id
+            WHERE i.name = ?{where} ORDER BY p.code, a.title""", (normalize_image_name(image),) + parameters)
+
+    def images_in_article(self, article, project=None, category=None):
+        """
+        Returns the images used in a Wikipedia article.
+        Parameters:
+        - article (str): The article URL, or its title (case-insensitive, with spaces or underscores).
+        - project (str, optional): The project of the article (e.g. 'fr.wikipedia'), when looking up by title.
+          Defaults to all projects.
+        - category (str, optional): Only images of this Commons category. Defaults to all categories.
+        Returns:
+        - list: {'project', 'url', 'image', 'category'} dicts, in the order of the report.
+        """
+        if article.startswith(('http://', 'https://')):
+            condition, parameters = 'a.url = ?', (article,)
+        else:
+            condition, parameters = 'a.title = ? COLLATE NOCASE', (unquote(article).replace('_', ' ').strip(),)
+        if project is not None:
+            condition, parameters = condition + ' AND p.code = ?', parameters + (project,)
+        where, category_parameters = self._category_filter(category)
+        return self._query(f"""
+            SELECT p.code AS project, a.url, i.name AS image, c.name AS category
+            FROM articles a JOIN projects p ON p.id = a.project_id JOIN usages u ON u.article_id = a.id
+                 JOIN images i ON i.id = u.image_id JOIN categories c ON c.id = u.category_id
+            WHERE {condition}{where} ORDER BY p.code, a.url, c.name, u.position""", parameters + category_parameters)
+
+    def articles_in_project(self, project=None, language=None, category=None):
+        """
+        Returns the articles of a project (by project code or full language name) that use indexed images.
+        Parameters:
+        - project (str, optional): The project code, e.g. 'nl.wikipedia'.
+        - language (str, optional): The full language name, e.g. 'Dutch' (case-insensitive), instead of 'project'.
+        - category (str, optional): Only usages of this Commons category. Defaults to all categories.
+        Returns:
+        - list: {'project', 'url', 'title', 'images'} dicts (with the number of images), by descending number of images.
+        """
+        if project is not None:
+            condition, parameters = 'p.code = ?', (project,)
+        elif language is not None:
+            condition, parameters = 'p.language = ? COLLATE NOCASE', (language,)
+        else:
+            raise ValueError("Either 'project' or 'language' is needed")
+        where, category_parameters = self._category_filter(category)
+        return self._query(f"""
+            SELECT p.code AS project, a.url, a.title, COUNT(DISTINCT u.image_id) AS images
+            FROM projects p JOIN articles a ON a.project_id = p.id JOIN usages u ON u.article_id = a.id
+            WHERE {condition}{where} GROUP BY a.id ORDER BY images DESC, a.title""", parameters + category_parameters)
+
+    def top_images(self, by='languages', limit=20, category=None):
+        """
+        Returns the most widely used images.
+        Parameters:
+        - by (str, optional): 'languages' (default) to rank by the number of projects (language versions) an image is
+          used in, or 'articles' to rank by the number of articles.
+        - limit (int, optional): The number of images. Defaults to 20.
+        - category (str, optional): Only usages of this Commons category. Defaults to all categories.
+        Returns:
+        - list: {'image', 'languages', 'articles'} dicts, ranked by 'by' and then by the other count.
+        """
+        if by not in ('languages', 'articles'):
+            raise ValueError(f"Cannot rank images by '{by}', only by 'languages' or 'articles'")
+        other = 'articles' if by == 'languages' else 'languages'
+        if category is None:
+            condition, parameters = 's.category_id = 0', ()
+        else:
+            condition, parameters = 's.category_id = (SELECT id FROM categories WHERE name = ?)', (category,)
+        return self._query(f"""
+            SELECT i.name AS image, s.languages, s.articles
+            FROM image_stats s JOIN images i ON i.id = s.image_id
+            WHERE {condition} ORDER BY s.{by} DESC, s.{other} DESC LIMIT ?""", parameters + (limit,))
+
+    def search_images(self, pattern, limit=50):
+        """Returns the names of indexed images containing 'pattern' (case-insensitive), e.g. 'Borneo'."""
+        return [row['name'] for row in self.connection.execute(
+            "SELECT name FROM images WHERE name LIKE ? ORDER BY name LIMIT ?", (f"%{normalize_image_name(pattern)}%", limit))]
+
+    def stats(self):
+        """
+        Returns the contents of the index.
+        Returns:
+        - dict: The number of usages, images and articles per indexed category, and the totals.
+        """
+        categories = self._query("""
+            SELECT c.name AS category, c.indexed, COUNT(*) AS usages, COUNT(DISTINCT u.image_id) AS images,
+                   COUNT(DISTINCT u.article_id) AS articles
+            FROM categories c JOIN usages u ON u.category_id = c.id GROUP BY c.id ORDER BY c.name""")
+        totals = dict(self.connection.execute("""
+            SELECT COUNT(*) AS usages, COUNT(DISTINCT image_id) AS images, COUNT(DISTINCT article_id) AS articles
+            FROM usages""").fetchone())
+        return {'categories': categories, 'totals': totals}
+
+
+def _print_rows(rows, columns):
+    for row in rows:
+        print('\t'.join(str(row[column]) for column in columns))
+    print(f"({len(rows)} rows)")
+
+
+def main():
+    from aggregation import latest_report_path
+
+    parser = argparse.ArgumentParser(description="Build and query the index of the GLAMorous usage data.")
+    parser.add_argument('--index', default=USAGE_INDEX_PATH, help="The index database file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Index the latest reports of all institutions of one or more countries")
+    build.add_argument('countries', nargs='+', help="Country keys in category_logo_dict.json, such as 'Netherlands'")
+    build.add_argument('--dict', default='category_logo_dict.json', help="The JSON file with the institutions per country")
+    build.add_argument('--datadir', default='data', help="Directory with the Excel reports")
+    add = subparsers.add_parser('add', help="Index one report file")
+    add.add_argument('report', help="The report file (.xlsx, .parquet, .feather or .csv.gz)")
+    add.add_argument('--category', required=True, help="The Commons category (institution) of the report")
+    image = subparsers.add_parser('image', help="The articles in which an image is used")
+    image.add_argument('name', help="The image name, e.g. 'AMH-7230-KB_Map_of_Borneo.jpg'")
+    article = subparsers.add_parser('article', help="The images used in an article")
+    article.add_argument('article', help="The article URL or title")
+    article.add_argument('--project', default=None, help="The project of the article, e.g. 'fr.wikipedia'")
+    project = subparsers.add_parser('project', help="The articles of a project that use indexed images")
+    project.add_argument('code', help="The project code, e.g. 'nl.wikipedia'")
+    language = subparsers.add_parser('language', help="The articles of a language that use indexed images")
+    language.add_argument('name', help="The full language name, e.g. 'Dutch'")
+    top = subparsers.add_parser('top-images', help="The most widely used images")
+    top.add_argument('--by', choices=['languages', 'articles'], default='languages', help="Rank by number of languages or articles")
+    top.add_argument('--limit', type=int, default=20, help="Number of images")
+    search = subparsers.add_parser('search', help="Find image names containing a text")
+    search.add_argument('pattern', help="A part of the image name, e.g. 'Borneo'")
+    subparsers.add_parser('stats', help="The contents of the index")
+    for subparser in (image, article, project, language, top):
+        subparser.add_argument('--category', default=None, help="Only usages of this Commons category")
+    args = parser.parse_args()
+
+    with UsageIndex(args.index) as index:
+        if args.command == 'build':
+            countries_dict = load_dict(args.dict)
+            if countries_dict is None:
+                return
+            for country in args.countries:
+                for category in countries_dict.get(country, {}):
+                    path = latest_report_path(category, args.datadir)
+                    if path is None:
+                        print(f"No report found for '{category}' in {args.datadir}. Skipping...")
+                        continue
+                    print(f"Indexed {index.add_report(category, path)} usages of '{category}' from {path}")
+        elif args.command == 'add':
+            print(f"Indexed {index.add_report(args.category, args.report)} usages of '{args.category}' from {args.report}")
+        elif args.command == 'image':
+            _print_rows(index.articles_for_image(args.name, args.category), ['project', 'language', 'url'])
+        elif args.command == 'article':
+            _print_rows(index.images_in_article(args.article, args.project, args.category), ['project', 'url', 'image'])
+        elif args.command in ('project', 'language'):
+            rows = (index.articles_in_project(project=args.code, category=args.category) if args.command == 'project'
+                    else index.articles_in_project(language=args.name, category=args.category))
+            _print_rows(rows, ['images', 'project', 'url'])
+        elif args.command == 'top-images':
+            _print_rows(index.top_images(args.by, args.limit, args.category), ['languages', 'articles', 'image'])
+        elif args.command == 'search':
+            for name in index.search_images(args.pattern):
+                print(name)
+        else:
+            stats = index.stats()
+            _print_rows(stats['categories'], ['usages', 'images', 'articles', 'indexed', 'category'])
+            print(f"Total: {stats['totals']['usages']} usages of {stats['totals']['images']} images "
+                  f"in {stats['totals']['articles']} articles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+This module provides a compact core data model for the GLAMorous usage data: the many-to-many relation between
+images (from a Wikimedia Commons category) and the Wikipedia articles they are used in.
+
+Instead of holding this relation as Python lists of URL and filename strings inside nested dictionaries (in which the
+same strings are repeated many times), image names, article URLs and project codes are interned into integer ids,
+and the usages are stored as a sparse incidence matrix in CSR (compressed sparse row) layout, with one row per article
+and one column per image. The key figures reported in the README then become vectorized reductions over this matrix:
+- Total image usages: the number of non-zero entries (image, article) in the matrix.
+- Distinct images used: the number of columns (images) with at least one usage.
+- Unique articles per language: the number of rows (articles) per project.
+- Images per article: the number of non-zero entries per row.
+
+Usage:
+    matrix = UsageMatrix.from_images(images, wikiprojects_filtered, langdictlist)
+    print(matrix.key_figures())
+    wp_df = convert_to_dataframe(matrix)  # Same DataFrame as build_projects_dataframe() in general.py
+
+Dependencies:
+- NumPy and pandas. SciPy is optional and only needed for UsageMatrix.to_scipy().
+"""
+
+from array import array
+import numpy as np
+import pandas as pd
+
+from general import (iter_image_usages, build_language_index, get_full_language_name, LANGUAGE_NOT_FOUND,
+                     IMAGE_SEPARATOR)
+
+
+class UsageMatrix:
+    """
+    Sparse image x article incidence matrix of the usages of images in Wikipedia articles.
+    Attributes:
+    - image_names (list): The image names, indexed by image id (in order of first occurrence in the image data).
+    - article_urls (list): The Wikipedia article URLs, indexed by article id.
+    - project_codes (list): The Wikimedia project codes (e.g. 'fr.wikipedia'), indexed by project id.
+    - full_language_names (list): The full language name of each project, indexed by project id. None for projects
+      whose full language name is not known.
+    - article_project (np.ndarray): The project id of each article, indexed by article id.
+    - indptr (np.ndarray): CSR row pointers: the image ids of article i are indices[indptr[i]:indptr[i + 1]].
+    - indices (np.ndarray): CSR column indices (image ids). Within an article, images are ordered by their first
+      occurrence in the image data, as in the 'Images' column of build_projects_dataframe().
+    """
+
+    def __init__(self, image_names, article_urls, project_codes, full_language_names, article_project, indptr, indices):
+        self.image_names = image_names
+        self.article_urls = article_urls
+        self.project_codes = project_codes
+        self.full_language_names = full_language_names
+        self.article_project = article_project
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_images(cls, images, projects=None, ldictlist=None):
+        """
+        Builds the usage matrix from GLAMorous image records, in a single pass over the image data.
+        Parameters:
+        - images (iterable): The image records, see iter_image_usages() in general.py.
+        - projects (list, optional): The Wikimedia projects to take into account, as returned by filter_wikiprojects().
+          If not given, all projects in the image data are used.
+        - ldictlist (list or dict, optional): The language labels returned by get_languages_dict(), or a language index
+          compiled from them by build_language_index(). Needed for to_dataframe().
+        Returns:
+        - UsageMatrix: The usage matrix.
+        """
+        image_ids, article_ids = {}, {}
+        project_ids = {project: project_id for project_id, project in enumerate(dict.fromkeys(projects or []))}
+        article_project = array('i')
+        rows, cols = array('q'), array('q')
+        for picture_name, project_code, wiki_url in iter_image_usages(images, project_ids if projects is not None else None):
+            article_id = article_ids.get(wiki_url)
+            if article_id is None:
+                article_id = article_ids[wiki_url] = len(article_ids)
+                article_project.append(project_ids.setdefault(project_code, len(project_ids)))
+            image_id = image_ids.get(picture_name)
+            if image_id is None:
+                image_id = image_ids[picture_name] = len(image_ids)
+            rows.append(article_id)
+            cols.append(image_id)
+
+        n_articles, n_images = len(article_ids), max(len(image_ids), 1)
+        rows, cols = np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)
+        # Deduplicate (article, image) pairs, then order them by article and, within an article, by first occurrence
+        pair_keys, first_occurrence = np.unique(rows * n_images + cols, return_index=True)
+        pair_rows, pair_cols = pair_keys // n_images, pair_keys % n_images
+        order = np.lexsort((first_occurrence, pair_rows))
+        indices = pair_cols[order].astype(np.int32)
+        indptr = np.zeros(n_articles + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_rows, minlength=n_articles), out=indptr[1:])
+
+        project_codes = list(project_ids)
+        if ldictlist is None:
+            full_language_names = [None] * len(project_codes)
+        else:
+            language_index = ldictlist if isinstance(ldictlist, dict) else build_language_index(ldictlist)
+            full_language_names = [get_full_language_name(language_index, project) for project in project_codes]
+            full_language_names = [None if name == LANGUAGE_NOT_FOUND else name for name in full_language_names]
+
+        return cls(list(image_ids), list(article_ids), project_codes, full_language_names,
+                   np.frombuffer(article_project, dtype=np.int32), indptr, indices)
+
+    @property
+    def shape(self):
+        """(number of articles, number of images)"""
+        return len(self.article_urls), len(self.image_names)
+
+    def to_scipy(self, fmt='csr'):
+        """
+        Returns the incidence matrix as a SciPy sparse matrix (rows = articles, columns = images).
+        Parameters:
+        - fmt (str, optional): 'csr' (default) or 'csc'.
+        Returns:
+        - scipy.sparse.csr_matrix or scipy.sparse.csc_matrix: A matrix with a 1 for every usage.
+        """
+        from scipy.sparse import csr_matrix  # Optional dependency, only needed here
+        matrix = csr_matrix((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr), shape=self.shape)
+        return matrix.tocsc() if fmt == 'csc' else matrix
+
+    # Key figures, as vectorized reductions over the matrix
+
+    def total_usages(self):
+        """Total number of image usages, i.e. of unique (image, article) combinations."""
+        return int(len(self.indices))
+
+    def distinct_images_used(self):
+        """Number of distinct images that are used in at least one article."""
+        return int(np.count_nonzero(np.bincount(self.indices, minlength=len(self.image_names))))
+
+    def images_per_article(self):
+        """
+        Returns:
+        - pd.Series: The number of images in each article, indexed by article URL.
+        """
+        return pd.Series(np.diff(self.indptr), index=self.article_urls, name='NumberOfImages')
+
+    def articles_per_project(self):
+        """
+        Returns:
+        - pd.Series: The number of unique articles per project, indexed by project code.
+        """
+        counts = np.bincount(self.article_project, minlength=len(self.project_codes))
+        return pd.Series(counts, index=self.project_codes, name='NumberOfArticles')
+
+    def usages_per_project(self):
+        """
+        Returns:
+        - pd.Series: The number of image usages per project, indexed by project code.
+        """
+        counts = np.bincount(self.article_project, weights=np.diff(self.indptr), minlength=len(self.project_codes))
+        return pd.Series(counts.astype(np.int64), index=self.project_codes, name='NumberOfUsages')
+
+    def key_figures(self):
+        """
+        Returns:
+        - dict: The key figures of the README: the number of Wikipedia language versions in which images are used,
+          the total number of image usages, the number of distinct images used and the number of unique articles.
+        """
+        articles_per_project = self.articles_per_project()
+        return {
+            'languages': int(np.count_nonzero(articles_per_project.values)),
+            'totalUsages': self.total_usages(),
+            'distinctImagesUsed': self.distinct_images_used(),
+            'uniqueArticles': len(self.article_urls),
+        }
+
+    def to_dataframe(self):
+        """
+        Converts the usage matrix into the DataFrame format of convert_to_dataframe() and build_projects_dataframe()
+        in general.py, with the same row order: projects by descending number of articles and then by full language
+        name, articles alphabetically by URL. Projects without a known full language name are skipped with a warning
+        (if the matrix was built without language labels, all projects are kept, with 'Unknown' as language name).
+        Returns:
+        - DataFrame: A pandas DataFrame with columns 'ProjectCode', 'FullLanguageName', 'ArticleURL', 'ArticleTitle',
+          'Images' and 'NumberOfImages'.
+        """
+        labels_known = any(name is not None for name in self.full_language_names)
+        articles_per_project = np.bincount(self.article_project, minlength=len(self.project_codes))
+        project_ids = []
+        for project_id, project_code in enumerate(self.project_codes):
+            if labels_known and self.full_language_names[project_id] is None:
+                print(f"Warning: Full language name not found for key '{project_code}'. Skipping...")
+                continue
+            project_ids.append(project_id)
+        project_ids.sort(key=lambda project_id: (-articles_per_project[project_id],
+                                                 self.full_language_names[project_id] or 'Unknown'))
+        project_rank = np.full(len(self.project_codes), len(self.project_codes), dtype=np.int64)
+        project_rank[project_ids] = np.arange(len(project_ids))
+
+        article_rank = project_rank[self.article_project].tolist()
+        article_order = sorted((article_id for article_id, rank in enumerate(article_rank) if rank < len(project_ids)),
+                               key=lambda article_id: (article_rank[article_id], self.article_urls[article_id]))
+
+        image_names, indptr, indices = self.image_names, self.indptr, self.indices
+        project_column = [self.project_codes[self.article_project[article_id]] for article_id in article_order]
+        url_column = [self.article_urls[article_id] for article_id in article_order]
+        df = pd.DataFrame({
+            'ProjectCode': project_column,
+            'FullLanguageName': [self.full_language_names[self.article_project[article_id]] or 'Unknown'
+                                 for article_id in article_order],
+            'ArticleURL': url_column,
+            'ArticleTitle': [url.split('/wiki/')[1] for url in url_column],
+            'Images': [IMAGE_SEPARATOR.join(image_names[image_id] for image_id in indices[indptr[article_id]:indptr[article_id + 1]])
+                       for article_id in article_order],
+            'NumberOfImages': np.diff(indptr)[article_order].astype(np.int64),
+        })
+        return df